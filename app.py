@@ -1,31 +1,49 @@
 #!/usr/bin/env python
 
 import sys
-import whisperx.diarize
-import whisper
+import whisperx
 import gc
+import copy
 from pathlib import Path
 from time import perf_counter_ns
-from typing import List, Any
-from whispaau.archive import archiving
+from typing import List, Any, NamedTuple
+from whispaau.archive import ArchiveBuilder
+from whispaau.manifest import Manifest
+from whispaau.job_state import JobState
 from whispaau.cli_utils import parse_arguments
 from whispaau.logging import Logger
 from whispaau.utils import get_writer
 from whispaau.utils import WRITERS
 from whispaau.utils import MERGED_SPEAKERS_WRITERS
 from whispaau.utils import is_speaker_diarization_supported
-from whispaau.writers import merge_speakers, reset_merge_speaker_data
-import torch
+from whispaau.utils import get_incremental_writers
+from whispaau.writers import merge_speakers
+from whispaau.registry import load_align_model, load_diarize_model, set_model_memory_budget
+from whispaau.audio import load_audio, AudioData, SAMPLE_RATE
+from whispaau.pipeline import run_pipeline
+from whispaau.vad import detect_speech, SpeechRegions
+from whispaau.workers import run_pool, get_worker_log
+from whispaau.result_cache import ResultCache, hash_file, make_key
+from whispaau.server import serve
+from whispaau.scheduler import Schedule, estimate_rtf, probe_durations
+from functools import partial
 import os
-from whispaau.transcription import transcribe
 from whispaau.file_preprocessor import pre_proces
 
+# torch and the model backends (whisper, nemo, pyannote) take seconds to import. They
+# are imported in the functions that need them, so --help, argument errors and the
+# server start without that cost.
+
 def cli(args: dict[str, Any]) -> None:
     job_name = args.get("job_name")
     output_dir: Path = args.get("output_dir")
     output_dir.mkdir(exist_ok=True)
     verbose = args.get("verbose")
-    log = Logger(name=job_name, output_dir=output_dir, verbose=verbose)
+    log = Logger(
+        name=job_name, output_dir=output_dir, verbose=verbose, log_stages=args.pop("log_stages")
+    )
+
+    import torch
 
     # Setup CPU/GPU and model
     use_cuda = not args.get("no_cuda") and torch.cuda.is_available()
@@ -59,152 +77,595 @@ def cli(args: dict[str, Any]) -> None:
         speaker_params["max_speakers"] = max_speakers
 
     threads = args.pop("threads")
-    if threads > 0:
+    workers = args.pop("workers")
+    if threads > 0 and workers <= 1:
         torch.set_num_threads(threads)
         log.log_threads(threads)
 
-    files = args.get("input")
+    # number of audio chunks inferred together, 0 lets the model choose from the available memory
+    batch_size = args.pop("batch_size")
+
+    # skip long silences before transcription
+    vad = args.pop("vad")
+
+    # int8 weights for the linear layers of the transcription model, cpu only
+    quantize = args.pop("quantize")
+
+    model_cache_mb = args.pop("model_cache_mb")
+    if model_cache_mb > 0:
+        set_model_memory_budget(model_cache_mb * 1024 * 1024)
+
+    # results of earlier runs are reused when only the output settings change
+    cache_size_mb = args.pop("cache_size_mb")
+    cache = None
+    if args.pop("no_cache"):
+        pass
+    elif secret_password is not None:
+        # the cached results are plain transcripts, they would defeat the encryption of the archive
+        log.get_logger().info("The result cache is disabled because the archive is encrypted.")
+    else:
+        cache = ResultCache(max_bytes=cache_size_mb * 1024 * 1024)
+
+    # sort the input files so that the log is deterministic, they are
+    # processed longest first, see Schedule
+    files = sorted(args.get("input"))
+
+    # a live stream is transcribed instead of the input files
+    stream = args.pop("stream")
+    stream_format = args.pop("stream_format")
+    latency = args.pop("latency")
 
     output_format = args.pop("output_format")
-    writer = get_writer(output_format, output_dir, WRITERS)
-    merge_writer = get_writer(output_format, output_dir, MERGED_SPEAKERS_WRITERS)
+
+    # skip the files that an earlier run of the job has completed
+    resume = args.pop("resume")
 
     log.log_processing(files)
 
-    for file in files:
-        options = {
-            "highlight_words": None,
-            "max_line_count": None,
-            "max_line_width": None,
-            "jobname": job_name,
-            "filename": file
-        }
-        process_file(
-            log,
-            file,
-            output_dir,
-            model_name,
-            device,
-            use_cuda,
-            writer,
-            merge_writer,
-            args.get("merge_speakers"),
-            transcribe_arguments,
-            options,
-            speaker_params
+    settings = {
+        "job_name": job_name,
+        "output_dir": output_dir,
+        "output_format": output_format,
+        "model_name": model_name,
+        "device": device,
+        "use_cuda": use_cuda,
+        "merge_speakers": args.get("merge_speakers"),
+        "trans_arguments": transcribe_arguments,
+        "speaker_params": speaker_params,
+        "batch_size": batch_size,
+        "vad": vad,
+        "quantize": quantize,
+        "cache": cache,
+    }
+    # The status, content hash and outputs of every input file, a resumed job only
+    # processes the files that are not done
+    state = JobState(output_dir, job_name, job_settings_key(settings))
+    completed: dict[Path, List[Path]] = {}
+    if resume and state.load():
+        completed = state.completed(files)
+        log.get_logger().info(
+            f"Resuming the job, {len(completed)} of {len(files)} files are done already."
         )
-    if args.get("transcriber_gui"):
-        # If running from the transcriber GUI the user can have multiple runs with different models
-        # Get all available model names
-        all_models = []
-        for model in whisper.available_models():
-            all_models.append(model)
-        all_models.append("parakeet")
-        # Include files for all model names
-        files_to_pack = [
-        path
-        for transcription_model_name in all_models
-        for path in output_dir.glob(f"*_{transcription_model_name}*")
-        if path.is_file()
-        ]
-    else:
-        files_to_pack = [path for path in output_dir.glob(f"*_{model_name}*") if path.is_file()]
+        files = [file for file in files if file not in completed]
+    elif resume:
+        log.get_logger().info(
+            "There is no earlier run of the job with the same settings to resume, "
+            "all files are processed."
+        )
+
+    # The durations are probed up front, the longest files are started first so that a long file
+    # does not keep one worker busy at the end of the job, and the completion time is predicted
+    # from the duration of the files
+    schedule = Schedule(
+        probe_durations(files), workers if workers > 1 else 1, estimate_rtf(model_name, device)
+    )
+    files = schedule.order
+    if files:
+        log.log_schedule(len(files), schedule.total_audio, schedule.predicted_seconds())
+
+    # The outputs of every file are recorded in the manifest and compressed into the archive
+    # while the next files are transcribed
+    manifest = Manifest(output_dir, job_name)
+
+    def archive_outputs(file: Path, outputs: FileOutputs | None) -> FileOutputs | None:
+        if outputs is not None:
+            manifest.add(outputs.paths, file.name, model_name)
+            with log.stage("archive", file):
+                archive.add(outputs.paths)
+        return outputs
+
+    def record_file(file: Path, outputs: FileOutputs | None) -> None:
+        if outputs is None:
+            state.failed(file, "The file format is not supported and could not be converted.")
+        else:
+            state.done(file, outputs.paths)
+        predicted_s = schedule.finished(file)
+        log.log_prediction(len(schedule.remaining), predicted_s)
+
+    def finish_file(file: Path, outputs: FileOutputs | None) -> FileOutputs | None:
+        record_file(file, outputs)
+        return archive_outputs(file, outputs)
+
+    def prepare(file: Path) -> PreparedFile | None:
+        with state.track(file):
+            prepared = prepare_file(log, file, settings)
+        if prepared is None:
+            finish_file(file, None)
+        return prepared
 
-    # Pack everything into a process_name.zip
+    # The archive is created once the job is set up, it replaces the archive
+    # of an earlier run of the job
     job_name_directory = Path(job_name)
-    archiving(
-        jobname=job_name_directory,
-        output_file=output_dir / job_name_directory.with_suffix(".zip"),
-        paths=files_to_pack,
-        secret_password=secret_password,
+    archive = ArchiveBuilder(
+        job_name_directory, output_dir / job_name_directory.with_suffix(".zip"), secret_password
     )
+    try:
+        # the outputs of the files that a resumed job completed already
+        for file, paths in completed.items():
+            archive_outputs(file, FileOutputs(None, paths))
+        if stream is not None:
+            archive_outputs(
+                Path(stream), transcribe_live_stream(log, stream, stream_format, latency, settings)
+            )
+        elif workers > 1:
+            def finished(file: Path, outputs: FileOutputs | None) -> None:
+                with state.track(file):
+                    record_file(file, outputs)
+                log.log_finished(
+                    outputs.output_file.name if outputs and outputs.output_file else file.name
+                )
 
+            state.start(files)
+            # a file that raises in a worker is recorded as failed with its error, the outputs are
+            # archived in the order of the files and not in the order the workers finish them
+            run_pool(
+                partial(process_file_in_worker, settings=settings),
+                files,
+                workers,
+                threads,
+                log,
+                on_result=finished,
+                on_error=state.error,
+                on_ordered=archive_outputs,
+            )
+        else:
+            writer = get_writer(output_format, output_dir, WRITERS)
+            merge_writer = get_writer(output_format, output_dir, MERGED_SPEAKERS_WRITERS)
 
-def process_file(
-    log: Logger,
-    input_file: Path,
-    output_dir,
-    model_name,
-    device,
-    use_cuda,
-    writer,
-    merge_writer,
-    speaker_merge_enabled,
-    trans_arguments,
-    options: dict[str, Any],
-    speaker_params,
-) -> None:
-    file_ok, file = pre_proces(input_file, log)
+            def process(file: Path, prepared: PreparedFile):
+                with state.track(file):
+                    return transcribe_file(log, prepared, settings)
+
+            def finish(file: Path, prepared: PreparedFile, transcribed) -> FileOutputs:
+                with state.track(file):
+                    outputs = write_file(
+                        log,
+                        prepared,
+                        *transcribed,
+                        settings,
+                        writer,
+                        merge_writer,
+                        file_options(job_name, file),
+                    )
+                return finish_file(file, outputs)
+
+            state.start(files)
+            # Decode the next file and write the previous file in
+            # background threads while transcribing
+            run_pipeline(files, prepare=prepare, process=process, finish=finish)
+        with log.stage("archive"):
+            if args.get("transcriber_gui"):
+                # If running from the transcriber GUI the user can have multiple runs with different
+                # models, the files of the earlier runs are packed as well
+                import whisper
+                all_models = [*whisper.available_models(), "parakeet", "faster"]
+                archive.add(manifest.merge_previous(all_models))
+            # Pack everything into a process_name.zip, together with the
+            # manifest of the packed files
+            archive.flush()
+            archive.add([manifest.write(archive.checksums)])
+            archive.close()
+    except BaseException:
+        archive.abort()
+        raise
+    log.log_stage_summary()
+
+
+class FileOutputs(NamedTuple):
+    """The files written for an input file."""
+    # the output path without extension, None if nothing was transcribed
+    output_file: Path | None
+    paths: List[Path]
+
+
+def job_settings_key(settings: dict[str, Any]) -> str:
+    """The settings that change the output files, a job is only resumed with the same settings."""
+    return make_key(
+        settings["model_name"],
+        settings["trans_arguments"],
+        settings["speaker_params"],
+        settings["vad"],
+        settings["quantize"],
+        settings["output_format"],
+        settings["merge_speakers"],
+    )
+
+
+def file_options(job_name: str, file: Path) -> dict[str, Any]:
+    return {
+        "highlight_words": None,
+        "max_line_count": None,
+        "max_line_width": None,
+        "jobname": job_name,
+        "filename": file
+    }
+
+
+def process_file_in_worker(file: Path, settings: dict[str, Any]) -> FileOutputs | None:
+    """
+    Run process_file in a pool worker, the writers are not picklable and are created in the worker.
+    """
+    output_dir = settings["output_dir"]
+    output_format = settings["output_format"]
+    return process_file(
+        get_worker_log(),
+        file,
+        settings,
+        get_writer(output_format, output_dir, WRITERS),
+        get_writer(output_format, output_dir, MERGED_SPEAKERS_WRITERS),
+        file_options(settings["job_name"], file),
+    )
+
+
+class PreparedFile(NamedTuple):
+    """An input file that has been converted and decoded, ready for transcription."""
+    input_file: Path
+    file: Path
+    # None if all the results are cached and the audio is not needed
+    audio: AudioData | None
+    start_time: int
+    # the speech regions found by voice activity detection, None if it is disabled
+    speech: SpeechRegions | None = None
+    # the result cache keys per stage, None if the cache is disabled
+    cache_keys: dict[str, str] | None = None
+
+
+def transcribe_live_stream(
+    log: Logger, source: str, stream_format: str, latency_s: float, settings: dict[str, Any]
+) -> FileOutputs:
+    """
+    Transcribe the audio stream from stdin or a named pipe until it ends. The segments are printed
+    and written with the incremental writers as they are transcribed, returns the written files.
+    """
+    from whispaau.streaming import open_stream
+    from whispaau.transcription import get_transcriber
+
+    model_name = settings["model_name"]
+    if "parakeet" not in model_name.lower():
+        raise ValueError(f"Streaming needs a parakeet model, not {model_name}")
+
+    output_file = settings["output_dir"] / f"{settings['job_name']}_{model_name}"
+    writers = get_incremental_writers(settings["output_format"], settings["output_dir"])
+    for writer in writers:
+        writer.open(output_file, file_options(settings["job_name"], Path(source)))
+
+    def on_segments(segments: List[dict[str, Any]], language: str) -> None:
+        for writer in writers:
+            writer.append(segments)
+        for segment in segments:
+            print(segment["text"], flush=True)
+
+    transcriber = get_transcriber(model_name, settings["device"], log, settings["quantize"])
+    start_time = perf_counter_ns()
+    log.get_logger().info(
+        f"Transcribing the stream {source} with a latency of {latency_s} seconds."
+    )
+    try:
+        with log.stage("stream"):
+            # blocks of a tenth of the latency, so a chunk is transcribed
+            # soon after its audio has arrived
+            blocks = open_stream(source, stream_format, max(1, int(latency_s * SAMPLE_RATE / 10)))
+            transcriber.transcribe_stream(blocks, latency_s, on_segments)
+    finally:
+        for writer in writers:
+            writer.finalize()
+    log.log_file_end(Path(source), start_time, perf_counter_ns())
+    return FileOutputs(output_file, [writer.path for writer in writers])
+
+
+def output_path(settings: dict[str, Any], file: Path, language: str) -> Path:
+    """The output path without extension of the transcription of the file."""
+    model_name = settings["model_name"]
+    lang_suffix = "" if "parakeet" in model_name.lower() else f"_{language}"
+    return settings["output_dir"] / f"{file.stem}_{model_name}{lang_suffix}"
+
+
+class IncrementalOutput:
+    """
+    Writes the transcribed segments of a recording as they are
+    produced by the transcription service.
+    The files get the final output names, write_file replaces them with
+    the aligned and diarized result.
+    """
+
+    def __init__(
+        self, prepared: "PreparedFile", settings: dict[str, Any], speech: SpeechRegions | None
+    ):
+        self.prepared = prepared
+        self.settings = settings
+        self.speech = speech
+        self.writers = get_incremental_writers(settings["output_format"], settings["output_dir"])
+        self.opened = False
+
+    def __call__(self, segments: List[dict[str, Any]], language: str) -> None:
+        if not self.opened:
+            path = output_path(self.settings, self.prepared.file, language)
+            for writer in self.writers:
+                writer.open(path, file_options(self.settings["job_name"], self.prepared.input_file))
+            self.opened = True
+        if self.speech is not None:
+            # the service returns the same segments later, they are remapped again with the result
+            segments = self.speech.remap_segments(copy.deepcopy(segments))
+        for writer in self.writers:
+            writer.append(segments)
+
+    def close(self, keep: bool) -> None:
+        """Complete the files, or remove them if there will be no final output to replace them."""
+        if not self.opened:
+            return
+        for writer in self.writers:
+            writer.finalize()
+            if not keep:
+                writer.path.unlink(missing_ok=True)
+
+
+def result_cache_keys(content_hash: str, settings: dict[str, Any]) -> dict[str, str]:
+    """
+    Cache keys for the results of every stage, each key includes the
+    settings that change the result.
+    """
+    transcription_key = make_key(
+        content_hash,
+        settings["model_name"],
+        settings["trans_arguments"],
+        settings["vad"],
+        settings["quantize"],
+    )
+    return {
+        "transcription": transcription_key,
+        "alignment": transcription_key,
+        # the speaker diarization does not depend on the transcription model
+        "diarization": make_key(content_hash, settings["speaker_params"], settings["vad"]),
+    }
+
+
+def prepare_file(log: Logger, input_file: Path, settings: dict[str, Any]) -> PreparedFile | None:
+    """
+    Convert the input file if the format is not supported and decode it, returns None if that fails.
+    """
+    with log.stage("preprocess", input_file):
+        file_ok, file = pre_proces(input_file, log)
     if not file_ok:
         log.get_logger().info("The file format is not supported and could not be converted to .mp3.")
-        return
-    log.log_file_start(input_file, device, model_name)
+        return None
     start_time = perf_counter_ns()
+    cache: ResultCache | None = settings["cache"]
+    cache_keys = None
+    if cache is not None:
+        with log.stage("hash", input_file):
+            cache_keys = result_cache_keys(hash_file(file), settings)
+    if cache_keys is not None and cache.contains("transcription", cache_keys["transcription"]):
+        # the transcription is cached, the audio is only decoded later if
+        # alignment or diarization is missing
+        log.log_file_start(input_file, settings["device"], settings["model_name"])
+        return PreparedFile(input_file, file, None, start_time, None, cache_keys)
 
-    transcribed_result = transcribe(model_name, file, trans_arguments, device, log)
-
-    if "segments" in transcribed_result:
-        language = transcribed_result["language"]
-
-        result: dict[str, Any] = {}
-        # check if speaker diarization is supported for this language
-        if is_speaker_diarization_supported(language):
-            # 2. Align whisper output
-            audio = whisperx.load_audio(file.resolve().as_posix())
-            model_a, metadata = whisperx.load_align_model(language_code=language, device=device)
-            aligned_result = whisperx.align(transcribed_result["segments"], model_a, metadata, audio, device, return_char_alignments=False)
-            # garbage collect memory
-            gc.collect()
-            if use_cuda:
-                torch.cuda.empty_cache()
-            del model_a
-
-            # 3. Assign speaker labels
-            # Initialize the diarization pipeline
-            diarize_model = whisperx.diarize.DiarizationPipeline(device=device, cache_dir=os.environ.get('PYANNOTE_CACHE_DIR'))
-            diarize_segments = diarize_model(audio, **speaker_params)
-            result = whisperx.assign_word_speakers(diarize_segments, aligned_result)
-            result["language"] = language
-
-            # transfer model specific attributes from transcription to the diarized segments array
-            transfer_model_attributes(transcribed_result["segments"], result["segments"])
-        else:
-            # use transcription output without speaker diarization
-            result = transcribed_result
-            speaker_merge_enabled = False
-            print(f"Speaker diarization is disabled. There is no alignment model for this language.")
+    # 1. Decode the file once, the waveform is shared by transcription, alignment and diarization
+    audio, speech = decode_file(log, file, settings)
+    log.log_file_start(input_file, settings["device"], settings["model_name"], audio.duration)
+    return PreparedFile(input_file, file, audio, start_time, speech, cache_keys)
 
-        # write output files
-        lang_suffix = "" if "parakeet" in model_name.lower() else f"_{result.get('language', '--')}"
-        output_file = (
-            output_dir / f"{file.stem}_{model_name}{lang_suffix}"
+
+def decode_file(
+    log: Logger, file: Path, settings: dict[str, Any]
+) -> tuple[AudioData, SpeechRegions | None]:
+    with log.stage("decode", file) as span:
+        audio = load_audio(file)
+        if span is not None:
+            span["audio_s"] = audio.duration
+    speech = None
+    if settings["vad"]:
+        with log.stage("vad", file, audio.duration):
+            speech = detect_speech(audio.samples, audio.sample_rate)
+        log.log_speech_detected(speech.speech_duration, audio.duration)
+    return audio, speech
+
+
+def cached_stage(cache: ResultCache | None, cache_keys: dict[str, str] | None, stage: str, compute):
+    """Return the cached result of the stage, or compute and cache it."""
+    if cache is None:
+        return compute()
+    result = cache.get(stage, cache_keys[stage])
+    if result is None:
+        result = compute()
+        cache.put(stage, cache_keys[stage], result)
+    return result
+
+
+def transcribe_file(
+    log: Logger,
+    prepared: PreparedFile,
+    settings: dict[str, Any],
+) -> tuple[dict[str, Any] | None, bool]:
+    """
+    Transcribe, align and diarize a prepared file. Returns the result and
+    whether it has speaker labels.
+    """
+    from whispaau.transcription import transcribe
+
+    model_name = settings["model_name"]
+    device = settings["device"]
+    cache: ResultCache | None = settings["cache"]
+    decoded = {"audio": prepared.audio, "speech": prepared.speech}
+
+    def samples(speech_only: bool = False):
+        # decode here if the prepare stage skipped it because the transcription was cached
+        if decoded["audio"] is None:
+            decoded["audio"], decoded["speech"] = decode_file(log, prepared.file, settings)
+        if speech_only and decoded["speech"] is not None:
+            return decoded["speech"].compact(decoded["audio"].samples)
+        return decoded["audio"].samples
+
+    def run_transcription():
+        speech = decoded["speech"]
+        if speech is not None and len(speech) == 0:
+            # voice activity detection found nothing to transcribe
+            return {}
+        # only transcribe the speech, the timestamps are moved back to the
+        # full recording before alignment
+        audio = samples(speech_only=True)
+        # long recordings are written while they are transcribed, so the text
+        # can be read before the job ends
+        incremental_output = IncrementalOutput(prepared, settings, speech)
+        transcription = {}
+        try:
+            with log.stage("transcription", prepared.input_file, len(audio) / SAMPLE_RATE):
+                transcription = transcribe(
+                    model_name, prepared.file, settings["trans_arguments"], device, log,
+                    audio, settings["batch_size"], settings["quantize"], incremental_output
+                )
+        finally:
+            incremental_output.close(keep=bool(transcription.get("segments")))
+        if speech is not None:
+            speech.remap_segments(transcription.get("segments", []))
+        return transcription
+
+    transcribed_result = cached_stage(
+        cache, prepared.cache_keys, "transcription", run_transcription
+    )
+
+    if "segments" not in transcribed_result:
+        return None, False
+
+    language = transcribed_result["language"]
+    # check if speaker diarization is supported for this language
+    if not is_speaker_diarization_supported(language):
+        # use transcription output without speaker diarization
+        print(f"Speaker diarization is disabled. There is no alignment model for this language.")
+        return transcribed_result, False
+
+    def run_alignment():
+        # 2. Align whisper output
+        # the alignment models are cached across files, see whispaau/registry.py
+        audio = samples()
+        with log.stage("alignment", prepared.input_file, len(audio) / SAMPLE_RATE):
+            model_a, metadata = load_align_model(language, device, log)
+            aligned = whisperx.align(
+                transcribed_result["segments"],
+                model_a,
+                metadata,
+                audio,
+                device,
+                return_char_alignments=False,
+            )
+        # garbage collect memory
+        gc.collect()
+        if settings["use_cuda"]:
+            import torch
+            torch.cuda.empty_cache()
+        return aligned
+
+    aligned_result = cached_stage(cache, prepared.cache_keys, "alignment", run_alignment)
+
+    def run_diarization():
+        # 3. Assign speaker labels Get the (cached) diarization pipeline with voice activity
+        # detection the speech regions are reused, the diarization also skips the silence
+        audio = samples(speech_only=True)
+        with log.stage("diarization", prepared.input_file, len(audio) / SAMPLE_RATE):
+            diarize_model = load_diarize_model(device, os.environ.get('PYANNOTE_CACHE_DIR'), log)
+            segments = diarize_model(audio, **settings["speaker_params"])
+        speech = decoded["speech"]
+        if speech is not None:
+            segments["start"] = speech.to_original(segments["start"].to_numpy())
+            segments["end"] = speech.to_original(segments["end"].to_numpy(), is_end=True)
+        return segments
+
+    diarize_segments = cached_stage(cache, prepared.cache_keys, "diarization", run_diarization)
+    with log.stage("assign_speakers", prepared.input_file):
+        result = whisperx.assign_word_speakers(diarize_segments, aligned_result)
+    result["language"] = language
+
+    # transfer model specific attributes from transcription to the diarized segments array
+    transfer_model_attributes(transcribed_result["segments"], result["segments"])
+    return result, True
+
+
+def write_file(
+    log: Logger,
+    prepared: PreparedFile,
+    result: dict[str, Any] | None,
+    diarized: bool,
+    settings: dict[str, Any],
+    writer,
+    merge_writer,
+    options: dict[str, Any],
+) -> FileOutputs:
+    """
+    Write the output files for a transcribed file, returns the output path without
+    extension and the written files.
+    """
+    file = prepared.file
+    output_file: Path | None = None
+    paths: List[Path] = []
+    if result is None or not result["segments"]:
+        # empty output from the transcription algorithm
+        print(
+            "The transcription algorithm generated empty output. "
+            "This usually happens due to inaudible or insufficient audio."
         )
-        if not result["segments"]:
-            # empty output from the transcription algorithm
-            print("The transcription algorithm generated empty output. This usually happens due to inaudible or insufficient audio.")
-        else:
-            writer(
+    else:
+        # write output files
+        output_file = output_path(settings, file, result.get('language', '--'))
+        with log.stage("write", prepared.input_file):
+            paths += writer(
                 result,
                 output_file,
                 options,
             )
-            # if speaker_merge_enabled then also write merged file formats
-            if speaker_merge_enabled and (merge_writer is not None):
-                output_file_merged_speakers = (
-                        output_dir / f"{file.stem}_{model_name}{lang_suffix}_merged"
-                )
-                merge_writer(
+        # if speaker merging is enabled then also write merged file formats,
+        # this requires speaker labels
+        if settings["merge_speakers"] and diarized and (merge_writer is not None):
+            output_file_merged_speakers = output_file.with_name(f"{output_file.name}_merged")
+            with log.stage("write_merged", prepared.input_file):
+                paths += merge_writer(
                     merge_speakers(result),
                     output_file_merged_speakers,
                     options
                 )
-                # reset the merge speaker data
-                reset_merge_speaker_data()
-    else:
-        # empty output from the transcription algorithm
-        print("The transcription algorithm generated empty output. This usually happens due to inaudible or insufficient audio.")
 
-    log.log_file_end(file, start_time, perf_counter_ns())
+    log.log_file_end(file, prepared.start_time, perf_counter_ns())
+    return FileOutputs(output_file, paths)
+
+
+def process_file(
+    log: Logger,
+    input_file: Path,
+    settings: dict[str, Any],
+    writer,
+    merge_writer,
+    options: dict[str, Any],
+) -> FileOutputs | None:
+    """
+    Transcribe one input file and write the output files, returns the output path
+    without extension and the files.
+    settings holds the job settings built by cli, e.g. the model name,
+    device and speaker parameters.
+    """
+    prepared = prepare_file(log, input_file, settings)
+    if prepared is None:
+        return None
+    result, diarized = transcribe_file(log, prepared, settings)
+    return write_file(log, prepared, result, diarized, settings, writer, merge_writer, options)
 
 
 # This function copies the model specific attributes like "avg_logprob" and "temperature" from the whisper output
@@ -221,5 +682,9 @@ def transfer_model_attributes(transcribed_result: List[dict[str, Any]], result:
 
 if __name__ == "__main__":
     arguments = sys.argv[1:]
-    cli_arguments = parse_arguments(None)
-    cli(cli_arguments)
+    if arguments and arguments[0] == "serve":
+        # keep the models loaded and run the jobs submitted over http, see whispaau/server.py
+        serve(cli, arguments[1:])
+    else:
+        cli_arguments = parse_arguments(None)
+        cli(cli_arguments)
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Micro-benchmark of merge_speakers on a long synthetic transcript with long monologues.
+The merging is compared with the former implementation, which appended the text
+of every line to the group text.
+
+    python3 benchmarks/merge_speakers.py --segments 50000 --repeat 5
+"""
+
+import argparse
+import random
+import sys
+from pathlib import Path
+from time import perf_counter
+from typing import Optional
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+
+def append_merge_speakers(result: dict) -> dict:
+    """
+    The former merging, the text of a group is stripped and extended for
+    every line, kept as the reference.
+    """
+    merged = {"segments": [], "language": result["language"]}
+    current_speaker = ""
+    for line in result["segments"]:
+        speaker = line.get("speaker", "Undetermined speaker")
+        text = line.get("text", "Undetermined text")
+        if speaker != current_speaker:
+            merged["segments"].append(
+                {"speaker": speaker, "text": text, "start": line["start"], "end": line["end"]}
+            )
+            current_speaker = speaker
+        else:
+            merged["segments"][-1]["text"] = (
+                merged["segments"][-1]["text"].strip() + " " + text.strip()
+            )
+            merged["segments"][-1]["end"] = line["end"]
+    return merged
+
+
+def synthetic_transcript(num_segments: int, monologue: int, seed: int = 0) -> dict:
+    """Segments of two speakers that take turns after about monologue segments."""
+    rng = random.Random(seed)
+    segments = []
+    speaker = 0
+    for i in range(num_segments):
+        if rng.random() < 1 / monologue:
+            speaker = 1 - speaker
+        words = " ".join(f"word{rng.randint(0, 999)}" for _ in range(rng.randint(3, 15)))
+        segments.append(
+            {
+                "start": i * 2.0,
+                "end": i * 2.0 + 1.5,
+                "text": f" {words}",
+                "speaker": f"SPEAKER_0{speaker}",
+            }
+        )
+    return {"segments": segments, "language": "en"}
+
+
+def best_time(function, argument, repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        start = perf_counter()
+        function(argument)
+        times.append(perf_counter() - start)
+    return min(times)
+
+
+def main(args: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Micro-benchmark of merge_speakers")
+    parser.add_argument("--segments", type=int, default=50000, help="segments in the transcript")
+    parser.add_argument("--monologue", type=int, default=5000,
+                        help="average number of consecutive segments of one speaker")
+    parser.add_argument(
+        "--repeat", type=int, default=5, help="runs per implementation, the fastest is reported"
+    )
+    args = parser.parse_args(args)
+
+    sys.path.insert(0, str(REPO_ROOT / "src"))
+    from whispaau.writers import merge_speakers
+
+    transcript = synthetic_transcript(args.segments, args.monologue)
+    merged = merge_speakers(transcript)
+    if merged != append_merge_speakers(transcript):
+        print("The merged segments differ from the reference implementation.")
+        return 1
+
+    append_s = best_time(append_merge_speakers, transcript, args.repeat)
+    join_s = best_time(merge_speakers, transcript, args.repeat)
+    print(f"{args.segments} segments merged into {len(merged['segments'])}")
+    print(f"{'append':<12}{append_s * 1000:>10.1f} ms")
+    print(f"{'join':<12}{join_s * 1000:>10.1f} ms  {append_s / join_s:>6.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
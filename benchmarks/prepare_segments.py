@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Micro-benchmark of prepare_segments on a long parakeet hypothesis, e.g. an hour of speech.
+The vectorized implementation is compared with the former word by word loop,
+which must give the same segments.
+
+    python3 benchmarks/prepare_segments.py --words 50000 --repeat 5
+"""
+
+import argparse
+import random
+import sys
+from pathlib import Path
+from time import perf_counter
+from typing import Optional
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+
+class Hypothesis:
+    def __init__(self, text, timestamp):
+        self.text = text
+        self.timestamp = timestamp
+
+
+def loop_prepare_segments(hypotheses):
+    """The former implementation of prepare_segments, one word at a time, kept as the reference."""
+    segments = []
+    full_text = []
+    hypo = hypotheses[0]
+    frame_shift = 0.08
+    gap_threshold = 1.0
+
+    words = hypo.text.split() if hypo.text else []
+    num_words = len(words)
+    if num_words == 0:
+        return segments, ""
+
+    timestamps = []
+    for ts in getattr(hypo, "timestamp", []):
+        try:
+            timestamps.append(float(ts))
+        except (TypeError, ValueError):
+            continue
+
+    num_ticks = len(timestamps)
+    if num_ticks == 0:
+        text = " ".join(words)
+        return [{"text": text, "start": 0.0, "end": 0.0}], text
+
+    current_words = []
+    start_time = timestamps[0] * frame_shift
+    for i in range(num_words):
+        current_words.append(words[i])
+        tick_idx = min(int((i / num_words) * num_ticks), num_ticks - 1)
+        next_tick_idx = min(int(((i + 1) / num_words) * num_ticks), num_ticks - 1)
+        pause_duration = (timestamps[next_tick_idx] - timestamps[tick_idx]) * frame_shift
+        if (pause_duration > gap_threshold or i == num_words - 1) and current_words:
+            text = " ".join(current_words)
+            end_time = timestamps[tick_idx] * frame_shift
+            if end_time < start_time:
+                end_time = start_time
+            segments.append(
+                {"text": text, "start": round(start_time, 3), "end": round(end_time, 3)}
+            )
+            full_text.append(text)
+            if i < num_words - 1:
+                start_time = timestamps[next_tick_idx] * frame_shift
+                current_words = []
+    return segments, " ".join(full_text)
+
+
+def synthetic_hypotheses(num_words: int, seed: int = 0):
+    """
+    A hypothesis with token timestamps and the same speech with word
+    timestamps, with a pause now and then.
+    """
+    rng = random.Random(seed)
+    words, ticks, word_timestamps = [], [], []
+    frame = 0
+    for i in range(num_words):
+        # about 1.5 tokens per word and a pause of more than a second every 20 words
+        frame += rng.randint(15, 40) if rng.random() < 0.05 else rng.randint(1, 4)
+        word = f"word{i % 1000}"
+        tokens = rng.randint(1, 2)
+        words.append(word)
+        ticks.extend(frame + token for token in range(tokens))
+        word_timestamps.append(
+            {"word": word, "start": frame * 0.08, "end": (frame + tokens) * 0.08}
+        )
+        frame += tokens
+    text = " ".join(words)
+    return Hypothesis(text, ticks), Hypothesis(text, {"word": word_timestamps})
+
+
+def best_time(function, argument, repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        start = perf_counter()
+        function(argument)
+        times.append(perf_counter() - start)
+    return min(times)
+
+
+def main(args: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Micro-benchmark of prepare_segments")
+    parser.add_argument("--words", type=int, default=50000, help="words in the hypothesis")
+    parser.add_argument(
+        "--repeat", type=int, default=5, help="runs per implementation, the fastest is reported"
+    )
+    args = parser.parse_args(args)
+
+    sys.path.insert(0, str(REPO_ROOT / "src"))
+    from whispaau.transcription import prepare_segments
+
+    ticks, word_timestamps = synthetic_hypotheses(args.words)
+    if prepare_segments([ticks]) != loop_prepare_segments([ticks]):
+        print("The vectorized segments differ from the reference loop.")
+        return 1
+
+    loop_s = best_time(loop_prepare_segments, [ticks], args.repeat)
+    vectorized_s = best_time(prepare_segments, [ticks], args.repeat)
+    words_s = best_time(prepare_segments, [word_timestamps], args.repeat)
+    segments = len(prepare_segments([ticks])[0])
+    print(f"{args.words} words, {segments} segments")
+    print(f"{'loop':<30}{loop_s * 1000:>10.1f} ms")
+    print(f"{'vectorized':<30}{vectorized_s * 1000:>10.1f} ms  {loop_s / vectorized_s:>6.1f}x")
+    print(f"{'vectorized, word timestamps':<30}{words_s * 1000:>10.1f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
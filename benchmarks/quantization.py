@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+""" Accuracy and speed of the int8 quantized transcription models against fp32 on the test audio """
+
+import argparse
+import json
+import re
+import sys
+from pathlib import Path
+from time import perf_counter
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT / "src"))
+
+RESOURCES = REPO_ROOT / "tests" / "resources" / "end2end"
+# test audio and the reference transcript of each model family
+TEST_FILES = {
+    "whisper": [
+        (RESOURCES / "input" / "DIALOGUE.m4a", RESOURCES / "DIALOGUE_OUTPUT.txt"),
+        (RESOURCES / "input" / "shorts.m4a", RESOURCES / "SHORTS_OUTPUT.txt"),
+    ],
+    "parakeet": [
+        (
+            RESOURCES / "input" / "DIALOGUE.m4a",
+            RESOURCES / "DIALOGUE_OUTPUT_parakeet-tdt-0.6b-v3.txt",
+        ),
+    ],
+}
+
+
+def words(text: str) -> list[str]:
+    return re.findall(r"[\w']+", text.lower())
+
+
+def word_error_rate(reference: str, hypothesis: str) -> float:
+    """Word level edit distance divided by the number of reference words."""
+    ref, hyp = words(reference), words(hypothesis)
+    previous = list(range(len(hyp) + 1))
+    for i, ref_word in enumerate(ref, start=1):
+        current = [i]
+        for j, hyp_word in enumerate(hyp, start=1):
+            current.append(
+                min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ref_word != hyp_word))
+            )
+        previous = current
+    return previous[-1] / max(1, len(ref))
+
+
+def run(model_name: str, quantize: str, output_dir: Path) -> list[dict]:
+    import torch
+    from whispaau import transcription
+    from whispaau.audio import load_audio
+    from whispaau.logging import Logger
+
+    log = Logger(name="quantization", output_dir=output_dir)
+    family = "parakeet" if "parakeet" in model_name else "whisper"
+    rows = []
+    for audio_file, reference_file in TEST_FILES[family]:
+        audio = load_audio(audio_file)
+        start = perf_counter()
+        result = transcription.transcribe(
+            model_name,
+            audio_file,
+            {"fp16": False},
+            torch.device("cpu"),
+            log,
+            audio.samples,
+            quantize=quantize,
+        )
+        elapsed = perf_counter() - start
+        rows.append(
+            {
+                "model": model_name,
+                "quantize": quantize,
+                "file": audio_file.name,
+                # the first file includes the model load, see the log for the load time
+                "rtf": elapsed / audio.duration,
+                "wer": word_error_rate(
+                    reference_file.read_text(encoding="utf-8"), result.get("text", "")
+                ),
+            }
+        )
+    # free the model before loading the next configuration
+    transcription._model_cache.clear()
+    return rows
+
+
+def main(args=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--models", nargs="+", default=["small", "parakeet-tdt-0.6b-v3"], help="models to compare"
+    )
+    parser.add_argument(
+        "--threads", type=int, default=0, help="torch cpu threads, 0 uses all cores"
+    )
+    parser.add_argument(
+        "--output_dir", type=Path, default=Path("./benchmark_output"), help="directory for the logs"
+    )
+    parser.add_argument(
+        "--json", type=Path, default=None, help="also write the report to this file"
+    )
+    args = parser.parse_args(args)
+
+    import torch
+    if args.threads > 0:
+        torch.set_num_threads(args.threads)
+    args.output_dir.mkdir(parents=True, exist_ok=True)
+
+    rows = []
+    for model_name in args.models:
+        for quantize in ("none", "int8"):
+            rows.extend(run(model_name, quantize, args.output_dir))
+
+    print(f"{'model':<24}{'quantize':<10}{'file':<16}{'RTF':>8}{'WER':>8}")
+    for row in rows:
+        print(
+            f"{row['model']:<24}{row['quantize']:<10}{row['file']:<16}"
+            f"{row['rtf']:>8.3f}{row['wer']:>8.3f}"
+        )
+    if args.json:
+        args.json.write_text(json.dumps(rows, indent=2), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
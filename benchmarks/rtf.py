@@ -0,0 +1,350 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Real-time factor benchmark of the transcription pipeline.
+Every configuration (model, device, threads) runs a complete job with app.py in its own
+process, so the peak RSS and the model load times are those of that configuration alone. The
+report holds the real-time factor of every stage, i.e. the seconds spent per second of audio,
+and is compared against a baseline.
+
+    python3 benchmarks/rtf.py --models tiny parakeet-tdt-0.6b-v3 --threads 4 8 --lengths 60 600
+    python3 benchmarks/rtf.py --models tiny --save_baseline benchmarks/baseline.json
+"""
+
+import argparse
+import csv
+import json
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import wave
+from itertools import product
+from pathlib import Path
+from time import perf_counter_ns
+from typing import Any, Optional
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+TEST_AUDIO = sorted((REPO_ROOT / "tests" / "resources" / "end2end" / "input").glob("*.m4a"))
+SAMPLE_RATE = 16000
+
+# Stages of app.py that are timed, the transcription, alignment and
+# diarization go through cached_stage
+STAGES = ("prepare", "transcription", "alignment", "diarization", "write", "archive")
+
+
+def synthetic_audio(length_s: float, output_dir: Path) -> Path:
+    """Loop the test speech to a recording of length_s seconds, a fixed corpus of any length."""
+    sys.path.insert(0, str(REPO_ROOT / "src"))
+    import numpy as np
+    from whispaau.audio import load_audio
+
+    speech = np.concatenate([load_audio(file, SAMPLE_RATE).samples for file in TEST_AUDIO])
+    repeats = int(np.ceil(length_s * SAMPLE_RATE / len(speech)))
+    samples = np.tile(speech, repeats)[:int(length_s * SAMPLE_RATE)]
+
+    path = output_dir / f"synthetic_{int(length_s)}s.wav"
+    with wave.open(str(path), "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(SAMPLE_RATE)
+        f.writeframes((np.clip(samples, -1, 1) * 32767).astype("<i2").tobytes())
+    return path
+
+
+def run_configuration(config: dict[str, Any]) -> dict[str, Any]:
+    """
+    Run one job with app.py in this process and return the timings, called in the child process.
+    """
+    sys.path[:0] = [str(REPO_ROOT), str(REPO_ROOT / "src")]
+    import app
+    from whispaau.logging import Logger
+
+    stage_ns = {stage: 0 for stage in STAGES}
+    model_loads: list[dict[str, Any]] = []
+    audio_s = [0.0]
+
+    def timed(stage: str, function):
+        def wrapper(*args, **kwargs):
+            start = perf_counter_ns()
+            loads_before = len(model_loads)
+            thread = threading.get_ident()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                # the model loads are reported separately and not counted as stage time. The
+                # pipeline decodes and writes while another thread transcribes, only the loads of
+                # this thread belong to the stage
+                loading = sum(
+                    load["seconds"]
+                    for load in model_loads[loads_before:]
+                    if load["thread"] == thread
+                )
+                stage_ns[stage] += perf_counter_ns() - start - int(loading * 1e9)
+        return wrapper
+
+    prepare_file = app.prepare_file
+
+    def prepare(*args, **kwargs):
+        prepared = prepare_file(*args, **kwargs)
+        if prepared is not None and prepared.audio is not None:
+            audio_s[0] += prepared.audio.duration
+        return prepared
+
+    cached_stage = app.cached_stage
+
+    def stage(cache, keys, name, compute):
+        return cached_stage(cache, keys, name, timed(name, compute))
+
+    log_model_loading = Logger.log_model_loading
+
+    def model_loading(self, model_name, start_time, end_time):
+        model_loads.append({
+            "model": model_name,
+            "seconds": (end_time - start_time) / 1e9,
+            "thread": threading.get_ident(),
+        })
+        log_model_loading(self, model_name, start_time, end_time)
+
+    app.prepare_file = timed("prepare", prepare)
+    app.cached_stage = stage
+    app.write_file = timed("write", app.write_file)
+    archive_builder = app.ArchiveBuilder
+
+    class TimedArchiveBuilder(archive_builder):
+        add = timed("archive", archive_builder.add)
+        close = timed("archive", archive_builder.close)
+
+    app.ArchiveBuilder = TimedArchiveBuilder
+    Logger.log_model_loading = model_loading
+
+    arguments = [
+        "-i", *config["files"],
+        "-m", config["model"],
+        "-o", config["output_dir"],
+        "--threads", str(config["threads"]),
+        "--job_name", "benchmark",
+        # every run must compute all the stages
+        "--no-cache",
+        *config["extra"],
+    ]
+    if config["device"] == "cpu":
+        arguments += ["--no-cuda", "--no-mps"]
+
+    start = perf_counter_ns()
+    app.cli(app.parse_arguments(arguments))
+    wall_s = (perf_counter_ns() - start) / 1e9
+
+    audio_seconds = audio_s[0] or 1.0
+    return {
+        "audio_s": audio_s[0],
+        "wall_s": wall_s,
+        "rtf": wall_s / audio_seconds,
+        "stages": {
+            stage: {"seconds": ns / 1e9, "rtf": ns / 1e9 / audio_seconds}
+            for stage, ns in stage_ns.items()
+        },
+        "model_loads": [{key: load[key] for key in ("model", "seconds")} for load in model_loads],
+        # kilobytes on linux
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }
+
+
+def configuration_key(config: dict[str, Any]) -> str:
+    return f"{config['model']}|{config['device']}|{config['threads']}|{config['corpus']}"
+
+
+def run_in_subprocess(config: dict[str, Any]) -> dict[str, Any]:
+    completed = subprocess.run(
+        [sys.executable, __file__, "--run_configuration", json.dumps(config)],
+        capture_output=True,
+        text=True,
+    )
+    if completed.returncode != 0:
+        return {
+            "error": completed.stderr.strip().splitlines()[-1] if completed.stderr else "failed"
+        }
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def compare(
+    results: list[dict[str, Any]], baseline: list[dict[str, Any]], tolerance: float
+) -> list[str]:
+    """
+    Return a description of every stage that got slower than the baseline by more than tolerance.
+    """
+    baseline_by_key = {entry["key"]: entry for entry in baseline if "stages" in entry}
+    regressions = []
+    for entry in results:
+        previous = baseline_by_key.get(entry["key"])
+        if previous is None or "stages" not in entry:
+            continue
+        for stage, timing in entry["stages"].items():
+            before = previous["stages"].get(stage, {}).get("rtf", 0.0)
+            # ignore the stages that take no measurable time, their relative change is noise
+            if before > 0.001 and timing["rtf"] > before * (1 + tolerance):
+                regressions.append(
+                    f"{entry['key']} {stage}: RTF {before:.3f} -> {timing['rtf']:.3f}"
+                )
+    return regressions
+
+
+def write_csv(results: list[dict[str, Any]], path: Path) -> None:
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(
+            [
+                "model",
+                "device",
+                "threads",
+                "corpus",
+                "audio_s",
+                "wall_s",
+                "rtf",
+                "peak_rss_mb",
+                "model_load_s",
+            ]
+            + [f"{stage}_rtf" for stage in STAGES]
+        )
+        for entry in results:
+            if "stages" not in entry:
+                continue
+            writer.writerow(
+                [
+                    entry["model"],
+                    entry["device"],
+                    entry["threads"],
+                    entry["corpus"],
+                    round(entry["audio_s"], 2),
+                    round(entry["wall_s"], 2),
+                    round(entry["rtf"], 4),
+                    round(entry["peak_rss_mb"], 1),
+                    round(sum(load["seconds"] for load in entry["model_loads"]), 2),
+                ]
+                + [round(entry["stages"][stage]["rtf"], 4) for stage in STAGES]
+            )
+
+
+def print_table(results: list[dict[str, Any]]) -> None:
+    print(
+        f"{'configuration':<40}{'RTF':>8}"
+        + "".join(f"{stage:>14}" for stage in STAGES)
+        + f"{'RSS MB':>10}"
+    )
+    for entry in results:
+        if "stages" not in entry:
+            print(f"{entry['key']:<40} failed: {entry['error']}")
+            continue
+        print(
+            f"{entry['key']:<40}{entry['rtf']:>8.3f}"
+            + "".join(f"{entry['stages'][stage]['rtf']:>14.4f}" for stage in STAGES)
+            + f"{entry['peak_rss_mb']:>10.0f}"
+        )
+
+
+def parse_benchmark_arguments(args: Optional[list[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Real-time factor benchmark of the transcription pipeline"
+    )
+    parser.add_argument(
+        "--models", nargs="+", default=["tiny"], help="models to benchmark, any value of --model"
+    )
+    parser.add_argument("--devices", nargs="+", default=["cpu"], choices=["cpu", "auto"],
+                        help="cpu, or auto for the device app.py selects")
+    parser.add_argument(
+        "--threads", nargs="+", type=int, default=[0], help="torch cpu threads, 0 uses all cores"
+    )
+    parser.add_argument(
+        "--lengths",
+        nargs="*",
+        type=float,
+        default=[],
+        help="lengths in seconds of synthetic recordings made from the test speech, "
+        "the test files are used if no lengths are given",
+    )
+    parser.add_argument(
+        "--extra",
+        nargs=argparse.REMAINDER,
+        default=[],
+        help="further app.py arguments for every run, e.g. --extra --merge_speakers --vad",
+    )
+    parser.add_argument(
+        "--output", type=Path, default=Path("benchmark_results.json"), help="JSON report"
+    )
+    parser.add_argument("--csv", type=Path, default=None, help="also write the report as CSV")
+    parser.add_argument("--baseline", type=Path, default=REPO_ROOT / "benchmarks" / "baseline.json",
+                        help="report to compare against, skipped if the file does not exist")
+    parser.add_argument(
+        "--save_baseline", type=Path, default=None, help="store the report as the new baseline"
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.15,
+        help="allowed relative increase of a stage RTF before it counts as a regression",
+    )
+    parser.add_argument("--run_configuration", type=str, default=None, help=argparse.SUPPRESS)
+    return parser.parse_args(args)
+
+
+def main(args: Optional[list[str]] = None) -> int:
+    args = parse_benchmark_arguments(args)
+    if args.run_configuration:
+        print(json.dumps(run_configuration(json.loads(args.run_configuration))))
+        return 0
+
+    with tempfile.TemporaryDirectory(prefix="transcriber-benchmark-") as work_dir:
+        work_dir = Path(work_dir)
+        if args.lengths:
+            corpora = {
+                f"synthetic_{int(length)}s": [synthetic_audio(length, work_dir)]
+                for length in args.lengths
+            }
+        else:
+            corpora = {"test_files": TEST_AUDIO}
+
+        results = []
+        for model, device, threads, (corpus, files) in product(
+            args.models, args.devices, args.threads, corpora.items()
+        ):
+            config = {
+                "model": model,
+                "device": device,
+                "threads": threads,
+                "corpus": corpus,
+                "files": [str(file) for file in files],
+                "extra": args.extra,
+            }
+            config["output_dir"] = str(work_dir / configuration_key(config).replace("|", "_"))
+            print(f"Running {configuration_key(config)}...", flush=True)
+            result = run_in_subprocess(config)
+            results.append(
+                {
+                    "key": configuration_key(config),
+                    **{k: v for k, v in config.items() if k != "output_dir"},
+                    **result,
+                }
+            )
+
+    print_table(results)
+    args.output.write_text(json.dumps(results, indent=2), encoding="utf-8")
+    if args.csv:
+        write_csv(results, args.csv)
+    if args.save_baseline:
+        args.save_baseline.write_text(json.dumps(results, indent=2), encoding="utf-8")
+
+    if args.baseline.is_file() and args.save_baseline is None:
+        regressions = compare(
+            results, json.loads(args.baseline.read_text(encoding="utf-8")), args.tolerance
+        )
+        for regression in regressions:
+            print(f"Regression: {regression}")
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
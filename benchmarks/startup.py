@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+""" Startup benchmark: time of `app.py --help` and to the first transcribed segment per backend """
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+from time import perf_counter
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+DEFAULT_AUDIO = REPO_ROOT / "tests" / "resources" / "end2end" / "input" / "shorts.m4a"
+
+# Runs in a fresh interpreter, so the import time of the backend is part of the measurement
+FIRST_SEGMENT_SCRIPT = """
+import json, sys
+from time import perf_counter
+start = perf_counter()
+from pathlib import Path
+import torch
+from whispaau.logging import Logger
+from whispaau.transcription import transcribe
+output_dir = Path(sys.argv[3])
+output_dir.mkdir(parents=True, exist_ok=True)
+log = Logger(name="startup", output_dir=output_dir)
+imported = perf_counter()
+result = transcribe(sys.argv[1], Path(sys.argv[2]), {"fp16": False}, torch.device("cpu"), log)
+done = perf_counter()
+first_segment = result["segments"][0]["text"].strip() if result["segments"] else ""
+print(json.dumps({
+    "import_s": imported - start,
+    "first_segment_s": done - start,
+    "first_segment": first_segment,
+}))
+"""
+
+
+def time_help(runs: int) -> list[float]:
+    timings = []
+    for _ in range(runs):
+        start = perf_counter()
+        subprocess.run(
+            [sys.executable, str(REPO_ROOT / "app.py"), "--help"], check=True, capture_output=True
+        )
+        timings.append(perf_counter() - start)
+    return timings
+
+
+def time_first_segment(model_name: str, audio: Path, output_dir: Path) -> dict:
+    completed = subprocess.run(
+        [sys.executable, "-c", FIRST_SEGMENT_SCRIPT, model_name, str(audio), str(output_dir)],
+        check=True,
+        capture_output=True,
+        text=True,
+        env={**os.environ, "PYTHONPATH": str(REPO_ROOT / "src")},
+    )
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def main(args=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=5, help="number of `app.py --help` runs")
+    parser.add_argument(
+        "--models",
+        nargs="*",
+        default=["tiny", "parakeet-tdt-0.6b-v3"],
+        help="one model per backend to time the first segment for, none to skip",
+    )
+    parser.add_argument(
+        "--audio", type=Path, default=DEFAULT_AUDIO, help="audio file to transcribe"
+    )
+    parser.add_argument(
+        "--output_dir", type=Path, default=Path("./benchmark_output"), help="directory for the logs"
+    )
+    args = parser.parse_args(args)
+
+    help_timings = time_help(args.runs)
+    report = {
+        "help_s": {
+            "median": statistics.median(help_timings),
+            "min": min(help_timings),
+            "runs": len(help_timings),
+        },
+        "first_segment": {},
+    }
+    print(
+        f"app.py --help: median {report['help_s']['median']:.3f}s, "
+        f"min {report['help_s']['min']:.3f}s"
+    )
+
+    for model_name in args.models:
+        result = time_first_segment(model_name, args.audio, args.output_dir)
+        report["first_segment"][model_name] = result
+        print(
+            f"{model_name}: import {result['import_s']:.2f}s, "
+            f"first segment {result['first_segment_s']:.2f}s"
+        )
+
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
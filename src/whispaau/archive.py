@@ -3,13 +3,156 @@
 
 """ Functions for archiving files to .zip """
 
-from pyzipper import AESZipFile, ZipFile, BadZipFile, LargeZipFile, ZIP_DEFLATED, WZ_AES
+import hashlib
+import io
+import os
+import threading
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from pyzipper import AESZipFile, ZipFile, BadZipFile, LargeZipFile, ZIP_DEFLATED, ZIP_STORED, WZ_AES
 from pathlib import Path
-from typing import Iterator
+from typing import Iterable, Iterator
 
 
 secret_password = "ss"
 
+# Formats that are compressed already, deflating them again costs time and saves almost nothing
+STORED_SUFFIXES = {".docx", ".zip", ".gz", ".mp3", ".m4a", ".mp4", ".png", ".jpg", ".jpeg"}
+
+
+def _open_archive(file: str | Path | io.BytesIO, secret_password: bytes | None) -> AESZipFile:
+    archive = AESZipFile(file, compression=ZIP_DEFLATED, mode="w")
+    if secret_password is not None:
+        archive.setpassword(secret_password)
+        archive.setencryption(WZ_AES, nbits=128)
+    return archive
+
+
+def _compress_entry(path: Path, arcname: str, secret_password: bytes | None):
+    """
+    Compress and encrypt one file into a zip archive in memory, the archive holds only this entry.
+    Returns the entry information, the bytes of the entry, local header and data, to be copied into
+    the job archive, and the SHA-256 checksum of the file.
+    """
+    buffer = io.BytesIO()
+    checksum = hashlib.sha256()
+    with _open_archive(buffer, secret_password) as entry_archive:
+        # like AESZipFile.write, the checksum is computed while the file is read
+        info = entry_archive.zipinfo_cls.from_file(path, arcname)
+        info.compress_type = ZIP_STORED if path.suffix.lower() in STORED_SUFFIXES else ZIP_DEFLATED
+        with open(path, "rb") as source, entry_archive.open(info, "w") as entry:
+            while block := source.read(1024 * 1024):
+                checksum.update(block)
+                entry.write(block)
+        data = buffer.getvalue()[:entry_archive.start_dir]
+    return info, data, checksum.hexdigest()
+
+
+class ArchiveBuilder:
+    """
+    Builds the zip archive of a job while the job runs. add() compresses and encrypts the
+    files in a thread pool, the entries are appended to the archive in the order the files
+    were added as soon as they are ready.
+    The archive is complete, and readable with pyzipper, once close() returns.
+    """
+
+    def __init__(
+        self,
+        jobname: Path,
+        output_file: Path,
+        secret_password: str | None = None,
+        max_workers: int | None = None,
+    ):
+        self.jobname = jobname
+        self.output_file = output_file
+        self.password = bytes(secret_password, "utf-8") if secret_password is not None else None
+        self.archive = _open_archive(output_file, self.password)
+        max_workers = max_workers or min(8, os.cpu_count() or 1)
+        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+        self.pending: deque[Future] = deque()
+        # the compressed entries are held in memory until they are appended, add() waits for
+        # the oldest entry when more are in flight, so a slow archive does not keep the
+        # outputs of the whole job in memory
+        self.max_pending = 2 * max_workers
+        self.names: set[str] = set()
+        # the size and SHA-256 checksum of every file in the archive, by file name
+        self.checksums: dict[str, tuple[int, str]] = {}
+        self.lock = threading.Lock()
+
+    def __enter__(self) -> "ArchiveBuilder":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+    def add(self, paths: Iterable[Path]) -> None:
+        """
+        Compress the files in the background, files that are in the archive already are skipped.
+        """
+        with self.lock:
+            for path in paths:
+                arcname = (self.jobname / path.name).as_posix()
+                if arcname in self.names or path.resolve() == self.output_file.resolve():
+                    # added already, or the archive itself
+                    continue
+                self.names.add(arcname)
+                self.pending.append(
+                    self.executor.submit(_compress_entry, path, arcname, self.password)
+                )
+                while len(self.pending) > self.max_pending:
+                    self._append_next()
+            self._append_entries(wait=False)
+
+    def flush(self) -> None:
+        """Wait until all the files that were added are in the archive."""
+        with self.lock:
+            self._append_entries(wait=True)
+
+    def close(self) -> None:
+        """Wait for all the files that were added and complete the archive."""
+        with self.lock:
+            try:
+                self._append_entries(wait=True)
+            finally:
+                self.executor.shutdown()
+                self.archive.close()
+
+    def abort(self) -> None:
+        """Stop building the archive and remove the incomplete file."""
+        with self.lock:
+            for future in self.pending:
+                future.cancel()
+            self.pending.clear()
+            self.executor.shutdown()
+            self.archive.close()
+            self.output_file.unlink(missing_ok=True)
+
+    def _append_entries(self, wait: bool) -> None:
+        # the entries keep the order of add(), an entry waits for the entries added before it
+        while self.pending and (wait or self.pending[0].done()):
+            self._append_next()
+
+    def _append_next(self) -> None:
+        try:
+            self._append_entry(*self.pending.popleft().result())
+        except (BadZipFile, LargeZipFile):
+            print(f"Zip Archive: {self.output_file} failed to be created.")
+
+    def _append_entry(self, info, data: bytes, checksum: str) -> None:
+        # the local header holds no offsets, the entry is copied as it
+        # is and only its offset changes
+        archive = self.archive
+        self.checksums[Path(info.filename).name] = (info.file_size, checksum)
+        info.header_offset = archive.fp.tell()
+        archive.fp.write(data)
+        archive.start_dir = archive.fp.tell()
+        archive.filelist.append(info)
+        archive.NameToInfo[info.filename] = info
+        archive._didModify = True
+
 
 def archiving(
     jobname: Path,
@@ -17,17 +160,8 @@ def archiving(
     paths: Iterator[Path],
     secret_password: str | None = None,
 ) -> None:
-    with AESZipFile(output_file, compression=ZIP_DEFLATED, mode="w") as archive:
-        if secret_password is not None:
-            secret_password = bytes(secret_password, "utf-8")
-            archive.setpassword(secret_password)
-            archive.setencryption(WZ_AES, nbits=128)
-
-        try:
-            for file in paths:
-                archive.write(file, arcname=jobname / file.name)
-        except (BadZipFile, LargeZipFile):
-            print(f"Zip Archive: {output_file} failed to be created.")
+    with ArchiveBuilder(jobname, output_file, secret_password) as archive:
+        archive.add(paths)
 
 
 if __name__ == "__main__":
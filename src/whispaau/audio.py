@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+""" Decode an input file once into the waveform used by transcription, alignment and diarization """
+
+import subprocess
+from pathlib import Path
+from typing import NamedTuple
+
+import numpy as np
+
+# All the models (whisper, parakeet, wav2vec2 alignment and pyannote) expect 16kHz mono audio
+SAMPLE_RATE = 16000
+
+
+class AudioData(NamedTuple):
+    """A decoded input file: 16kHz mono float32 samples and the duration in seconds."""
+    samples: np.ndarray
+    sample_rate: int
+    duration: float
+
+
+def load_audio(file: Path, sample_rate: int = SAMPLE_RATE) -> AudioData:
+    """
+    Decode the file with ffmpeg, down-mixing to mono and resampling as necessary.
+    Raises a RuntimeError if ffmpeg is unable to decode the file.
+    """
+    command = [
+        "ffmpeg",
+        "-nostdin",
+        "-threads", "0",
+        "-i", file.resolve().as_posix(),
+        "-f", "s16le",
+        "-ac", "1",
+        "-acodec", "pcm_s16le",
+        "-ar", str(sample_rate),
+        "-",
+    ]
+    try:
+        out = subprocess.run(command, capture_output=True, check=True).stdout
+    except subprocess.CalledProcessError as e:
+        raise RuntimeError(f"Failed to load audio: {e.stderr.decode()}") from e
+
+    # convert in place to avoid holding an extra full length copy of the waveform
+    samples = np.frombuffer(out, np.int16).astype(np.float32)
+    samples *= 1.0 / 32768.0
+    return AudioData(samples=samples, sample_rate=sample_rate, duration=len(samples) / sample_rate)
@@ -5,9 +5,9 @@
 from pathlib import Path
 from typing import Optional, Any
 import argparse
-import ffmpeg
 from datetime import datetime
 from whisperx.utils import optional_int
+from whispaau.probe import probe
 
 
 def get_directory(input_dir: str):
@@ -24,8 +24,7 @@ class FileWrongFormat(Exception):
 
 
 def file_duration(file_path: Path) -> float:
-    info = ffmpeg.probe(file_path)
-    return float(info["format"]["duration"])
+    return probe(file_path).duration
 
 
 def format_spend_time(start: int, end: int) -> str:
@@ -51,7 +50,12 @@ def aggregate_paths(file_paths: list[Path], directory_paths: list[Path]) -> set[
 def parse_arguments(args: Optional[list[Any]] = None) -> dict[str, Any]:
     parser = argparse.ArgumentParser()
     parser.add_argument(
-        "-m", "--model", default="large", type=str, help="what model is used?"
+        "-m",
+        "--model",
+        default="large",
+        type=str,
+        help="what model is used? prefix a whisper model with faster- to use faster-whisper, "
+        "e.g. faster-large-v3",
     )
     parser.add_argument(
         "--no-mps",
@@ -80,6 +84,28 @@ def parse_arguments(args: Optional[list[Any]] = None) -> dict[str, Any]:
         required=False,
         help="file for transcribing",
     )
+    parser.add_argument(
+        "--stream",
+        type=str,
+        default=None,
+        help="transcribe a live audio stream from stdin (-) or a named pipe while it is recorded, "
+        "needs a parakeet model",
+    )
+    parser.add_argument(
+        "--stream_format",
+        type=str,
+        default="ffmpeg",
+        choices=["ffmpeg", "pcm"],
+        help="ffmpeg decodes any audio stream, "
+        "pcm reads raw 16kHz mono 16 bit little endian samples",
+    )
+    parser.add_argument(
+        "--latency",
+        type=float,
+        default=10.0,
+        help="seconds of audio transcribed at a time when streaming, "
+        "the text lags about one to two times behind",
+    )
     parser.add_argument(
         "-o",
         "--output_dir",
@@ -103,6 +129,67 @@ def parse_arguments(args: Optional[list[Any]] = None) -> dict[str, Any]:
         default=0,
         help="number of threads used by torch for cpu inference",
     )
+    parser.add_argument(
+        "--vad",
+        action="store_true",
+        default=False,
+        help="detect speech first and skip long silences during transcription and diarization",
+    )
+    parser.add_argument(
+        "--batch_size",
+        "--batch-size",
+        type=optional_int,
+        default=0,
+        help="number of audio chunks transcribed together by parakeet, "
+        "0 chooses from the available memory",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        default=False,
+        help="disables the cache of transcription, alignment and diarization results, "
+        "it is always off with --archive_password",
+    )
+    parser.add_argument(
+        "--cache_size_mb",
+        type=optional_int,
+        default=2048,
+        help="size of the result cache in MB, the least recently used results are removed",
+    )
+    parser.add_argument(
+        "--quantize",
+        type=str,
+        default="none",
+        choices=["none", "int8"],
+        help="dynamic int8 quantization of the linear layers "
+        "of the whisper and parakeet models on the CPU",
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        default=False,
+        help="skip the files that an earlier run of the job completed, "
+        "retry the others and rebuild the archive",
+    )
+    parser.add_argument(
+        "--log_stages",
+        action="store_true",
+        help="write the wall time, cpu time and peak memory of every stage to stages.jsonl "
+        "and a summary to the log",
+    )
+    parser.add_argument(
+        "--workers",
+        type=optional_int,
+        default=1,
+        help="number of files processed in parallel by worker processes, "
+        "the threads are split between them",
+    )
+    parser.add_argument(
+        "--model_cache_mb",
+        type=optional_int,
+        default=0,
+        help="memory budget in MB for cached alignment models, 0 keeps the two most recent",
+    )
     parser.add_argument(
         "--output_format",
         type=str,
@@ -156,8 +243,8 @@ def parse_arguments(args: Optional[list[Any]] = None) -> dict[str, Any]:
     )  # added to catch empty requests through shell script
 
     args = parser.parse_args(args)
-    if not (args.input_dir or args.input):
-        parser.error("At least one of -d or -i is required.")
+    if not (args.input_dir or args.input or args.stream):
+        parser.error("At least one of -d, -i or --stream is required.")
     args = vars(args)
 
     args["input"] = aggregate_paths(args.get("input"), args.get("input_dir"))
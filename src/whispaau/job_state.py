@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+""" The state of every input file of a job, so that an interrupted job can be resumed """
+
+import json
+import os
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Iterator
+
+from whispaau.result_cache import hash_file
+
+PENDING = "pending"
+DONE = "done"
+FAILED = "failed"
+
+
+def job_state_path(output_dir: Path, job_name: str) -> Path:
+    return output_dir / f"{job_name}.state.json"
+
+
+class JobState:
+    """
+    Records the status, content hash and output files of every input file of
+    a job in the output directory.
+    The file is rewritten after every change, so it is up to date when the job is
+    killed. A resumed job skips the files that are done with the same settings and
+    content and whose outputs still exist.
+    """
+
+    def __init__(self, output_dir: Path, job_name: str, settings_key: str):
+        self.output_dir = output_dir
+        self.job_name = job_name
+        self.settings_key = settings_key
+        self.path = job_state_path(output_dir, job_name)
+        self.files: dict[str, dict[str, Any]] = {}
+        self.lock = threading.Lock()
+
+    def load(self) -> bool:
+        """
+        Read the state of an earlier run, returns False if there is none or
+        it was run with other settings.
+        """
+        try:
+            state = json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return False
+        if state.get("settings") != self.settings_key:
+            return False
+        self.files = state.get("files", {})
+        return True
+
+    def completed(self, files: list[Path]) -> dict[Path, list[Path]]:
+        """The files that are done already, with their outputs."""
+        completed = {}
+        for file in files:
+            entry = self.files.get(str(file))
+            if entry is None or entry["status"] != DONE:
+                continue
+            outputs = [self.output_dir / name for name in entry["outputs"]]
+            if all(path.is_file() for path in outputs) and self._unchanged(file, entry):
+                completed[file] = outputs
+        return completed
+
+    def start(self, files: list[Path]) -> None:
+        """Mark the files that will be processed as pending."""
+        with self.lock:
+            for file in files:
+                self.files[str(file)] = {"status": PENDING, "updated": _now()}
+            self._write()
+
+    def done(self, file: Path, outputs: list[Path]) -> None:
+        stat = file.stat()
+        entry = {
+            "status": DONE,
+            "content_hash": hash_file(file),
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "outputs": [path.name for path in outputs],
+            "updated": _now(),
+        }
+        with self.lock:
+            self.files[str(file)] = entry
+            self._write()
+
+    def failed(self, file: Path, error: str) -> None:
+        with self.lock:
+            self.files[str(file)] = {"status": FAILED, "error": error, "updated": _now()}
+            self._write()
+
+    def error(self, file: Path, error: BaseException) -> None:
+        """Record the file as failed with the exception that was raised while it was processed."""
+        self.failed(file, f"{type(error).__name__}: {error}")
+
+    @contextmanager
+    def track(self, file: Path) -> Iterator[None]:
+        """Record the file as failed if processing it raises, the exception is passed on."""
+        try:
+            yield
+        except Exception as error:
+            self.error(file, error)
+            raise
+
+    def _unchanged(self, file: Path, entry: dict[str, Any]) -> bool:
+        try:
+            stat = file.stat()
+        except OSError:
+            return False
+        if stat.st_size != entry.get("size"):
+            return False
+        # the content is only hashed again if the file was touched
+        return (
+            stat.st_mtime_ns == entry.get("mtime_ns")
+            or hash_file(file) == entry.get("content_hash")
+        )
+
+    def _write(self) -> None:
+        state = {"job_name": self.job_name, "settings": self.settings_key, "files": self.files}
+        # write to a temporary file and rename it, so a killed job never leaves a partial state file
+        temporary = self.path.with_name(f"{self.path.name}.tmp")
+        temporary.write_text(json.dumps(state, indent=2, ensure_ascii=False), encoding="utf-8")
+        os.replace(temporary, self.path)
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat(timespec="seconds")
@@ -3,27 +3,91 @@
 
 """ Setup logging class for CLI """
 
+import json
 import logging
+import logging.handlers
+import os
 import sys
+import threading
+import uuid
+from contextlib import contextmanager, nullcontext
+from datetime import datetime, timedelta
 from pathlib import Path
-from time import perf_counter_ns
-from typing import Iterable, Sized
+from time import perf_counter_ns, process_time_ns, thread_time_ns, time
+from typing import Iterable, Iterator, Optional, Sized
 
-from .cli_utils import format_spend_time, file_duration
+from .cli_utils import format_spend_time
+from .probe import probe
+
+try:
+    import resource
+except ImportError:
+    # not available on Windows, the spans are recorded without the memory high-water mark
+    resource = None
+
+
+def format_seconds(seconds: float) -> str:
+    """Hours, minutes and seconds, e.g. 1:02:03."""
+    return str(timedelta(seconds=round(seconds)))
+
+
+# Returned by Logger.stage when the stage spans are disabled
+_NO_SPAN = nullcontext()
+
+
+def max_rss_mb() -> Optional[float]:
+    """
+    The high-water mark of the resident memory of this process since it started, it never decreases.
+    None where the resource module is not available.
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # bytes on macOS and kilobytes on linux
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def current_rss_mb() -> Optional[float]:
+    """The resident memory of this process now, None where /proc is not available, e.g. on macOS."""
+    try:
+        with open("/proc/self/statm", encoding="ascii") as f:
+            resident_pages = int(f.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return None
+    return resident_pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
 
 
 class Logger:
-    def __init__(self, name: str, output_dir: Path, verbose=False):
+    def __init__(self, name: str, output_dir: Path, verbose=False, log_queue=None, log_stages=False,
+                 run_id: Optional[str] = None):
         # Create a logger
         self.name = name
         self.handlers = []
         self.output_dir: Path = output_dir
         self.verbose: bool = verbose
+        # a logger in a worker process sends its records to the parent process through the queue
+        self.log_queue = log_queue
         self.logger = self._build_logger()
+        # the stage spans are appended to stages.jsonl, the run id tells the spans of
+        # this job apart from earlier jobs with the same output directory, the worker
+        # loggers share the id of the parent
+        self.log_stages: bool = log_stages
+        self.run_id: str = run_id or uuid.uuid4().hex
+        self.stages_file: Path = self.output_dir / "stages.jsonl"
+        self._stages_lock = threading.Lock()
 
     def _build_logger(self):
         _logger = logging.getLogger(self.name)
         _logger.setLevel(logging.DEBUG)
+        # a long-running process (e.g. the server) can run several jobs with the same name,
+        # drop the handlers of the previous job so its log file is closed and not written again
+        for handler in list(_logger.handlers):
+            _logger.removeHandler(handler)
+            handler.close()
+
+        if self.log_queue is not None:
+            _logger.addHandler(logging.handlers.QueueHandler(self.log_queue))
+            return _logger
 
         file_handler = self.get_file_handler(self.output_dir / "transcribe.log")
         _logger.addHandler(file_handler)
@@ -67,8 +131,11 @@ class Logger:
         self.logger.debug("Processing #%s..", len(files))
         self.flush_stdout()
 
-    def log_file_start(self, file: Path, device, model_name: str):
-        duration: float = file_duration(file)
+    def log_file_start(self, file: Path, device, model_name: str, duration: float | None = None):
+        # only probe the file when the caller has not already decoded it, it is
+        # usually cached by the schedule
+        if duration is None:
+            duration = probe(file).duration
         self.logger.debug(
             "Starting %s duration: %d seconds on device: %s model: %s",
             file.name,
@@ -78,6 +145,12 @@ class Logger:
         )
         self.flush_stdout()
 
+    def log_speech_detected(self, speech_duration: float, duration: float):
+        self.logger.debug(
+            "Voice activity detection found %d of %d seconds of speech", speech_duration, duration
+        )
+        self.flush_stdout()
+
     def log_file_end(self, file: Path, start_time: int, end_time: int):
         self.logger.debug(
             "Processed %s it took %s",
@@ -90,6 +163,150 @@ class Logger:
         self.logger.debug("%s is finished", filename)
         self.flush_stdout()
 
+    def log_schedule(self, files: int, audio_s: float, predicted_s: float):
+        self.logger.debug(
+            "Scheduled %s files with %s of audio, longest first", files, format_seconds(audio_s)
+        )
+        self.log_prediction(files, predicted_s)
+
+    def log_prediction(self, remaining_files: int, predicted_s: float):
+        finish = datetime.now() + timedelta(seconds=predicted_s)
+        self.logger.debug(
+            "Predicted completion at %s, in %s with %s files remaining",
+            finish.strftime("%Y-%m-%d %H:%M:%S"),
+            format_seconds(predicted_s),
+            remaining_files,
+        )
+        self.flush_stdout()
+
+    def log_workers(self, workers: int, threads: int):
+        self.logger.debug("Workers initialised: %s with %s threads each", workers, threads)
+        self.flush_stdout()
+
+    def stage(self, stage: str, file: Optional[Path] = None, audio_s: Optional[float] = None):
+        """
+        Context manager that measures the wall time, process CPU time and peak RSS of a stage of the
+        job and appends them as a JSON line to stages.jsonl. Does nothing unless log_stages is set.
+        The span dict is the target of the with statement (None when disabled), e.g. to set audio_s
+        once the audio is decoded.
+        """
+        if not self.log_stages:
+            return _NO_SPAN
+        return self._span(stage, file, audio_s)
+
+    @contextmanager
+    def _span(self, stage: str, file: Optional[Path], audio_s: Optional[float]) -> Iterator[dict]:
+        span = {
+            "run": self.run_id,
+            "job": self.name,
+            "stage": stage,
+            "file": file.name if file is not None else None,
+            "started": round(time(), 3),
+            "audio_s": audio_s,
+            "ok": False,
+            "pid": os.getpid(),
+        }
+        start_time = perf_counter_ns()
+        start_process_cpu = process_time_ns()
+        start_thread_cpu = thread_time_ns()
+        start_rss = current_rss_mb()
+        try:
+            yield span
+            span["ok"] = True
+        finally:
+            span["wall_s"] = round((perf_counter_ns() - start_time) / 1e9, 4)
+            # the cpu time of the thread that ran the stage, without the threads it
+            # started, e.g. the torch threads
+            span["thread_cpu_s"] = round((thread_time_ns() - start_thread_cpu) / 1e9, 4)
+            # the cpu time of all the threads of the process while the stage was open, this
+            # includes the torch threads but also the stages that ran at the same time, e.g.
+            # decoding and writing in the pipeline
+            span["process_cpu_s"] = round((process_time_ns() - start_process_cpu) / 1e9, 4)
+            # the resident memory at the end of the stage and how much it grew during
+            # the stage, None without /proc
+            rss = current_rss_mb()
+            span["rss_mb"] = round(rss, 1) if rss is not None else None
+            span["rss_delta_mb"] = (
+                round(rss - start_rss, 1) if rss is not None and start_rss is not None else None
+            )
+            # the high-water mark of the process so far, not of the stage
+            max_rss = max_rss_mb()
+            span["max_rss_mb"] = round(max_rss, 1) if max_rss is not None else None
+            if span["audio_s"] is not None:
+                span["audio_s"] = round(span["audio_s"], 3)
+            line = json.dumps(span) + "\n"
+            # one write per line in append mode, so worker processes can share the file
+            with self._stages_lock, open(self.stages_file, "a", encoding="utf-8") as f:
+                f.write(line)
+
+    def read_stages(self) -> list[dict]:
+        """The stage spans of this job, including the spans of its worker processes."""
+        if not self.stages_file.is_file():
+            return []
+        with open(self.stages_file, encoding="utf-8") as f:
+            spans = [json.loads(line) for line in f if line.strip()]
+        return [span for span in spans if span.get("run") == self.run_id]
+
+    def log_stage_summary(self):
+        if not self.log_stages:
+            return
+        totals: dict[str, dict] = {}
+        max_rss = None
+        for span in self.read_stages():
+            total = totals.setdefault(
+                span["stage"],
+                {
+                    "count": 0,
+                    "wall_s": 0.0,
+                    "thread_cpu_s": 0.0,
+                    "process_cpu_s": 0.0,
+                    "audio_s": 0.0,
+                    "rss_mb": None,
+                    "rss_delta_mb": None,
+                },
+            )
+            total["count"] += 1
+            total["wall_s"] += span["wall_s"]
+            total["thread_cpu_s"] += span["thread_cpu_s"]
+            total["process_cpu_s"] += span["process_cpu_s"]
+            total["audio_s"] += span["audio_s"] or 0.0
+            # the largest memory at the end of a stage and the largest growth during a stage
+            for key in ("rss_mb", "rss_delta_mb"):
+                if span[key] is not None:
+                    total[key] = span[key] if total[key] is None else max(total[key], span[key])
+            if span["max_rss_mb"] is not None:
+                max_rss = (
+                    span["max_rss_mb"] if max_rss is None else max(max_rss, span["max_rss_mb"])
+                )
+
+        lines = [
+            f"{'stage':<16}{'count':>6}{'wall s':>10}{'thread cpu s':>14}{'proc cpu s':>12}"
+            f"{'audio s':>10}{'RTF':>8}{'RSS MB':>9}{'+RSS MB':>9}"
+        ]
+        for stage, total in totals.items():
+            rtf = f"{total['wall_s'] / total['audio_s']:.3f}" if total["audio_s"] else "-"
+            rss = f"{total['rss_mb']:.0f}" if total["rss_mb"] is not None else "-"
+            rss_delta = f"{total['rss_delta_mb']:.0f}" if total["rss_delta_mb"] is not None else "-"
+            lines.append(
+                f"{stage:<16}{total['count']:>6}{total['wall_s']:>10.2f}"
+                f"{total['thread_cpu_s']:>14.2f}{total['process_cpu_s']:>12.2f}"
+                f"{total['audio_s']:>10.1f}{rtf:>8}{rss:>9}{rss_delta:>9}"
+            )
+        if max_rss is not None:
+            lines.append(f"max RSS of the job: {max_rss:.0f} MB")
+        self.logger.debug("Stage summary:\n%s", "\n".join(lines))
+        self.flush_stdout()
+
+    def listen(self, log_queue) -> logging.handlers.QueueListener:
+        """
+        Write the records that worker processes put on the queue with the handlers of this logger.
+        """
+        listener = logging.handlers.QueueListener(
+            log_queue, *self.logger.handlers, respect_handler_level=True
+        )
+        listener.start()
+        return listener
+
     def get_logger(self):
         return self.logger
 
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+""" The manifest of the files written by a job, it decides what goes into the archive """
+
+import json
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Iterable
+
+MANIFEST_NAME = "manifest.json"
+
+
+class Manifest:
+    """
+    The output files of a job with the input file and the model they were written for.
+    The writers report the files they write, so the archive holds exactly these files and no
+    stale files that happen to match a pattern. write() stores the manifest with the size and
+    SHA-256 checksum of every file.
+    """
+
+    def __init__(self, output_dir: Path, job_name: str):
+        self.output_dir = output_dir
+        self.job_name = job_name
+        self.path = output_dir / MANIFEST_NAME
+        self.files: dict[str, dict[str, Any]] = {}
+
+    def add(self, paths: Iterable[Path], source: str, model: str) -> None:
+        for path in paths:
+            self.files[path.name] = {"name": path.name, "source": source, "model": model}
+
+    def merge_previous(self, models: Iterable[str] = ()) -> list[Path]:
+        """
+        Add the files of the manifest of an earlier job in the output directory that still exist
+        and were not written again by this job, e.g. the runs with other models in the
+        transcriber GUI. Returns their paths.
+        Runs from before the manifest have none, their files are found by the
+        model names in the file names.
+        """
+        try:
+            previous = json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return self._merge_by_model(models)
+        paths = []
+        for entry in previous.get("files", []):
+            path = self.output_dir / entry["name"]
+            if entry["name"] not in self.files and path.is_file():
+                self.files[entry["name"]] = {
+                    key: entry[key] for key in ("name", "source", "model") if key in entry
+                }
+                paths.append(path)
+        return paths
+
+    def _merge_by_model(self, models: Iterable[str]) -> list[Path]:
+        found = {}
+        for model in models:
+            for path in self.output_dir.glob(f"*_{model}*"):
+                skipped = (
+                    path.suffix == ".zip"
+                    or path.name.endswith(".state.json")
+                    or path.name == MANIFEST_NAME
+                )
+                if path.is_file() and not skipped and path.name not in self.files:
+                    found.setdefault(path, model)
+        paths = sorted(found)
+        for path in paths:
+            self.files[path.name] = {"name": path.name, "model": found[path]}
+        return paths
+
+    def paths(self) -> list[Path]:
+        return [self.output_dir / name for name in self.files]
+
+    def write(self, checksums: dict[str, tuple[int, str]]) -> Path:
+        """
+        Write the manifest, checksums holds the size and checksum of the
+        files by name, see ArchiveBuilder.
+        """
+        files = []
+        for name, entry in self.files.items():
+            size, checksum = checksums.get(name, (None, None))
+            files.append({**entry, "size": size, "sha256": checksum})
+        manifest = {
+            "job_name": self.job_name,
+            "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "files": files,
+        }
+        self.path.write_text(json.dumps(manifest, indent=2, ensure_ascii=False), encoding="utf-8")
+        return self.path
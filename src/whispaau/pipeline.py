@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+""" Three stage pipeline overlapping decoding and writing with the model inference """
+
+import queue
+import threading
+from typing import Any, Callable, Iterable
+
+# sentinel put on a queue when a stage has no more items
+_DONE = object()
+# sentinel returned when the pipeline is shutting down because a stage failed
+_STOPPED = object()
+
+
+class _Failure:
+    def __init__(self, error: BaseException):
+        self.error = error
+
+
+def run_pipeline(
+    items: Iterable[Any],
+    prepare: Callable[[Any], Any],
+    process: Callable[[Any, Any], Any],
+    finish: Callable[[Any, Any, Any], Any],
+    queue_size: int = 1,
+) -> list[Any]:
+    """
+    Run prepare, process and finish for every item, with the stages overlapping in time.
+    prepare runs ahead on a background thread, process runs on the calling thread (where the
+    models live) and finish runs behind on a background thread. The bounded queues between the
+    stages limit how many prepared and processed items are held in memory at once. Items for which
+    prepare returns None are skipped.
+    Returns the results of finish in the order of items. An exception in any stage stops
+    the pipeline and is raised on the calling thread, after the items that were
+    processed already are finished.
+    """
+    stop = threading.Event()
+    prepared_queue: queue.Queue = queue.Queue(maxsize=queue_size)
+    processed_queue: queue.Queue = queue.Queue(maxsize=queue_size)
+    finished: list[Any] = []
+    finish_errors: list[BaseException] = []
+
+    def put(target: queue.Queue, value: Any) -> bool:
+        while not stop.is_set():
+            try:
+                target.put(value, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def get(source: queue.Queue) -> Any:
+        while not stop.is_set():
+            try:
+                return source.get(timeout=0.1)
+            except queue.Empty:
+                continue
+        return _STOPPED
+
+    def prefetch_stage():
+        try:
+            for item in items:
+                prepared = prepare(item)
+                if prepared is not None and not put(prepared_queue, (item, prepared)):
+                    return
+        except BaseException as e:
+            put(prepared_queue, _Failure(e))
+            return
+        put(prepared_queue, _DONE)
+
+    def finish_stage():
+        while True:
+            entry = get(processed_queue)
+            if entry is _DONE or entry is _STOPPED:
+                return
+            try:
+                finished.append(finish(*entry))
+            except BaseException as e:
+                finish_errors.append(e)
+                stop.set()
+                return
+
+    prefetch_thread = threading.Thread(target=prefetch_stage, name="pipeline-prefetch", daemon=True)
+    finish_thread = threading.Thread(target=finish_stage, name="pipeline-finish", daemon=True)
+    prefetch_thread.start()
+    finish_thread.start()
+
+    try:
+        while True:
+            entry = get(prepared_queue)
+            if entry is _DONE or entry is _STOPPED:
+                break
+            if isinstance(entry, _Failure):
+                raise entry.error
+            item, prepared = entry
+            processed = process(item, prepared)
+            if not put(processed_queue, (item, prepared, processed)):
+                break
+    finally:
+        # let the finish stage drain the remaining items, also when a stage failed: the
+        # items processed before the failure are still finished, and finish is not running
+        # any more when the error is raised
+        put(processed_queue, _DONE)
+        finish_thread.join()
+        stop.set()
+        prefetch_thread.join()
+
+    if finish_errors:
+        raise finish_errors[0]
+    return finished
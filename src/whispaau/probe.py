@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+""" Reads the duration, codec, channels and sample rate of media files, cached and in parallel """
+
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import NamedTuple, Optional
+
+import ffmpeg
+
+# Formats whose header holds the exact number of frames, they are read in-process by
+# soundfile. The duration of the other formats, e.g. m4a and mp3, is only exact in the
+# container, they are probed with ffprobe.
+HEADER_SUFFIXES = {".wav", ".flac", ".ogg"}
+
+
+class MediaInfo(NamedTuple):
+    """The properties of the first audio stream of a media file."""
+    duration: float
+    codec: str | None = None
+    channels: int | None = None
+    sample_rate: int | None = None
+
+
+# The probed files by path, modification time and size
+_cache: dict[tuple[str, int, int], MediaInfo] = {}
+_cache_lock = threading.Lock()
+
+
+def probe(file: Path) -> MediaInfo:
+    """
+    Probe the file, from its header when the format allows it and with ffprobe otherwise.
+    The result is cached until the file is modified, raises like ffmpeg.probe
+    if the file can not be probed.
+    """
+    stat = os.stat(file)
+    key = (str(file), stat.st_mtime_ns, stat.st_size)
+    with _cache_lock:
+        info = _cache.get(key)
+    if info is None:
+        info = _probe_header(file) if Path(file).suffix.lower() in HEADER_SUFFIXES else None
+        if info is None:
+            info = _probe_ffprobe(file)
+        with _cache_lock:
+            _cache[key] = info
+    return info
+
+
+def probe_files(files: list[Path], max_workers: int = 8) -> dict[Path, Optional[MediaInfo]]:
+    """Probe the files in parallel, a file that could not be probed is None."""
+    def try_probe(file: Path) -> Optional[MediaInfo]:
+        try:
+            return probe(file)
+        except Exception:
+            return None
+
+    if not files:
+        return {}
+    # ffprobe runs in a subprocess, the threads only wait for it
+    with ThreadPoolExecutor(
+        max_workers=min(max_workers, len(files), os.cpu_count() or 1)
+    ) as executor:
+        return dict(zip(files, executor.map(try_probe, files)))
+
+
+def clear_cache() -> None:
+    with _cache_lock:
+        _cache.clear()
+
+
+def _probe_header(file: Path) -> MediaInfo | None:
+    try:
+        import soundfile
+        info = soundfile.info(str(file))
+    except Exception:
+        # not readable by libsndfile, ffprobe decides
+        return None
+    return MediaInfo(
+        info.frames / info.samplerate, info.subtype.lower(), info.channels, info.samplerate
+    )
+
+
+def _probe_ffprobe(file: Path) -> MediaInfo:
+    info = ffmpeg.probe(file)
+    stream = next(
+        (stream for stream in info.get("streams", []) if stream.get("codec_type") == "audio"), {}
+    )
+    return MediaInfo(
+        float(info["format"]["duration"]),
+        stream.get("codec_name"),
+        int(stream["channels"]) if "channels" in stream else None,
+        int(stream["sample_rate"]) if "sample_rate" in stream else None,
+    )
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+""" Keyed caches for the alignment and diarization models shared across input files """
+
+import gc
+import sys
+from collections import OrderedDict
+from time import perf_counter_ns
+from typing import Any, Callable, Hashable, Optional, Tuple
+
+import whisperx
+
+from whispaau.logging import Logger
+from whispaau.utils import get_align_models
+
+
+def estimate_model_bytes(obj: Any, _seen: Optional[set] = None) -> int:
+    """Best effort estimate of the memory held by the parameters and buffers of a loaded model."""
+    seen = _seen if _seen is not None else set()
+    if obj is None or id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+
+    # duck typed torch.nn.Module, so that the registry does not need to import torch itself
+    if callable(getattr(obj, "parameters", None)) and callable(getattr(obj, "buffers", None)):
+        tensors = list(obj.parameters()) + list(obj.buffers())
+        return sum(tensor.numel() * tensor.element_size() for tensor in tensors)
+    if isinstance(obj, (tuple, list)):
+        return sum(estimate_model_bytes(item, seen) for item in obj)
+    if isinstance(obj, dict):
+        return sum(estimate_model_bytes(item, seen) for item in obj.values())
+
+    # wrappers like the whisperx DiarizationPipeline keep the actual networks as attributes
+    size = 0
+    for attribute in ("model", "_models"):
+        size += estimate_model_bytes(getattr(obj, attribute, None), seen)
+    return size
+
+
+class ModelRegistry:
+    """
+    Least recently used cache of loaded models.
+    Models are evicted when more than max_entries models are resident or when the estimated
+    size of the resident models exceeds max_bytes. A limit of 0 disables that limit.
+    The most recently requested model is never evicted.
+    """
+
+    def __init__(self, max_entries: int = 0, max_bytes: int = 0):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict[Hashable, Tuple[Any, int]] = OrderedDict()
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def total_bytes(self) -> int:
+        return sum(size for _, size in self._entries.values())
+
+    def get(self, key: Hashable, loader: Callable[[], Any]) -> Any:
+        if key in self._entries:
+            self._entries.move_to_end(key)
+            return self._entries[key][0]
+
+        model = loader()
+        self._entries[key] = (model, estimate_model_bytes(model))
+        self._evict()
+        return model
+
+    def clear(self) -> None:
+        self._entries.clear()
+        _release_memory()
+
+    def _evict(self) -> None:
+        evicted = False
+        while len(self._entries) > 1 and (
+            (self.max_entries and len(self._entries) > self.max_entries)
+            or (self.max_bytes and self.total_bytes > self.max_bytes)
+        ):
+            self._entries.popitem(last=False)
+            evicted = True
+        if evicted:
+            _release_memory()
+
+
+def _release_memory() -> None:
+    gc.collect()
+    # the models were loaded with torch, if it has not been imported there is nothing to release
+    torch = sys.modules.get("torch")
+    if torch is not None and torch.cuda.is_available():
+        torch.cuda.empty_cache()
+
+
+# Keep at most two alignment models resident, a multilingual batch then only reloads
+# when switching between more than two languages.
+_align_model_cache = ModelRegistry(max_entries=2)
+# The diarization pipeline does not depend on the language, one instance is enough.
+_diarize_model_cache = ModelRegistry(max_entries=1)
+
+
+def set_model_memory_budget(max_bytes: int) -> None:
+    """Limit the estimated memory held by the cached alignment models, 0 disables the limit."""
+    _align_model_cache.max_bytes = max_bytes
+    _align_model_cache._evict()
+
+
+def load_align_model(language: str, device, log: Logger) -> Tuple[Any, dict]:
+    """Return the (model, metadata) alignment pair for the language, loading it on first use."""
+
+    def loader():
+        # register the additional alignment models of whispaau with whisperx before loading
+        get_align_models()
+        start_time = perf_counter_ns()
+        model = whisperx.load_align_model(language_code=language, device=device)
+        log.log_model_loading(f"alignment model ({language})", start_time, perf_counter_ns())
+        return model
+
+    return _align_model_cache.get((language, str(device)), loader)
+
+
+def load_diarize_model(device, cache_dir: Optional[str], log: Logger):
+    """Return the speaker diarization pipeline for the device, loading it on first use."""
+
+    def loader():
+        # pyannote is only imported when the first file is diarized
+        import whisperx.diarize
+        start_time = perf_counter_ns()
+        model = whisperx.diarize.DiarizationPipeline(device=device, cache_dir=cache_dir)
+        log.log_model_loading("diarization pipeline", start_time, perf_counter_ns())
+        return model
+
+    return _diarize_model_cache.get((str(device), cache_dir), loader)
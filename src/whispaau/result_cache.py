@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+""" On-disk cache of the transcription, alignment and diarization results of input files """
+
+import hashlib
+import json
+import os
+import pickle
+import stat
+import tempfile
+from pathlib import Path
+from typing import Any, Optional
+
+# Bump the version when the format of the cached results changes, old
+# entries are then never read again
+CACHE_VERSION = 1
+
+DEFAULT_CACHE_DIR = Path(
+    os.environ.get("TRANSCRIBER_CACHE_DIR", Path.home() / ".cache" / "transcriber")
+)
+
+
+def hash_file(path: Path, block_size: int = 1024 * 1024) -> str:
+    """Return the sha256 hex digest of the content of the file."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def make_key(*parts: Any) -> str:
+    """Combine the parts, e.g. a content hash and the model settings, into one cache key."""
+    serialized = json.dumps([CACHE_VERSION, *parts], sort_keys=True, default=str)
+    return hashlib.sha256(serialized.encode("utf-8")).hexdigest()
+
+
+class ResultCache:
+    """
+    Results are pickled to one file per stage and key. Reading an entry marks it as recently used,
+    and the least recently used entries are removed when the cache grows beyond max_bytes.
+    Entries are written atomically so that several worker processes can share the cache.
+    The cache directory is private to the user, entries are only read from and written to
+    a directory that the user owns and that no one else can write to, as unpickling a
+    planted file would run its code.
+    """
+
+    def __init__(self, directory: Path = DEFAULT_CACHE_DIR, max_bytes: int = 2 * 1024 ** 3):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+
+    def _path(self, stage: str, key: str) -> Path:
+        return self.directory / f"{key}.{stage}.pkl"
+
+    def contains(self, stage: str, key: str) -> bool:
+        path = self._path(stage, key)
+        return path.is_file() and _is_private(self.directory) and _is_private(path)
+
+    def get(self, stage: str, key: str) -> Optional[Any]:
+        path = self._path(stage, key)
+        try:
+            if not (_is_private(self.directory) and _is_private(path)):
+                return None
+            with open(path, "rb") as f:
+                value = pickle.load(f)
+            # the modification time is the last use, see _evict
+            os.utime(path)
+            return value
+        except FileNotFoundError:
+            return None
+        except (pickle.UnpicklingError, EOFError, AttributeError, ImportError):
+            # a corrupt or outdated entry is a cache miss
+            path.unlink(missing_ok=True)
+            return None
+
+    def put(self, stage: str, key: str, value: Any) -> None:
+        self.directory.mkdir(mode=0o700, parents=True, exist_ok=True)
+        if not _is_private(self.directory):
+            # the results are not shared with other users
+            return
+        fd, temp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temp_path, self._path(stage, key))
+        except BaseException:
+            Path(temp_path).unlink(missing_ok=True)
+            raise
+        self._evict()
+
+    def _evict(self) -> None:
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(".pkl"):
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            Path(path).unlink(missing_ok=True)
+            total -= size
+
+
+def _is_private(path: Path) -> bool:
+    """
+    True if the user owns the path and no one else can write to it,
+    always True without POSIX owners.
+    """
+    if not hasattr(os, "getuid"):
+        return True
+    try:
+        status = os.stat(path)
+    except FileNotFoundError:
+        return False
+    return status.st_uid == os.getuid() and not status.st_mode & (stat.S_IWGRP | stat.S_IWOTH)
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+""" Orders the input files of a job by their estimated cost and predicts when the job completes """
+
+import heapq
+import threading
+from pathlib import Path
+from time import monotonic
+from typing import Optional
+
+from whispaau.probe import probe_files
+
+# Rough real-time factors (seconds of processing per second of audio) of the transcription,
+# alignment and diarization of a file on the CPU, by model. They are only the first guess of the
+# prediction, which is corrected with the measured factor as soon as files are finished.
+CPU_MODEL_RTF = {
+    "tiny": 0.15,
+    "base": 0.2,
+    "small": 0.4,
+    "medium": 0.9,
+    "large": 1.6,
+    "turbo": 0.6,
+    "parakeet": 0.15,
+}
+# Throughput of a GPU compared with the CPU
+GPU_SPEEDUP = 8.0
+# faster-whisper compared with whisper on the same model
+FASTER_WHISPER_SPEEDUP = 3.0
+
+
+def estimate_rtf(model_name: str, device) -> float:
+    """A first estimate of the real-time factor of the model on the device, see CPU_MODEL_RTF."""
+    name = model_name.lower()
+    faster = name.startswith("faster-")
+    name = name.removeprefix("faster-")
+    rtf = next(
+        (value for model, value in CPU_MODEL_RTF.items() if name.startswith(model)),
+        CPU_MODEL_RTF["large"],
+    )
+    if faster:
+        rtf /= FASTER_WHISPER_SPEEDUP
+    if str(device) != "cpu":
+        rtf /= GPU_SPEEDUP
+    return rtf
+
+
+def probe_durations(files: list[Path], max_workers: int = 8) -> dict[Path, Optional[float]]:
+    """
+    The duration of every file in seconds, or None if it could not be probed.
+    The files are probed in parallel.
+    """
+    return {
+        file: info.duration if info is not None else None
+        for file, info in probe_files(files, max_workers).items()
+    }
+
+
+def makespan(costs: list[float], slots: int) -> float:
+    """
+    The time until all the costs are processed by the slots, when every slot takes the next
+    cost as soon as it is free and the costs are taken longest first. This is how the worker
+    pool processes the ordered files.
+    """
+    loads = [0.0] * max(1, slots)
+    for cost in sorted(costs, reverse=True):
+        heapq.heapreplace(loads, loads[0] + cost)
+    return max(loads)
+
+
+class Schedule:
+    """
+    The order in which the files of a job are processed, longest first, and the
+    predicted time until the job completes.
+    A long file that starts last would keep one worker busy while the others are idle, so the
+    longest files are started first and the short files fill the gaps. The cost of a file is its
+    duration times the real-time factor.
+    """
+
+    def __init__(self, durations: dict[Path, Optional[float]], slots: int, rtf: float):
+        known = [duration for duration in durations.values() if duration is not None]
+        # a file that could not be probed counts as an average file
+        default_duration = sum(known) / len(known) if known else 0.0
+        self.durations = {
+            file: duration if duration is not None else default_duration
+            for file, duration in durations.items()
+        }
+        # the slots that can be busy at the same time
+        self.slots = max(1, min(slots, len(durations)))
+        self.rtf = rtf
+        # ties are broken by the path, so the order is deterministic
+        self.order: list[Path] = sorted(
+            self.durations, key=lambda file: (-self.durations[file], str(file))
+        )
+        self.remaining: set[Path] = set(self.order)
+        self.started = monotonic()
+        self.finished_audio = 0.0
+        # the files are finished from the prefetch and the finish threads of the pipeline
+        self.lock = threading.Lock()
+
+    @property
+    def total_audio(self) -> float:
+        return sum(self.durations.values())
+
+    def predicted_seconds(self) -> float:
+        """The predicted seconds from now until all the remaining files are processed."""
+        with self.lock:
+            costs = [self.durations[file] * self.rtf for file in list(self.remaining)]
+        return makespan(costs, self.slots)
+
+    def finished(self, file: Path) -> float:
+        """
+        Record that the file is finished and refine the real-time factor with the throughput
+        measured so far, returns the new prediction of the remaining seconds.
+        """
+        with self.lock:
+            if file in self.remaining:
+                self.remaining.discard(file)
+                self.finished_audio += self.durations[file]
+            elapsed = monotonic() - self.started
+            if self.finished_audio > 0 and elapsed > 0:
+                # all the slots have been busy for the elapsed time
+                self.rtf = elapsed * self.slots / self.finished_audio
+        return self.predicted_seconds()
@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+""" Transcription server that keeps the models loaded between jobs """
+
+import argparse
+import json
+import queue
+import threading
+import traceback
+import urllib.request
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Callable, Optional
+
+from .cli_utils import parse_arguments
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+
+class InvalidJobArguments(Exception):
+    pass
+
+
+class JobQueue:
+    """
+    Runs the submitted jobs one at a time on a background thread.
+    All jobs run in this process, so the models cached by earlier jobs stay loaded.
+    """
+
+    def __init__(self, runner: Callable[[dict[str, Any]], None], output_root: Path):
+        self.runner = runner
+        self.output_root = output_root
+        self.jobs: dict[str, dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._queue: queue.Queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="transcription-jobs", daemon=True)
+        self._thread.start()
+
+    def submit(self, arguments: list[str]) -> dict[str, Any]:
+        """Queue a job with the same arguments as the command line, returns the job status."""
+        try:
+            args = parse_arguments(arguments)
+        except SystemExit as e:
+            raise InvalidJobArguments(f"Invalid job arguments: {arguments}") from e
+
+        job_id = uuid.uuid4().hex
+        # every job writes to its own output directory
+        args["output_dir"] = self.output_root / job_id
+        job = {
+            "id": job_id,
+            "status": QUEUED,
+            "output_dir": str(args["output_dir"]),
+            "files": [],
+            "error": None,
+        }
+        with self._lock:
+            self.jobs[job_id] = job
+        self._queue.put((job_id, args))
+        return self.status(job_id)
+
+    def status(self, job_id: str) -> Optional[dict[str, Any]]:
+        with self._lock:
+            job = self.jobs.get(job_id)
+            return dict(job) if job is not None else None
+
+    def all_status(self) -> list[dict[str, Any]]:
+        with self._lock:
+            return [dict(job) for job in self.jobs.values()]
+
+    def join(self) -> None:
+        """Wait until all the queued jobs have finished."""
+        self._queue.join()
+
+    def _update(self, job_id: str, **fields) -> None:
+        with self._lock:
+            self.jobs[job_id].update(fields)
+
+    def _run(self) -> None:
+        while True:
+            job_id, args = self._queue.get()
+            self._update(job_id, status=RUNNING)
+            try:
+                self.runner(args)
+                files = sorted(path.name for path in args["output_dir"].iterdir() if path.is_file())
+                self._update(job_id, status=DONE, files=files)
+            except Exception as e:
+                traceback.print_exc()
+                self._update(job_id, status=FAILED, error=str(e))
+            finally:
+                self._queue.task_done()
+
+
+class _JobRequestHandler(BaseHTTPRequestHandler):
+    server: "TranscriptionServer"
+
+    def _send_json(self, status: int, body: Any) -> None:
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        parts = [part for part in self.path.split("/") if part]
+        if parts == ["health"]:
+            self._send_json(200, {"status": "ok"})
+        elif parts == ["jobs"]:
+            self._send_json(200, self.server.jobs.all_status())
+        elif len(parts) == 2 and parts[0] == "jobs":
+            job = self.server.jobs.status(parts[1])
+            if job is None:
+                self._send_json(404, {"error": f"Unknown job: {parts[1]}"})
+            else:
+                self._send_json(200, job)
+        else:
+            self._send_json(404, {"error": f"Unknown path: {self.path}"})
+
+    def do_POST(self):
+        if self.path.rstrip("/") != "/jobs":
+            self._send_json(404, {"error": f"Unknown path: {self.path}"})
+            return
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            arguments = json.loads(self.rfile.read(length) or b"{}").get("args", [])
+            if not isinstance(arguments, list):
+                raise InvalidJobArguments("args must be a list of command line arguments")
+            job = self.server.jobs.submit([str(argument) for argument in arguments])
+        except (InvalidJobArguments, json.JSONDecodeError, AttributeError) as e:
+            self._send_json(400, {"error": str(e)})
+            return
+        self._send_json(202, job)
+
+    def log_message(self, format, *args):
+        # keep the request log out of stderr, the jobs have their own transcribe.log
+        pass
+
+
+class TranscriptionServer(ThreadingHTTPServer):
+    """
+    HTTP interface to the job queue:
+    POST /jobs with {"args": [...command line arguments...]} queues a job,
+    GET /jobs/<id> returns the status of a job and GET /jobs the status of all jobs.
+    """
+
+    def __init__(
+        self, address: tuple[str, int], runner: Callable[[dict[str, Any]], None], output_root: Path
+    ):
+        super().__init__(address, _JobRequestHandler)
+        self.jobs = JobQueue(runner, output_root)
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+
+def submit_job(url: str, arguments: list[str]) -> dict[str, Any]:
+    """Client helper: queue a job on the server at url and return its status."""
+    request = urllib.request.Request(
+        f"{url}/jobs",
+        data=json.dumps({"args": arguments}).encode("utf-8"),
+        headers={"Content-Type": "application/json"},
+        method="POST",
+    )
+    with urllib.request.urlopen(request) as response:
+        return json.load(response)
+
+
+def job_status(url: str, job_id: str) -> dict[str, Any]:
+    """Client helper: return the status of a job on the server at url."""
+    with urllib.request.urlopen(f"{url}/jobs/{job_id}") as response:
+        return json.load(response)
+
+
+def parse_server_arguments(args: Optional[list[str]] = None) -> dict[str, Any]:
+    parser = argparse.ArgumentParser(prog="app.py serve")
+    parser.add_argument(
+        "--host", type=str, default="127.0.0.1", help="address the server listens on"
+    )
+    parser.add_argument("--port", type=int, default=8765, help="port the server listens on")
+    parser.add_argument(
+        "--output_root",
+        type=Path,
+        default=Path("./jobs"),
+        help="directory for the output directories of the jobs",
+    )
+    return vars(parser.parse_args(args))
+
+
+def serve(runner: Callable[[dict[str, Any]], None], args: Optional[list[str]] = None) -> None:
+    """Run the transcription server until it is interrupted."""
+    server_args = parse_server_arguments(args)
+    server_args["output_root"].mkdir(parents=True, exist_ok=True)
+    server = TranscriptionServer(
+        (server_args["host"], server_args["port"]), runner, server_args["output_root"]
+    )
+    print(f"Transcription server listening on {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
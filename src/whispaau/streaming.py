@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+""" Transcription of a live audio stream read from stdin or a named pipe """
+
+import subprocess
+import sys
+from typing import BinaryIO, Callable, Iterator, List
+
+import numpy as np
+
+from whispaau.audio import SAMPLE_RATE
+from whispaau.transcription import ChunkMerger, SegmentsCallback, shift_segments
+
+# Bytes per sample of the 16 bit PCM read from the stream
+_SAMPLE_WIDTH = 2
+
+
+def pcm_blocks(stream: BinaryIO, block_samples: int) -> Iterator[np.ndarray]:
+    """
+    Read 16 bit little endian mono PCM from the stream in blocks of at most
+    block_samples float32 samples.
+    """
+    remainder = b""
+    while True:
+        data = stream.read(block_samples * _SAMPLE_WIDTH)
+        if not data:
+            break
+        data = remainder + data
+        # a read can end in the middle of a sample, keep the odd byte for the next block
+        usable = len(data) - len(data) % _SAMPLE_WIDTH
+        data, remainder = data[:usable], data[usable:]
+        if data:
+            samples = np.frombuffer(data, np.int16).astype(np.float32)
+            samples *= 1.0 / 32768.0
+            yield samples
+
+
+def decoded_blocks(
+    source: str, block_samples: int, sample_rate: int = SAMPLE_RATE
+) -> Iterator[np.ndarray]:
+    """
+    Decode any stream ffmpeg can read, from stdin if source is "-" or else from the named pipe or
+    file, to 16kHz mono samples in blocks of at most block_samples.
+    """
+    command = [
+        "ffmpeg",
+        "-loglevel", "error",
+        *([] if source == "-" else ["-nostdin"]),
+        "-i", "pipe:0" if source == "-" else source,
+        "-f", "s16le",
+        "-ac", "1",
+        "-acodec", "pcm_s16le",
+        "-ar", str(sample_rate),
+        "-",
+    ]
+    process = subprocess.Popen(
+        command,
+        stdin=sys.stdin.buffer if source == "-" else subprocess.DEVNULL,
+        stdout=subprocess.PIPE,
+    )
+    try:
+        yield from pcm_blocks(process.stdout, block_samples)
+    finally:
+        process.stdout.close()
+        process.wait()
+    if process.returncode != 0:
+        raise RuntimeError(f"ffmpeg could not decode the stream {source}")
+
+
+def open_stream(source: str, stream_format: str, block_samples: int) -> Iterator[np.ndarray]:
+    """
+    The audio blocks of the source, raw 16kHz mono 16 bit PCM if stream_format is
+    "pcm", else decoded by ffmpeg.
+    """
+    if stream_format != "pcm":
+        return decoded_blocks(source, block_samples)
+    if source == "-":
+        return pcm_blocks(sys.stdin.buffer, block_samples)
+
+    def named_pipe_blocks():
+        with open(source, "rb") as stream:
+            yield from pcm_blocks(stream, block_samples)
+
+    return named_pipe_blocks()
+
+
+class StreamTranscriber:
+    """
+    Transcribes an audio stream in overlapping chunks as the audio arrives.
+    A chunk of latency_s + overlap_s seconds is transcribed every latency_s seconds of audio, and
+    the segments are merged like the chunks of a long recording, see
+    ParakeetTranscription.transcribe_buffered.
+    A segment is passed to on_segments once the following chunk can no longer change it,
+    so the text of a word is emitted about one to two latency_s after it was spoken,
+    plus the time of the inference.
+    """
+
+    def __init__(
+        self,
+        transcribe_chunks: Callable[[List[np.ndarray]], List[List[dict]]],
+        on_segments: SegmentsCallback,
+        latency_s: float = 10.0,
+        overlap_s: float = 2.0,
+        sample_rate: int = SAMPLE_RATE,
+        language: str = "en",
+    ):
+        if latency_s <= 0:
+            raise ValueError("The latency must be positive.")
+        self.transcribe_chunks = transcribe_chunks
+        self.on_segments = on_segments
+        self.sample_rate = sample_rate
+        self.language = language
+        self.step = int(latency_s * sample_rate)
+        self.chunk_length = self.step + int(overlap_s * sample_rate)
+        self.merger = ChunkMerger()
+        # the audio from the start of the next chunk, buffer_start is its
+        # offset in samples on the stream
+        self.buffer = np.zeros(0, dtype=np.float32)
+        self.buffer_start = 0
+        # the number of samples read from the stream
+        self.received = 0
+        self.segments: List[dict] = []
+
+    def feed(self, samples: np.ndarray) -> None:
+        """Add the next samples of the stream and transcribe all the chunks that are complete."""
+        self.buffer = np.concatenate((self.buffer, samples))
+        self.received += len(samples)
+        while len(self.buffer) >= self.chunk_length:
+            self._transcribe_chunk(self.chunk_length)
+            # the next chunk starts one step later, the rest of this chunk is its overlap
+            self.buffer = self.buffer[self.step:]
+            self.buffer_start += self.step
+
+    def close(self) -> List[dict]:
+        """Transcribe the end of the stream, returns all the segments of the stream."""
+        # the last chunk is only needed if it has audio that the previous chunk did not cover
+        covered = self.chunk_length - self.step if self.buffer_start > 0 else 0
+        if len(self.buffer) > covered:
+            self._transcribe_chunk(len(self.buffer))
+        self._emit(self.merger.finish())
+        return self.segments
+
+    def _transcribe_chunk(self, length: int) -> None:
+        start_time = self.buffer_start / self.sample_rate
+        results = self.transcribe_chunks([self.buffer[:length]])
+        segments = results[0] if results else []
+        shift_segments(segments, start_time)
+        self.merger.add(start_time, start_time + length / self.sample_rate, segments)
+        self._emit(self.merger.pop_final())
+
+    def _emit(self, segments: List[dict]) -> None:
+        if segments:
+            self.segments.extend(segments)
+            self.on_segments(segments, self.language)
+
+
+def transcribe_stream(
+    blocks: Iterator[np.ndarray],
+    transcribe_chunks: Callable[[List[np.ndarray]], List[List[dict]]],
+    on_segments: SegmentsCallback,
+    latency_s: float = 10.0,
+    overlap_s: float = 2.0,
+) -> List[dict]:
+    """Transcribe the audio blocks until the stream ends, returns all the segments."""
+    transcriber = StreamTranscriber(transcribe_chunks, on_segments, latency_s, overlap_s)
+    for block in blocks:
+        transcriber.feed(block)
+    return transcriber.close()
@@ -1,18 +1,18 @@
 import os
-import tempfile
 import gc
+import string
+from difflib import SequenceMatcher
 from pathlib import Path
-from typing import List, TypedDict, Any, Dict, Union, Tuple
+from typing import List, TypedDict, Any, Callable, Dict, Union, Tuple, Optional
 from time import perf_counter_ns
 
 import numpy as np
-import torchaudio.transforms as T
 import torch
-import torchaudio
 from whispaau.logging import Logger
 from abc import ABC, abstractmethod
-import whisper
-import nemo.collections.asr as nemo_asr
+
+# The backends are imported when their model is first loaded: nemo takes several seconds to import
+# and is not needed for whisper models, and the other way around.
 
 
 class TranscriptionSegment(TypedDict):
@@ -35,15 +35,45 @@ class TranscriptionResult(TypedDict):
     language: str
 
 
+# Called with the segments that are final while a long recording is still being
+# transcribed, and the language
+SegmentsCallback = Callable[[List[dict], str], None]
+
+
 class TranscriptionService(ABC):
     """Abstract base class for transcription services."""
 
     @abstractmethod
-    def transcribe(self, file: Path, trans_arguments: Any) -> TranscriptionResult:
-        """Transcribes an audio file and returns the result."""
+    def transcribe(
+        self,
+        file: Path,
+        trans_arguments: Any,
+        audio: Optional[np.ndarray] = None,
+        batch_size: int = 0,
+        on_segments: Optional[SegmentsCallback] = None,
+    ) -> TranscriptionResult:
+        """
+        Transcribes an audio file and returns the result.
+        If audio is given it must hold the already decoded 16kHz mono float32 samples of the file.
+        batch_size is the number of audio chunks inferred together by models that support batching,
+        0 selects a default based on the available memory.
+        Services that transcribe in windows or chunks pass the finished segments to on_segments
+        in order, the segments of the returned result are the same.
+        """
         pass
 
 
+# Rough upper bound of the inference memory per second of audio for the parakeet fast-conformer
+# with local attention, used to choose the default batch size.
+_BYTES_PER_CHUNK_SECOND = 10 * 1024 * 1024
+
+# Model names with this prefix, e.g. faster-large-v3, are transcribed with
+# faster-whisper (CTranslate2)
+FASTER_WHISPER_PREFIX = "faster-"
+
+# Weight quantization of the transcription models, see --quantize
+QUANTIZE_MODES = ("none", "int8")
+
 # A module-level cache to store instantiated transcriber services.
 # The key is a tuple (model_name, device).
 _model_cache: Dict[Union[str, Tuple[str, str]], "TranscriptionService"] = {}
@@ -60,11 +90,13 @@ def _release_cuda_memory(device: Any) -> None:
         torch.cuda.empty_cache()
 
 
-def transcribe(model_name: str, file: Path, trans_arguments: Any, device, log: Logger):
+def transcribe(model_name: str, file: Path, trans_arguments: Any, device, log: Logger,
+               audio: Optional[np.ndarray] = None, batch_size: int = 0, quantize: str = "none",
+               on_segments: Optional[SegmentsCallback] = None):
     """
     Instantiate and use the correct transcription class based on the model_name.
     This function uses a cache to store and reuse transcriber instances, ensuring
-    that models are loaded into memory only once per model/device combination.
+    that models are loaded into memory only once per model/device/quantization combination.
     """
     transcriber: TranscriptionService
     model_family = model_name.lower()
@@ -74,9 +106,9 @@ def transcribe(model_name: str, file: Path, trans_arguments: Any, device, log: L
     disable_cache_for_parakeet_cuda = "parakeet" in model_family and _is_cuda_device(device)
 
     if disable_cache_for_parakeet_cuda:
-        transcriber = ParakeetTranscription(model_name, device, log)
+        transcriber = ParakeetTranscription(model_name, device, log, quantize)
         try:
-            return transcriber.transcribe(file, trans_arguments)
+            return transcriber.transcribe(file, trans_arguments, audio, batch_size, on_segments)
         finally:
             # Drop model refs deterministically between files.
             if hasattr(transcriber, "model"):
@@ -84,40 +116,174 @@ def transcribe(model_name: str, file: Path, trans_arguments: Any, device, log: L
             gc.collect()
             _release_cuda_memory(device)
 
-    cache_key: Union[str, Tuple[str, str]] = (model_name, str(device))
+    transcriber = get_transcriber(model_name, device, log, quantize)
+    return transcriber.transcribe(file, trans_arguments, audio, batch_size, on_segments)
+
+
+def get_transcriber(
+    model_name: str, device, log: Logger, quantize: str = "none"
+) -> TranscriptionService:
+    """Return the cached transcription service for the model, loading the model on first use."""
+    model_family = model_name.lower()
+    cache_key: Union[str, Tuple[str, str, str]] = (model_name, str(device), quantize)
     if cache_key not in _model_cache:
         # This factory determines which transcription strategy to use.
-        if model_family in whisper.available_models():
-            _model_cache[cache_key] = WhisperTranscription(model_name, device, log)
+        if model_family.startswith(FASTER_WHISPER_PREFIX):
+            # the faster-whisper models always use int8 weights, see faster_whisper_compute_type
+            if quantize != "none":
+                log.get_logger().warning(
+                    f"--quantize {quantize} is ignored for {model_name}, "
+                    "faster-whisper always uses int8 weights."
+                )
+            _model_cache[cache_key] = FasterWhisperTranscription(model_name, device, log)
         elif "parakeet" in model_family:
-            _model_cache[cache_key] = ParakeetTranscription(model_name, device, log)
+            _model_cache[cache_key] = ParakeetTranscription(model_name, device, log, quantize)
+        elif model_family in _whisper_models():
+            _model_cache[cache_key] = WhisperTranscription(model_name, device, log, quantize)
         else:
             log.get_logger().error(f"Unknown model family for model_name: {model_name}")
             raise ValueError(f"Unknown model family for model_name: {model_name}")
 
-    transcriber = _model_cache[cache_key]
-    return transcriber.transcribe(file, trans_arguments)
+    return _model_cache[cache_key]
+
+
+def _whisper_models() -> List[str]:
+    import whisper
+    return whisper.available_models()
+
+
+def quantize_linear_layers(model, device, log: Logger, linear_subclasses: Tuple[type, ...] = ()):
+    """
+    Dynamic int8 quantization of the linear layers of the model: the weights are stored as int8 and
+    the activations are quantized on the fly. PyTorch only has dynamic quantization kernels for the
+    CPU, on other devices the model is returned unchanged.
+    """
+    if str(device) != "cpu":
+        log.get_logger().warning(
+            f"int8 quantization is only supported on the CPU, not on {device}."
+        )
+        return model
+    # quantize_dynamic only replaces modules of exactly the type nn.Linear
+    for module in model.modules():
+        if isinstance(module, linear_subclasses):
+            module.__class__ = torch.nn.Linear
+    return torch.ao.quantization.quantize_dynamic(
+        model, {torch.nn.Linear}, dtype=torch.qint8, inplace=True
+    )
 
 
 class WhisperTranscription(TranscriptionService):
     """ Transcription with openai whisper models """
-    def __init__(self, model_name: str, device, log: Logger):
+    def __init__(self, model_name: str, device, log: Logger, quantize: str = "none"):
+        import whisper
         self.log = log
         self.model_name = model_name
         start_time = perf_counter_ns()
         self.model = whisper.load_model(self.model_name, device=device)
+        if quantize == "int8":
+            # the Linear of whisper only casts the weights to the dtype of the
+            # input, a no-op in fp32 on the CPU
+            self.model = quantize_linear_layers(self.model, device, log, (whisper.model.Linear,))
         self.log.log_model_loading(self.model_name, start_time, perf_counter_ns())
 
-    def transcribe(self, file: Path, trans_arguments: Any) -> dict[str, Any]:
+    def transcribe(
+        self,
+        file: Path,
+        trans_arguments: Any,
+        audio: Optional[np.ndarray] = None,
+        batch_size: int = 0,
+        on_segments: Optional[SegmentsCallback] = None,
+    ) -> dict[str, Any]:
+        # openai whisper decodes the 30 second windows sequentially, batch_size does not apply
+        # and it has no hook for the finished windows, on_segments is not called
+        # whisper decodes the file with ffmpeg itself unless the samples are given
         transcription: dict[str, Any] = self.model.transcribe(
-            file.resolve().as_posix(), **trans_arguments
+            audio if audio is not None else file.resolve().as_posix(), **trans_arguments
         )
         return transcription
 
 
+class FasterWhisperTranscription(TranscriptionService):
+    """ Transcription with the CTranslate2 conversions of whisper models, e.g. faster-large-v3 """
+    def __init__(self, model_name: str, device, log: Logger):
+        from faster_whisper import WhisperModel, BatchedInferencePipeline
+        self.log = log
+        self.model_name = model_name
+        self.device = "cuda" if _is_cuda_device(device) else "cpu"  # CTranslate2 has no mps support
+        self.compute_type = faster_whisper_compute_type(device)
+        start_time = perf_counter_ns()
+        model = WhisperModel(
+            model_name[len(FASTER_WHISPER_PREFIX):],
+            device=self.device,
+            compute_type=self.compute_type,
+            # use the threads set with --threads
+            cpu_threads=torch.get_num_threads(),
+        )
+        self.model = BatchedInferencePipeline(model=model)
+        self.log.log_model_loading(
+            f"{self.model_name} ({self.compute_type})", start_time, perf_counter_ns()
+        )
+
+    def transcribe(
+        self,
+        file: Path,
+        trans_arguments: Any,
+        audio: Optional[np.ndarray] = None,
+        batch_size: int = 0,
+        on_segments: Optional[SegmentsCallback] = None,
+    ) -> dict[str, Any]:
+        if batch_size <= 0:
+            batch_size = 16 if self.device == "cuda" else 8
+        # --prompt takes several words, faster-whisper tokenizes the prompt as one string
+        prompt = trans_arguments.get("prompt")
+        segments, info = self.model.transcribe(
+            audio if audio is not None else file.resolve().as_posix(),
+            language=trans_arguments.get("language"),
+            initial_prompt=" ".join(prompt) if isinstance(prompt, list) else prompt,
+            batch_size=batch_size,
+        )
+        return faster_whisper_output(segments, info.language, on_segments)
+
+
+def faster_whisper_compute_type(device) -> str:
+    """int8 weights with float16 activations on the GPU and float32 activations on the CPU."""
+    return "int8_float16" if _is_cuda_device(device) else "int8_float32"
+
+
+def faster_whisper_output(
+    segments, language: str, on_segments: Optional[SegmentsCallback] = None
+) -> TranscriptionResult:
+    """Convert the segments of faster-whisper to the output format of openai whisper."""
+    result_segments: List[TranscriptionSegment] = []
+    # the segments are a generator, the audio is transcribed while iterating
+    for i, segment in enumerate(segments, start=1):
+        seg: TranscriptionSegment = {
+            "id": i,
+            "seek": segment.seek,
+            "start": segment.start,
+            "end": segment.end,
+            "text": segment.text,
+            "tokens": list(segment.tokens),
+            "temperature": segment.temperature if segment.temperature is not None else 0.0,
+            "avg_logprob": segment.avg_logprob,
+            "compression_ratio": segment.compression_ratio,
+            "no_speech_prob": segment.no_speech_prob,
+        }
+        result_segments.append(seg)
+        if on_segments is not None:
+            on_segments([seg], language)
+    result: TranscriptionResult = {
+        "text": "".join(seg["text"] for seg in result_segments),
+        "segments": result_segments,
+        "language": language,
+    }
+    return result
+
+
 class ParakeetTranscription(TranscriptionService):
     """ Transcription with the NVIDIA model: nvidia/parakeet-tdt-0.6b-v3 """
-    def __init__(self, model_name: str, device, log: Logger):
+    def __init__(self, model_name: str, device, log: Logger, quantize: str = "none"):
+        import nemo.collections.asr as nemo_asr
         self.log = log
         self.model_name = model_name
         self.device = device
@@ -126,9 +292,21 @@ class ParakeetTranscription(TranscriptionService):
         self.log.log_model_loading(self.model_name, start_time, perf_counter_ns())
         self.sample_rate = 16000 # 16kHz
         self.chunk_length_s: int = 30 # 30 seconds
+        # 2 seconds shared by neighbouring chunks, a word cut at a boundary is whole in one of them
+        self.chunk_overlap_s: float = 2
         self.buffering_threshold: int = 300 # 5 minutes
         self.long_form_configured = False
         self.model = self.model.to(device)
+        if quantize == "int8":
+            if str(device) == "cpu":
+                # Changing the attention model copies the weights of the attention layers, which
+                # does not work once they are quantized. Use the local attention of long form
+                # transcription for all files.
+                self.model.change_attention_model(
+                    self_attention_model="rel_pos_local_attn", att_context_size=[256, 256]
+                )
+                self.long_form_configured = True
+            self.model = quantize_linear_layers(self.model, device, log)
 
     def _configure_for_duration(self, duration: float) -> None:
         if duration > 30 and not self.long_form_configured:
@@ -137,20 +315,30 @@ class ParakeetTranscription(TranscriptionService):
             self.model.change_attention_model(self_attention_model="rel_pos_local_attn", att_context_size=[256, 256])
             self.long_form_configured = True
 
-    def transcribe(self, file: Path, trans_arguments: Any) -> dict[str, Any]:
-        audio = convert_to_16k_mono_audio(file.resolve().as_posix())
+    def transcribe(
+        self,
+        file: Path,
+        trans_arguments: Any,
+        audio: Optional[np.ndarray] = None,
+        batch_size: int = 0,
+        on_segments: Optional[SegmentsCallback] = None,
+    ) -> dict[str, Any]:
+        if audio is None:
+            audio = convert_to_16k_mono_audio(file.resolve().as_posix())
         duration = len(audio) / self.sample_rate
         self._configure_for_duration(duration)
 
         if duration > self.buffering_threshold:
             # if the audio is longer than 5 minutes transcribe in chunks to manage memory consumption
-            return self.transcribe_buffered(audio)
+            return self.transcribe_buffered(audio, batch_size, on_segments)
         else:
             with torch.inference_mode():
                 hypotheses = self.model.transcribe(
                     audio,
                     batch_size=1,
-                    return_hypotheses=True
+                    return_hypotheses=True,
+                    # the start and end of every word, see prepare_segments
+                    timestamps=True,
                 )
             if hypotheses and len(hypotheses) > 0:
                 segments, full_text = prepare_segments(hypotheses)
@@ -161,126 +349,417 @@ class ParakeetTranscription(TranscriptionService):
             else:
                 return {}
 
-    def transcribe_buffered(self, audio) -> dict[str, Any]:
-        # Calculate chunk lengths in samples
-        chunk_len_samples = self.chunk_length_s * self.sample_rate
-
-        # Create a temporary directory for chunks
-        with tempfile.TemporaryDirectory() as temp_dir:
-            chunks = []
-            start = 0
-            idx = 0
-            while start < len(audio):
-                end = start + chunk_len_samples
-                chunk = audio[start:end]
-
-                chunk_filepath = os.path.join(temp_dir, f"chunk_{idx}.wav")
-                # Ensure chunk is a tensor and has the shape (channels, frames)
-                chunk_tensor = torch.as_tensor(chunk)
-                if chunk_tensor.ndim == 1:
-                    chunk_tensor = chunk_tensor.unsqueeze(0)
-                # save file
-                torchaudio.save(chunk_filepath, chunk_tensor, self.sample_rate)
-
-                chunks.append({
-                    'audio_path': chunk_filepath,
-                    'start_time': start / self.sample_rate,
-                    'duration': len(chunk) / self.sample_rate
-                })
-
-                start += chunk_len_samples
-                idx += 1
-            self.log.get_logger().info(f"Audio was split into {len(chunks)} chunks.")
-
-            # Transcribe all chunks
-            self.log.get_logger().info(f"Transcribing chunks...")
-            all_segments = []
-            final_full_text: str = ""
-            for i, chunk_info in enumerate(chunks):
-                self.log.get_logger().info(f"Transcribing chunk {i + 1}/{len(chunks)} (duration: {chunk_info['duration']:.1f}s)...")
-                # Transcribe chunk
-                waveform, sr = torchaudio.load(str(chunk_info['audio_path']))
-                with torch.inference_mode():
-                    hypotheses = self.model.transcribe(
-                        waveform.squeeze().to(torch.float32).numpy(),
-                        batch_size=1,
-                        return_hypotheses=True,
-                    )
-                if hypotheses and len(hypotheses) > 0:
-                    segments, full_text = prepare_segments(hypotheses)
-                    final_full_text += " " + full_text
-
-                    for segment in segments:
-                        segment['start'] += chunk_info['start_time']
-                        segment['end'] += chunk_info['start_time']
-                        all_segments.append(segment)
-                self.log.get_logger().info(f"Chunk {i + 1} complete.")
-
-            # Prepare output data
-            result = prepare_output(all_segments, final_full_text)
-            return result
+    def transcribe_stream(
+        self, blocks, latency_s: float, on_segments: SegmentsCallback
+    ) -> dict[str, Any]:
+        """
+        Transcribe a live stream of audio blocks in chunks of latency_s plus
+        the overlap, see streaming.py.
+        """
+        from whispaau.streaming import transcribe_stream
+        self._configure_for_duration(latency_s + self.chunk_overlap_s)
+        segments = transcribe_stream(
+            blocks, self.transcribe_chunks, on_segments, latency_s, self.chunk_overlap_s
+        )
+        return prepare_output(segments, " ".join(segment["text"] for segment in segments))
+
+    def transcribe_chunks(self, waveforms: List[np.ndarray]) -> List[List[dict]]:
+        """
+        Transcribe the chunks as one batch, returns the segments of every chunk
+        with times relative to the chunk.
+        """
+        with torch.inference_mode():
+            hypotheses = self.model.transcribe(
+                waveforms,
+                batch_size=len(waveforms),
+                return_hypotheses=True,
+                timestamps=True,
+            )
+        # the model returns one hypothesis per chunk, in the order of the chunks
+        return [prepare_segments([hypothesis])[0] for hypothesis in hypotheses or []]
+
+    def transcribe_buffered(self, audio, batch_size: int = 0,
+                            on_segments: Optional[SegmentsCallback] = None) -> dict[str, Any]:
+        if batch_size <= 0:
+            batch_size = default_batch_size(self.device, self.chunk_length_s)
+
+        # Split the audio into overlapping chunks, the chunks are views of the
+        # audio buffer and are not copied
+        chunks = chunk_audio(audio, self.sample_rate, self.chunk_length_s, self.chunk_overlap_s)
+        self.log.get_logger().info(f"Audio was split into {len(chunks)} chunks.")
+
+        # Transcribe the chunks in batches
+        self.log.get_logger().info(f"Transcribing chunks in batches of {batch_size}...")
+        # Removes the words transcribed twice in the overlaps and joins the
+        # segments across the chunk boundaries
+        merger = ChunkMerger()
+        all_segments: List[dict] = []
+        for batch_start in range(0, len(chunks), batch_size):
+            batch = chunks[batch_start:batch_start + batch_size]
+            self.log.get_logger().info(
+                f"Transcribing chunks {batch_start + 1}-{batch_start + len(batch)}/{len(chunks)}..."
+            )
+            for chunk_info, segments in zip(
+                batch, self.transcribe_chunks([chunk_info['audio'] for chunk_info in batch])
+            ):
+                shift_segments(segments, chunk_info['start_time'])
+                merger.add(
+                    chunk_info['start_time'],
+                    chunk_info['start_time'] + chunk_info['duration'],
+                    segments,
+                )
+            self.log.get_logger().info(
+                f"Chunks {batch_start + 1}-{batch_start + len(batch)} complete."
+            )
+            final = merger.pop_final()
+            all_segments.extend(final)
+            if on_segments is not None and final:
+                on_segments(final, "en")
+
+        final = merger.finish()
+        all_segments.extend(final)
+        if on_segments is not None and final:
+            on_segments(final, "en")
+
+        # Prepare output data
+        result = prepare_output(all_segments, " ".join(segment["text"] for segment in all_segments))
+        return result
+
+
+def chunk_audio(
+    audio: np.ndarray, sample_rate: int, chunk_length_s: float, overlap_s: float = 0
+) -> list[dict[str, Any]]:
+    """
+    Split the audio into chunks of chunk_length_s seconds where neighbouring
+    chunks share overlap_s seconds.
+    The chunks are views of the audio buffer. The last chunk ends at the end
+    of the audio and may be shorter.
+    """
+    chunk_len_samples = int(chunk_length_s * sample_rate)
+    step_samples = chunk_len_samples - int(overlap_s * sample_rate)
+    if step_samples <= 0:
+        raise ValueError("The chunk overlap must be shorter than the chunk length.")
+
+    audio = np.ascontiguousarray(audio, dtype=np.float32)
+    chunks = []
+    start = 0
+    while start < len(audio):
+        chunk = audio[start:start + chunk_len_samples]
+        chunks.append({
+            'audio': chunk,
+            'start_time': start / sample_rate,
+            'duration': len(chunk) / sample_rate
+        })
+        if start + chunk_len_samples >= len(audio):
+            break
+        start += step_samples
+    return chunks
+
+
+class ChunkMerger:
+    """
+    Merges the segments of consecutive, possibly overlapping, chunks into one list of
+    segments, see merge_chunk_segments.
+    The chunks are added one at a time in order. The words of a chunk are final once
+    the next chunk has been added, pop_final() takes out the merged segments that the
+    next chunks can no longer change.
+    """
+
+    def __init__(self, gap_threshold: float = 1.0):
+        self.gap_threshold = gap_threshold
+        # the words of the last chunk, the overlap with the next chunk can still remove some of them
+        self._last_words: List[dict] = []
+        self._last_end = 0.0
+        self._chunks = 0
+        self._merged: List[dict] = []
+        self._previous_key = None
+
+    def add(self, chunk_start: float, chunk_end: float, segments: List[dict]) -> None:
+        """Add the segments of the next chunk, with segment times on the timeline of the audio."""
+        words = _segment_words(segments, self._chunks)
+        if self._chunks and self._last_end > chunk_start:
+            self._last_words, words = _deduplicate_overlap(
+                self._last_words, words, chunk_start, self._last_end
+            )
+        self._commit(self._last_words)
+        self._last_words = words
+        self._last_end = chunk_end
+        self._chunks += 1
+
+    def _commit(self, words: List[dict]) -> None:
+        merged = self._merged
+        for word in words:
+            key = word["segment"]
+            if merged and key == self._previous_key:
+                # next word of the same segment
+                append = True
+            else:
+                # first word of a new segment, join it with the previous
+                # segment across a chunk boundary
+                append = (
+                    bool(merged) and self._previous_key[0] != key[0]
+                    and word["start"] - merged[-1]["end"] <= self.gap_threshold
+                )
+            if append:
+                merged[-1]["words"].append(word["word"])
+                merged[-1]["end"] = max(merged[-1]["end"], word["end"])
+            else:
+                merged.append({"words": [word["word"]], "start": word["start"], "end": word["end"]})
+            self._previous_key = key
+
+    @staticmethod
+    def _output(segments: List[dict]) -> List[dict]:
+        return [
+            {
+                "text": " ".join(segment["words"]),
+                "start": round(segment["start"], 3),
+                "end": round(segment["end"], 3),
+            }
+            for segment in segments
+        ]
+
+    def pop_final(self) -> List[dict]:
+        """
+        Remove and return the merged segments that are final, the last one may still
+        be joined with the next chunk.
+        """
+        final, self._merged = self._merged[:-1], self._merged[-1:]
+        return self._output(final)
+
+    def finish(self) -> List[dict]:
+        """Remove and return all the remaining segments, no more chunks can be added after this."""
+        self._commit(self._last_words)
+        self._last_words = []
+        remaining, self._merged = self._merged, []
+        return self._output(remaining)
+
+
+def merge_chunk_segments(
+    chunk_results: List[Tuple[float, float, List[dict]]], gap_threshold: float = 1.0
+) -> List[dict]:
+    """
+    Merge the segments of consecutive, possibly overlapping, chunks into one list of segments.
+    chunk_results holds (chunk start, chunk end, segments) per chunk, with segment
+    times on the timeline of the audio.
+    Words transcribed in the overlap of two chunks are only kept once, and the first segment
+    of a chunk is joined with the last segment of the previous chunk if the pause between
+    them is at most gap_threshold.
+    """
+    merger = ChunkMerger(gap_threshold)
+    for chunk_start, chunk_end, segments in chunk_results:
+        merger.add(chunk_start, chunk_end, segments)
+    return merger.finish()
+
+
+def shift_segments(segments: List[dict], offset: float) -> None:
+    """Move the segments of a chunk, and their words, to the timeline of the audio."""
+    for segment in segments:
+        segment["start"] += offset
+        segment["end"] += offset
+        for word in segment.get("words", ()):
+            word["start"] += offset
+            word["end"] += offset
+
+
+def _segment_words(segments: List[dict], chunk_index: int) -> List[dict]:
+    words = []
+    for segment_index, segment in enumerate(segments):
+        if segment.get("words"):
+            # the times of the words from the model, see word_timestamp_segments
+            words.extend(
+                {
+                    "word": word["word"],
+                    "start": word["start"],
+                    "end": word["end"],
+                    "segment": (chunk_index, segment_index),
+                }
+                for word in segment["words"]
+            )
+            continue
+        # without word times the words are spread evenly over the time of the segment
+        tokens = segment["text"].split()
+        if not tokens:
+            continue
+        step = (segment["end"] - segment["start"]) / len(tokens)
+        for k, token in enumerate(tokens):
+            words.append({
+                "word": token,
+                "start": segment["start"] + k * step,
+                "end": segment["start"] + (k + 1) * step,
+                "segment": (chunk_index, segment_index),
+            })
+    return words
+
+
+def _normalize_word(word: dict) -> str:
+    return word["word"].strip(string.punctuation).lower()
+
+
+def _deduplicate_overlap(
+    previous: List[dict], current: List[dict], overlap_start: float, overlap_end: float
+):
+    """
+    Drop the words that both chunks transcribed in the overlap, returns
+    the words to keep of both chunks.
+    """
+    def middle(word):
+        return (word["start"] + word["end"]) / 2
+
+    tail_start = next(
+        (i for i, word in enumerate(previous) if middle(word) >= overlap_start), len(previous)
+    )
+    head_end = next(
+        (i for i, word in enumerate(current) if middle(word) >= overlap_end), len(current)
+    )
+    tail = [_normalize_word(word) for word in previous[tail_start:]]
+    head = [_normalize_word(word) for word in current[:head_end]]
+
+    # align the words heard by both chunks and cut in the middle of the longest common run of words
+    match = SequenceMatcher(None, tail, head, autojunk=False).find_longest_match(
+        0, len(tail), 0, len(head)
+    )
+    if match.size > 0 and match.size >= min(2, len(tail), len(head)):
+        keep = match.size // 2
+        return previous[:tail_start + match.a + keep], current[match.b + keep:]
+
+    # no common words, cut both chunks in the middle of the overlap
+    cut = (overlap_start + overlap_end) / 2
+    kept_previous = [word for word in previous if middle(word) < cut]
+    return kept_previous, [word for word in current if middle(word) >= cut]
+
+
+def default_batch_size(device, chunk_length_s: int) -> int:
+    """
+    Choose how many chunks to infer at once from the memory that is
+    currently available on the device.
+    Half of the free memory is budgeted for the activations of a batch.
+    """
+    chunk_bytes = chunk_length_s * _BYTES_PER_CHUNK_SECOND
+    if _is_cuda_device(device) and torch.cuda.is_available():
+        free_bytes, _ = torch.cuda.mem_get_info(device)
+        max_batch_size = 32
+    else:
+        try:
+            free_bytes = os.sysconf("SC_AVPHYS_PAGES") * os.sysconf("SC_PAGE_SIZE")
+        except (ValueError, OSError, AttributeError):
+            # sysconf is not available on all platforms (e.g. windows)
+            return 1
+        # on cpu the throughput stops improving beyond a few chunks per batch
+        max_batch_size = 8
+    return int(max(1, min(max_batch_size, (free_bytes // 2) // chunk_bytes)))
+
+
+# Parakeet models typically have a frame shift of 0.08s (80ms)
+PARAKEET_FRAME_SHIFT = 0.08
+# Split segment if silence is > 1.0s
+PARAKEET_GAP_THRESHOLD = 1.0
+
 
 def prepare_segments(hypotheses):
     # Transform the Hypothesis into a segment-based format
-    segments = []
-    full_text = []
     hypo = hypotheses[0]
-    # Parakeet models typically have a frame shift of 0.08s (80ms)
-    frame_shift = 0.08
-    gap_threshold = 1.0  # Split segment if silence is > 1.0s
+    raw_timestamps = getattr(hypo, "timestamp", [])
+    if isinstance(raw_timestamps, dict) and raw_timestamps.get("word"):
+        # NeMo returns the start and end of every word when transcribing with timestamps=True
+        return word_timestamp_segments(raw_timestamps["word"])
 
     words = hypo.text.split() if hypo.text else []
     num_words = len(words)
 
     if num_words == 0:
-        return segments, ""
+        return [], ""
 
     # Some hypotheses may miss timestamp data entirely. Keep processing text with
     # default timings instead of crashing.
-    raw_timestamps = getattr(hypo, "timestamp", [])
+    timestamps = tick_timestamps(raw_timestamps)
+    num_ticks = len(timestamps)
+    if num_ticks == 0:
+        text = " ".join(words)
+        return [{"text": text, "start": 0.0, "end": 0.0}], text
+
+    # Map every word index to the approximate timestamp index of its start and of the next word
+    positions = np.arange(num_words + 1) / num_words * num_ticks
+    tick_indices = np.minimum(positions.astype(np.int64), num_ticks - 1)
+    tick_idx, next_tick_idx = tick_indices[:-1], tick_indices[1:]
+    times = timestamps * PARAKEET_FRAME_SHIFT
+    pause_durations = (timestamps[next_tick_idx] - timestamps[tick_idx]) * PARAKEET_FRAME_SHIFT
+
+    # a segment ends at a long pause and at the last word
+    last_words = np.flatnonzero(pause_durations > PARAKEET_GAP_THRESHOLD)
+    if not len(last_words) or last_words[-1] != num_words - 1:
+        last_words = np.append(last_words, num_words - 1)
+    first_words = np.concatenate(([0], last_words[:-1] + 1))
+    start_times = np.concatenate(([times[0]], times[next_tick_idx[last_words[:-1]]]))
+    end_times = np.maximum(times[tick_idx[last_words]], start_times)
+    return _segments_from_words(words, first_words, last_words, start_times, end_times)
+
+
+def tick_timestamps(raw_timestamps) -> np.ndarray:
+    """
+    The token timestamps of a hypothesis in frames, the values that are not numbers are skipped.
+    """
+    try:
+        timestamps = np.asarray(raw_timestamps, dtype=np.float64)
+        if timestamps.ndim == 1:
+            return timestamps
+    except (TypeError, ValueError):
+        pass
     timestamps = []
     for ts in raw_timestamps:
         try:
             timestamps.append(float(ts))
         except (TypeError, ValueError):
             continue
+    return np.asarray(timestamps, dtype=np.float64)
 
-    num_ticks = len(timestamps)
-    if num_ticks == 0:
-        text = " ".join(words)
-        segments.append({
-            "text": text,
-            "start": 0.0,
-            "end": 0.0,
-        })
-        return segments, text
-
-    current_words = []
-    start_time = timestamps[0] * frame_shift
-
-    for i in range(num_words):
-        current_words.append(words[i])
-        # Map word index to approximate timestamp index
-        tick_idx = min(int((i / num_words) * num_ticks), num_ticks - 1)
-        next_tick_idx = min(int(((i + 1) / num_words) * num_ticks), num_ticks - 1)
-
-        pause_duration = (timestamps[next_tick_idx] - timestamps[tick_idx]) * frame_shift
-
-        if (pause_duration > gap_threshold or i == num_words - 1) and current_words:
-            text = " ".join(current_words)
-            end_time = timestamps[tick_idx] * frame_shift
-            if end_time < start_time:
-                end_time = start_time
-            segments.append({
-                "text": text,
-                "start": round(start_time, 3),
-                "end": round(end_time, 3)
-            })
-            full_text.append(text)
-            if i < num_words - 1:
-                start_time = timestamps[next_tick_idx] * frame_shift
-                current_words = []
-    return segments, " ".join(full_text)
+
+def word_timestamp_segments(word_timestamps: List[dict]):
+    """
+    Segments from the word timestamps of a NeMo hypothesis, split where the silence
+    between two words is too long.
+    The segments keep their words with the times, the chunk merger uses them to
+    find the words of the overlaps.
+    """
+    words = [entry["word"] for entry in word_timestamps]
+    if "start" in word_timestamps[0]:
+        starts = np.array([entry["start"] for entry in word_timestamps], dtype=np.float64)
+        ends = np.array([entry["end"] for entry in word_timestamps], dtype=np.float64)
+    else:
+        # older NeMo versions only return the offsets in frames
+        starts = (
+            np.array([entry["start_offset"] for entry in word_timestamps], dtype=np.float64)
+            * PARAKEET_FRAME_SHIFT
+        )
+        ends = (
+            np.array([entry["end_offset"] for entry in word_timestamps], dtype=np.float64)
+            * PARAKEET_FRAME_SHIFT
+        )
+
+    breaks = np.flatnonzero(starts[1:] - ends[:-1] > PARAKEET_GAP_THRESHOLD)
+    last_words = np.append(breaks, len(words) - 1)
+    first_words = np.concatenate(([0], breaks + 1))
+    start_times = starts[first_words]
+    end_times = np.maximum(np.maximum.reduceat(ends, first_words), start_times)
+    segments, full_text = _segments_from_words(
+        words, first_words, last_words, start_times, end_times
+    )
+    word_times = [
+        {"word": word, "start": round(start, 3), "end": round(end, 3)}
+        for word, start, end in zip(words, starts.tolist(), ends.tolist())
+    ]
+    for segment, first, last in zip(segments, first_words.tolist(), last_words.tolist()):
+        segment["words"] = word_times[first:last + 1]
+    return segments, full_text
+
+
+def _segments_from_words(words: List[str], first_words, last_words, start_times, end_times):
+    segments = [
+        {"text": " ".join(words[first:last + 1]), "start": round(start, 3), "end": round(end, 3)}
+        for first, last, start, end in zip(
+            first_words.tolist(), last_words.tolist(), start_times.tolist(), end_times.tolist()
+        )
+    ]
+    return segments, " ".join(segment["text"] for segment in segments)
 
 def prepare_output(all_segments, full_text):
     segments: List[TranscriptionSegment] = []
@@ -309,6 +788,8 @@ def prepare_output(all_segments, full_text):
 
 """Convert audio to mono 16kHz"""
 def convert_to_16k_mono_audio(file: str, sample_rate: int = 16000) -> np.ndarray:
+    import torchaudio
+    import torchaudio.transforms as T
     waveform, sr = torchaudio.load(file)
 
     # Convert to mono if stereo
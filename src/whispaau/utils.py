@@ -2,15 +2,16 @@
 # -*- coding: utf-8 -*-
 
 """ """
+import os
 from _csv import Writer
 
 from . import writers
 
 from pathlib import Path
 from whisperx import utils
-from whisperx.alignment import DEFAULT_ALIGN_MODELS_HF, DEFAULT_ALIGN_MODELS_TORCH
-from typing import TextIO
+from whisperx.utils import ResultWriter
 from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 
 WRITERS = {}
 
@@ -25,6 +26,11 @@ OFFICIAL_WRITERS = {
     for name, cls in utils.__dict__.items()
     if isinstance(cls, type) and name.startswith("Write")
 }
+# the segment level formats of whisperx are written from the shared segment
+# view, see writers.result_view
+OFFICIAL_WRITERS.update(
+    {"txt": writers.SegmentTXT, "tsv": writers.SegmentTSV, "audacity": writers.SegmentAudacity}
+)
 MERGED_SPEAKERS_WRITERS = {
     name.strip("Write").lower(): cls
     for name, cls in utils.__dict__.items()
@@ -37,30 +43,84 @@ MERGED_SPEAKERS_WRITERS.update(CUSTOMIZED_WRITERS)
 WRITERS.update(CUSTOMIZED_WRITERS)
 WRITERS.update(OFFICIAL_WRITERS)
 
-# Function to move the csv writer to the end
-def move_csv_to_end(dictionary):
-    if 'csv' in dictionary:
-        dictionary.move_to_end('csv')
-    return dictionary
-# sorting the writer dictionaries so that the CSV writer runs last. The data is cleaned before writing CSV to avoid errors.
-# see https://github.com/aau-claaudia/transcriber/issues/20
-MERGED_SPEAKERS_WRITERS = move_csv_to_end(OrderedDict(sorted(MERGED_SPEAKERS_WRITERS.items())))
-WRITERS = move_csv_to_end(OrderedDict(sorted(WRITERS.items())))
+# sorting the writer dictionaries so that the formats are always written in the same order.
+# The writers do not change the result, the CSV writer cleans a copy, see
+# https://github.com/aau-claaudia/transcriber/issues/20
+MERGED_SPEAKERS_WRITERS = OrderedDict(sorted(MERGED_SPEAKERS_WRITERS.items()))
+WRITERS = OrderedDict(sorted(WRITERS.items()))
 
+# The file a writer has written for the output path, named like in ResultWriter.__call__.
+# The list is empty if the writer removed the file again after an error.
+def written_files(
+    writer: ResultWriter, output_dir: str | Path, output_path: str | Path
+) -> list[Path]:
+    basename = os.path.splitext(os.path.basename(output_path))[0]
+    path = Path(output_dir) / f"{basename}.{writer.extension}"
+    return [path] if path.is_file() else []
+
+# The returned function writes the result and returns the paths of the files it has written
 def get_writer(output_format: str, output_dir: str | Path, writer_list):
     if output_format == "all":
         all_writers = [writer(output_dir) for writer in writer_list.values()]
 
-        def write_all(result: dict, file: TextIO, options: dict):
-            for writer in all_writers:
-                writer(result, file, options)
+        def write_all(result: dict, file: str | Path, options: dict) -> list[Path]:
+            # the speakers, texts and times are prepared once for all the customized writers
+            options = {**options, writers.SEGMENT_VIEW_OPTION: writers.result_view(result)}
+            # the formats are independent of each other and are written at the same time
+            with ThreadPoolExecutor(max_workers=len(all_writers)) as executor:
+                futures = [executor.submit(writer, result, file, options) for writer in all_writers]
+            for future in futures:
+                future.result()
+            return [
+                path for writer in all_writers for path in written_files(writer, output_dir, file)
+            ]
 
         return write_all
     # check if the selected format is one of the available formats, when requesting e.g. txt which is not in merge set
     if output_format in writer_list:
-        return writer_list[output_format](output_dir)
+        writer = writer_list[output_format](output_dir)
+
+        def write(result: dict, file: str | Path, options: dict) -> list[Path]:
+            writer(result, file, options)
+            return written_files(writer, output_dir, file)
+
+        return write
     else:
         return None
 
+# writers that can write the segments while the transcription is in progress,
+# see writers.IncrementalWriter
+INCREMENTAL_WRITERS = {
+    "csv": writers.IncrementalCSV,
+    "dote": writers.IncrementalDOTE,
+    "srt": writers.IncrementalSRT,
+    "txt": writers.IncrementalTXT,
+    "vtt": writers.IncrementalVTT,
+}
+
+def get_incremental_writers(
+    output_format: str, output_dir: str | Path
+) -> list[writers.IncrementalWriter]:
+    if output_format == "all":
+        return [writer(output_dir) for writer in INCREMENTAL_WRITERS.values()]
+    if output_format in INCREMENTAL_WRITERS:
+        return [INCREMENTAL_WRITERS[output_format](output_dir)]
+    return []
+
+# Additional supported alignment models
+ADDITIONAL_ALIGN_MODELS_HF = {
+    "fo": "carlosdanielhernandezmena/wav2vec2-large-xlsr-53-faroese-100h",
+    "sv": "KBLab/wav2vec2-large-voxrex-swedish",
+    "is": "m3hrdadfi/wav2vec2-large-xlsr-icelandic",
+}
+
+def get_align_models():
+    # whisperx.alignment imports torch and transformers, it is only
+    # imported once alignment is needed
+    from whisperx.alignment import DEFAULT_ALIGN_MODELS_HF, DEFAULT_ALIGN_MODELS_TORCH
+    DEFAULT_ALIGN_MODELS_HF.update(ADDITIONAL_ALIGN_MODELS_HF)
+    return DEFAULT_ALIGN_MODELS_HF, DEFAULT_ALIGN_MODELS_TORCH
+
 def is_speaker_diarization_supported(language: str) -> bool:
-    return (language in DEFAULT_ALIGN_MODELS_HF) or (language in DEFAULT_ALIGN_MODELS_TORCH)
\ No newline at end of file
+    align_models_hf, align_models_torch = get_align_models()
+    return (language in align_models_hf) or (language in align_models_torch)
\ No newline at end of file
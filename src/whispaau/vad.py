@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+""" Voice activity detection for skipping long silences before transcription """
+
+from typing import Any, List, Tuple
+
+import numpy as np
+
+# Frames quieter than the noise floor plus this margin are considered silent
+_MARGIN_DB = 10.0
+# Never treat frames louder than this as silence, digital silence would
+# otherwise give a very low threshold
+_MIN_THRESHOLD_DB = -60.0
+
+
+class SpeechRegions:
+    """
+    The regions of an audio buffer that contain speech, in samples.
+    Transcribing compact() instead of the full buffer skips the silence between the regions,
+    to_original() maps the times of the compacted audio back to the timeline of the full buffer.
+    """
+
+    def __init__(self, regions: List[Tuple[int, int]], sample_rate: int):
+        self.regions = regions
+        self.sample_rate = sample_rate
+        starts = np.array([start for start, _ in regions], dtype=np.int64)
+        lengths = np.array([end - start for start, end in regions], dtype=np.int64)
+        self._original_starts = starts / sample_rate
+        self._compact_starts = (np.cumsum(lengths) - lengths) / sample_rate
+
+    def __len__(self) -> int:
+        return len(self.regions)
+
+    @property
+    def speech_duration(self) -> float:
+        return sum(end - start for start, end in self.regions) / self.sample_rate
+
+    def compact(self, samples: np.ndarray) -> np.ndarray:
+        """Concatenate the speech regions of the samples."""
+        if not self.regions:
+            return samples[:0]
+        return np.concatenate([samples[start:end] for start, end in self.regions])
+
+    def to_original(self, times: Any, is_end: bool = False) -> np.ndarray:
+        """
+        Map times in seconds on the compacted audio to the original audio.
+        A time exactly at the join of two regions is mapped to the start of the later region,
+        or to the end of the earlier region if is_end is set.
+        """
+        times = np.asarray(times, dtype=np.float64)
+        if not self.regions:
+            return times
+        side = "left" if is_end else "right"
+        index = np.clip(
+            np.searchsorted(self._compact_starts, times, side=side) - 1, 0, len(self.regions) - 1
+        )
+        return self._original_starts[index] + (times - self._compact_starts[index])
+
+    def remap_segments(self, segments: List[dict]) -> List[dict]:
+        """
+        Move the start and end times of the segments, and of their words,
+        to the original audio in place.
+        """
+        for segment in segments:
+            for item in [segment] + segment.get("words", []):
+                if "start" in item:
+                    item["start"] = round(float(self.to_original(item["start"])), 3)
+                if "end" in item:
+                    item["end"] = round(float(self.to_original(item["end"], is_end=True)), 3)
+        return segments
+
+
+def detect_speech(
+    samples: np.ndarray,
+    sample_rate: int,
+    frame_s: float = 0.03,
+    min_silence_s: float = 2.0,
+    padding_s: float = 0.25,
+) -> SpeechRegions:
+    """
+    Find the speech regions from the frame energy relative to the noise floor of the recording.
+    Only silences of at least min_silence_s are removed, and padding_s of audio is kept on both
+    sides of every speech region so that soft word onsets and endings are not cut.
+    """
+    frame = max(1, int(frame_s * sample_rate))
+    n_frames = len(samples) // frame
+    if n_frames == 0:
+        return SpeechRegions([(0, len(samples))] if len(samples) else [], sample_rate)
+
+    frames = samples[:n_frames * frame].reshape(n_frames, frame)
+    # einsum computes the sum of squares without an intermediate copy of the audio
+    energy = np.einsum("ij,ij->i", frames, frames, dtype=np.float64) / frame
+    energy_db = 10 * np.log10(energy + 1e-10)
+    threshold = max(float(np.percentile(energy_db, 10)) + _MARGIN_DB, _MIN_THRESHOLD_DB)
+
+    speech = energy_db > threshold
+    if not speech.any():
+        return SpeechRegions([], sample_rate)
+
+    # start and end frame of every run of speech frames
+    edges = np.diff(np.concatenate(([0], speech.astype(np.int8), [0])))
+    run_starts = np.flatnonzero(edges == 1)
+    run_ends = np.flatnonzero(edges == -1)
+
+    min_silence = int(min_silence_s * sample_rate)
+    padding = int(padding_s * sample_rate)
+    regions: List[Tuple[int, int]] = []
+    for run_start, run_end in zip(run_starts * frame, run_ends * frame):
+        start = max(0, run_start - padding)
+        end = min(len(samples), run_end + padding)
+        if regions and start - regions[-1][1] < min_silence:
+            regions[-1] = (regions[-1][0], max(regions[-1][1], end))
+        else:
+            regions.append((start, end))
+    # the samples after the last whole frame belong to the last region if it reaches them
+    if regions and regions[-1][1] >= n_frames * frame:
+        regions[-1] = (regions[-1][0], len(samples))
+    return SpeechRegions(regions, sample_rate)
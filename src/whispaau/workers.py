@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+""" Process pool for transcribing several input files in parallel """
+
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Any, Callable, Optional
+
+from whispaau.logging import Logger
+
+# The logger of the current worker process, it forwards the log records to the parent process
+_worker_log: Optional[Logger] = None
+
+
+def split_threads(threads: int, workers: int) -> int:
+    """Split the torch cpu threads evenly between the workers, 0 threads means all the cores."""
+    total = threads if threads > 0 else (os.cpu_count() or 1)
+    return max(1, total // workers)
+
+
+def get_worker_log() -> Logger:
+    return _worker_log
+
+
+def _init_worker(
+    log_queue, name: str, output_dir: Path, threads: int, log_stages: bool, run_id: str
+) -> None:
+    global _worker_log
+    import torch
+    torch.set_num_threads(threads)
+    _worker_log = Logger(
+        name=name, output_dir=output_dir, log_queue=log_queue, log_stages=log_stages, run_id=run_id
+    )
+
+
+def run_pool(
+    task: Callable[[Path], Any],
+    files: list[Path],
+    workers: int,
+    threads: int,
+    log: Logger,
+    on_result: Optional[Callable[[Path, Any], None]] = None,
+    on_error: Optional[Callable[[Path, Exception], None]] = None,
+    on_ordered: Optional[Callable[[Path, Any], None]] = None,
+) -> list[Any]:
+    """
+    Run the task for every file in a pool of worker processes.
+    Each worker keeps its own model cache for the lifetime of the pool. The log records of
+    the workers are written by the handlers of the parent logger and the results are
+    returned in the order of files.
+    The files are started in the order of files. on_result is called in the parent process with
+    every file and its result as soon as the result is available, in the order the files finish.
+    on_ordered is called with the same results in the order of files, a result is held back until
+    all the earlier files are finished, so that e.g. the archive does not depend on which worker is
+    faster. A file that failed is not passed to on_ordered.
+    If the task raises for a file, on_error is called with the file and the exception, the files
+    that have not started are cancelled, the running files are still finished and reported, and
+    the first exception is raised.
+    """
+    # spawn instead of fork, CUDA can not be re-initialised in a forked process
+    context = multiprocessing.get_context("spawn")
+    log_queue = context.Queue()
+    worker_threads = split_threads(threads, workers)
+    log.log_workers(workers, worker_threads)
+
+    listener = log.listen(log_queue)
+    try:
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=context,
+            initializer=_init_worker,
+            initargs=(
+                log_queue,
+                log.name,
+                log.output_dir,
+                worker_threads,
+                log.log_stages,
+                log.run_id,
+            ),
+        ) as executor:
+            futures = {executor.submit(task, file): index for index, file in enumerate(files)}
+            results = [None] * len(files)
+            # the indexes of the files that finished before an earlier file,
+            # and the next index to release
+            held: dict[int, bool] = {}
+            released = [0]
+
+            def release(index: int, succeeded: bool) -> None:
+                held[index] = succeeded
+                while released[0] in held:
+                    if held.pop(released[0]) and on_ordered is not None:
+                        on_ordered(files[released[0]], results[released[0]])
+                    released[0] += 1
+
+            def report(future) -> Optional[Exception]:
+                index = futures[future]
+                try:
+                    results[index] = future.result()
+                except Exception as error:
+                    if on_error is not None:
+                        on_error(files[index], error)
+                    release(index, False)
+                    return error
+                if on_result is not None:
+                    on_result(files[index], results[index])
+                release(index, True)
+                return None
+
+            reported = set()
+            first_error = None
+            for future in as_completed(futures):
+                reported.add(future)
+                first_error = report(future)
+                if first_error is not None:
+                    break
+            if first_error is None:
+                return results
+            # fail fast, the queued files would only be transcribed to be thrown away.
+            # as_completed is not woken by the futures that the executor cancels, so the running
+            # files are waited for one by one
+            executor.shutdown(wait=False, cancel_futures=True)
+            for future in futures:
+                if future not in reported and not future.cancel():
+                    report(future)
+            raise first_error
+    finally:
+        listener.stop()
@@ -2,47 +2,51 @@ import csv
 import json
 import os
 from datetime import datetime
-from typing import TextIO
+from pathlib import Path
+from typing import NamedTuple, Optional, TextIO
 
 import docx
+from whisperx import utils
 from whisperx.utils import ResultWriter, format_timestamp
 
-# This dict holds the result of the transcription with grouped speakers
-merged_speakers_result:  dict = {}
 # This function groups the speaker lines with the same speaker into one
+# It returns a new result and keeps no state between calls, so files can be merged concurrently
 def merge_speakers(result: dict) -> dict:
-    # only create the grouping one time per input file
-    if len(merged_speakers_result) == 0:
-        # add the segments list and language
-        merged_speakers_result["segments"] = []
-        merged_speakers_result["language"] = result["language"]
-
-        current_speaker: str = ""
-        for line in result["segments"]:
-            speaker, text = extract_speaker_and_text(line)
-            if speaker != current_speaker:
-                # create new dict and add to segments list
-                new_segment = {
-                    "speaker": speaker,
-                    "text": text,
-                    "start": line["start"],
-                    "end": line["end"]
-                }
-                merged_speakers_result["segments"].append(new_segment)
-                current_speaker = speaker
-            else:
-                # add the text to the previous dict in the segments list
-                merged_speakers_result["segments"][-1]["text"] = (merged_speakers_result["segments"][-1]["text"].strip()
-                                                                  + " "
-                                                                  + text.strip())
-                # push the end time forward
-                merged_speakers_result["segments"][-1]["end"] = line["end"]
+    segments = []
+    # the texts of the lines in the current group, joined once the group is complete
+    parts: list[str] = []
+    current_speaker: str = ""
+    for line in result["segments"]:
+        speaker, text = extract_speaker_and_text(line)
+        if speaker != current_speaker:
+            if segments:
+                segments[-1]["text"] = join_speaker_texts(parts)
+            # create new dict and add to segments list
+            segments.append({
+                "speaker": speaker,
+                "text": text,
+                "start": line["start"],
+                "end": line["end"]
+            })
+            parts = [text]
+            current_speaker = speaker
+        else:
+            parts.append(text)
+            # push the end time forward
+            segments[-1]["end"] = line["end"]
+    if segments:
+        segments[-1]["text"] = join_speaker_texts(parts)
 
-    return merged_speakers_result
+    return {"segments": segments, "language": result["language"]}
 
-# This function will clear the merged speaker data. Use the function before creating data for the next file.
-def reset_merge_speaker_data():
-    merged_speakers_result.clear()
+# Joins the texts of consecutive lines of one speaker. A single line keeps its text as it
+# is, otherwise the stripped texts are joined by a space, like stripping and appending
+# the texts one at a time would.
+def join_speaker_texts(parts: list[str]) -> str:
+    if len(parts) == 1:
+        return parts[0]
+    head = " ".join(stripped for stripped in (part.strip() for part in parts[:-1]) if stripped)
+    return head + " " + parts[-1].strip()
 
 def get_field_names(result: dict) -> list[str]:
     # make sure that the CSV header contains the 'speaker' header even though the first line has no speaker
@@ -54,6 +58,81 @@ def get_field_names(result: dict) -> list[str]:
     # if none of the lines had a speaker then just return the keys from the first line
     return list(result["segments"][0].keys())
 
+# The options key of the segment view that get_writer shares between the writers of one result
+SEGMENT_VIEW_OPTION = "segment_view"
+
+class SegmentView(NamedTuple):
+    """
+    A segment with the stripped speaker and text and the formatted times, as the writers show it.
+    """
+    start: float
+    end: float
+    speaker: str
+    text: str
+    start_timestamp: str
+    end_timestamp: str
+    # the speaker of the segment as it is, None if the segment has no speaker
+    speaker_label: Optional[str] = None
+
+def segment_view(line: dict) -> SegmentView:
+    speaker, text = extract_speaker_and_text(line)
+    return SegmentView(
+        start=line["start"],
+        end=line["end"],
+        speaker=speaker.strip(),
+        text=text.strip(),
+        start_timestamp=format_timestamp(line["start"], True),
+        end_timestamp=format_timestamp(line["end"], True),
+        speaker_label=line.get("speaker"),
+    )
+
+# The view of all segments of a result, it is built once and read by all the
+# writers without changing the result
+def result_view(result: dict) -> list[SegmentView]:
+    return [segment_view(line) for line in result["segments"]]
+
+def get_result_view(result: dict, options: dict) -> list[SegmentView]:
+    view = options.get(SEGMENT_VIEW_OPTION)
+    return result_view(result) if view is None else view
+
+# The segment level formats of whisperx written from the segment view, the output is
+# the same as whisperx writes.
+# The subtitle formats (srt, vtt) break the lines at the word timings and json has all the data of
+# the result, they are written by whisperx from the result.
+class SegmentTXT(utils.WriteTXT):
+    def write_result(self, result: dict, file: TextIO, options: dict):
+        for segment in get_result_view(result, options):
+            if segment.speaker_label is not None:
+                print(f"[{segment.speaker_label}]: {segment.text}", file=file)
+            else:
+                print(segment.text, file=file)
+
+
+class SegmentTSV(utils.WriteTSV):
+    def write_result(self, result: dict, file: TextIO, options: dict):
+        print("start", "end", "text", sep="\t", file=file)
+        for segment in get_result_view(result, options):
+            print(
+                round(1000 * segment.start),
+                round(1000 * segment.end),
+                segment.text.replace("\t", " "),
+                sep="\t",
+                file=file,
+            )
+
+
+class SegmentAudacity(utils.WriteAudacity):
+    def write_result(self, result: dict, file: TextIO, options: dict):
+        for segment in get_result_view(result, options):
+            speaker = f"[[{segment.speaker_label}]]" if segment.speaker_label is not None else ""
+            print(
+                segment.start,
+                segment.end,
+                speaker + segment.text.replace("\t", " "),
+                sep="\t",
+                file=file,
+            )
+
 def write_error(exception: Exception, extension: str):
     print(f"An error occurred while attempting to write the {extension} format: {exception}")
 
@@ -66,10 +145,12 @@ class WriteCSV(ResultWriter):
                 # empty output from the whisper algorithm
                 return
             fieldnames: list[str] = get_field_names(result)
-            clean_result_for_csv_writer(fieldnames, result)
+            # the other writers read the same result, the entries that are not in the
+            # header are removed from a copy
+            clean_result = clean_result_for_csv_writer(fieldnames, result)
             writer = csv.DictWriter(file, fieldnames=fieldnames)
             writer.writeheader()
-            writer.writerows(result["segments"])
+            writer.writerows(clean_result["segments"])
         except Exception as e:
             write_error(e, self.extension)
             remove_output_file(file)
@@ -79,25 +160,17 @@ class WriteDOTE(ResultWriter):
     extension: str = "dote.json"
 
     @staticmethod
-    def format_result(result: dict):
+    def format_result(result: dict, view: Optional[list[SegmentView]] = None):
         if not result["segments"]:
             # empty output from the whisper algorithm
             return
-        interface = {"lines": []}
-        for line in result["segments"]:
-            speaker, text = extract_speaker_and_text(line)
-            line_add = {
-                "startTime": format_timestamp(line["start"], True),
-                "endTime": format_timestamp(line["end"], True),
-                "speakerDesignation": speaker.strip(),
-                "text": text.strip(),
-            }
-            interface["lines"].append(line_add)
-        return interface
+        if view is None:
+            view = result_view(result)
+        return {"lines": [dote_view_line(segment) for segment in view]}
 
     def write_result(self, result: dict, file: TextIO, options: dict):
         try:
-            transcription_data = self.format_result(result)
+            transcription_data = self.format_result(result, options.get(SEGMENT_VIEW_OPTION))
             json.dump(transcription_data, file)
         except Exception as e:
             write_error(e, self.extension)
@@ -133,20 +206,157 @@ class WriteDOCX(ResultWriter):
 
             p = document.add_paragraph()
             max_time = result["segments"][-1]["end"]
-            for line in result["segments"]:
-                speaker, text = extract_speaker_and_text(line)
-                time = p.add_run(self.format_time(line["start"], line["end"], max_time))
+            for segment in get_result_view(result, options):
+                time = p.add_run(self.format_time(segment.start, segment.end, max_time))
                 time.italic = True
                 p.add_run("\t")
-                p.add_run(f'{speaker.strip()}\n')
+                p.add_run(f'{segment.speaker}\n')
                 p.add_run("\t")
-                p.add_run(f'{text.strip()}\n')
+                p.add_run(f'{segment.text}\n')
             document.save(file.name)
         except Exception as e:
             write_error(e, self.extension)
             remove_output_file(file)
 
 
+def dote_view_line(segment: SegmentView) -> dict:
+    return {
+        "startTime": segment.start_timestamp,
+        "endTime": segment.end_timestamp,
+        "speakerDesignation": segment.speaker,
+        "text": segment.text,
+    }
+
+
+def dote_line(line: dict) -> dict:
+    return dote_view_line(segment_view(line))
+
+
+class IncrementalWriter:
+    """
+    Writes the segments of a transcription while it is in progress: open() creates the output file,
+    append() writes and flushes the next segments and finalize() completes and closes the file.
+    The segments only have start, end and text, plus a speaker if known, and are written
+    like the segments without word timings by the corresponding ResultWriter.
+    """
+    extension: str
+
+    def __init__(self, output_dir: str | Path):
+        self.output_dir = output_dir
+        self.file: Optional[TextIO] = None
+        self.path: Optional[Path] = None
+
+    def open(self, output_path: str | Path, options: dict):
+        # the same name as the ResultWriter of the final output, which strips
+        # what looks like an extension
+        basename = os.path.splitext(os.path.basename(output_path))[0]
+        self.path = Path(self.output_dir) / f"{basename}.{self.extension}"
+        self.file = open(self.path, "w", encoding="utf-8")
+        self.options = options
+        self.write_header()
+
+    def append(self, segments: list[dict]):
+        if segments:
+            self.write_segments(segments)
+            self.file.flush()
+
+    def finalize(self):
+        self.write_footer()
+        self.file.close()
+
+    def write_header(self):
+        pass
+
+    def write_segments(self, segments: list[dict]):
+        raise NotImplementedError
+
+    def write_footer(self):
+        pass
+
+
+class IncrementalTXT(IncrementalWriter):
+    extension: str = "txt"
+
+    def write_segments(self, segments: list[dict]):
+        for segment in segments:
+            text = segment["text"].strip()
+            if "speaker" in segment:
+                text = f"[{segment['speaker']}]: {text}"
+            print(text, file=self.file)
+
+
+class IncrementalVTT(IncrementalWriter):
+    extension: str = "vtt"
+    always_include_hours: bool = False
+    decimal_marker: str = "."
+
+    def write_header(self):
+        print("WEBVTT\n", file=self.file)
+
+    def cues(self, segments: list[dict]):
+        for segment in segments:
+            text = segment["text"].strip().replace("-->", "->")
+            if "speaker" in segment:
+                text = f"[{segment['speaker']}]: {text}"
+            yield (
+                format_timestamp(segment["start"], self.always_include_hours, self.decimal_marker),
+                format_timestamp(segment["end"], self.always_include_hours, self.decimal_marker),
+                text,
+            )
+
+    def write_segments(self, segments: list[dict]):
+        for start, end, text in self.cues(segments):
+            print(f"{start} --> {end}\n{text}\n", file=self.file)
+
+
+class IncrementalSRT(IncrementalVTT):
+    extension: str = "srt"
+    always_include_hours: bool = True
+    decimal_marker: str = ","
+
+    def write_header(self):
+        # the cues are numbered across the appends
+        self.cue_number = 0
+
+    def write_segments(self, segments: list[dict]):
+        for start, end, text in self.cues(segments):
+            self.cue_number += 1
+            print(f"{self.cue_number}\n{start} --> {end}\n{text}\n", file=self.file)
+
+
+class IncrementalCSV(IncrementalWriter):
+    extension: str = "csv"
+
+    def write_header(self):
+        # the header is written with the first segments, see get_field_names
+        self.writer: Optional[csv.DictWriter] = None
+
+    def write_segments(self, segments: list[dict]):
+        if self.writer is None:
+            fieldnames = get_field_names({"segments": segments})
+            # like clean_result_for_csv_writer, keys that are not in the header are left out
+            self.writer = csv.DictWriter(self.file, fieldnames=fieldnames, extrasaction="ignore")
+            self.writer.writeheader()
+        self.writer.writerows(segments)
+
+
+class IncrementalDOTE(IncrementalWriter):
+    extension: str = "dote.json"
+
+    def write_header(self):
+        self.file.write('{"lines": [')
+        self.lines_written = 0
+
+    def write_segments(self, segments: list[dict]):
+        for line in segments:
+            # same separators as json.dump in WriteDOTE
+            self.file.write((", " if self.lines_written else "") + json.dumps(dote_line(line)))
+            self.lines_written += 1
+
+    def write_footer(self):
+        self.file.write("]}")
+
+
 def extract_speaker_and_text(line):
     # if the algorithm was unable to determine the speaker, the line object will not have a speaker object
     if "speaker" in line:
@@ -169,14 +379,12 @@ def remove_output_file(file: TextIO):
     except Exception as e:
         print(f"An error occurred while attempting to delete the output file:  {file_path}, exception: {e}")
 
-# This method removes data entries in the result dictionary that are not part of the header set
-# see https://github.com/aau-claaudia/transcriber/issues/20
+# This method returns a copy of the result without the data entries that are not part of the header
+# set, the result itself is not changed. see https://github.com/aau-claaudia/transcriber/issues/20
 def clean_result_for_csv_writer(headers: list[str], result: dict) -> dict:
-    for line in result["segments"]:
-        # line is a dictionary, and we want to remove entries that have a key name which is not in the headers list
-        # for this line create a set of keys to remove
-        keys_to_remove = [key for key in line.keys() if key not in headers]
-        for key in keys_to_remove:
-            # remove the entry
-            del line[key]
-    return result
\ No newline at end of file
+    header_set = set(headers)
+    segments = [
+        {key: value for key, value in line.items() if key in header_set}
+        for line in result["segments"]
+    ]
+    return {**result, "segments": segments}
\ No newline at end of file
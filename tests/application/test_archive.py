@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+""" Test the archive of the output files """
+import os
+import tempfile
+import unittest
+from pathlib import Path
+
+from pyzipper import AESZipFile, ZipFile, ZIP_DEFLATED, ZIP_STORED
+
+from whispaau.archive import ArchiveBuilder, archiving
+
+
+class TestArchive(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.output_dir = Path(self.temp_dir.name)
+        self.files = []
+        for i in range(12):
+            suffix = "docx" if i % 4 == 0 else "json"
+            path = self.output_dir / f"file{i}_small_da.{suffix}"
+            path.write_bytes(os.urandom(64) + b"transcription " * (i * 5000))
+            self.files.append(path)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_encrypted_archive(self):
+        output_file = self.output_dir / "job.zip"
+        archiving(Path("job"), output_file, self.files, secret_password="halløj")
+
+        with AESZipFile(output_file) as archive:
+            archive.setpassword("halløj".encode("utf-8"))
+            self.assertIsNone(archive.testzip())
+            self.assertEqual(archive.namelist(), [f"job/{file.name}" for file in self.files])
+            for file in self.files:
+                self.assertEqual(archive.read(f"job/{file.name}"), file.read_bytes())
+
+            archive.setpassword(b"wrong")
+            with self.assertRaises(RuntimeError):
+                archive.read(f"job/{self.files[1].name}")
+
+    def test_incremental_archive(self):
+        output_file = self.output_dir / "job.zip"
+        with ArchiveBuilder(Path("job"), output_file, max_workers=4) as archive:
+            archive.add(self.files[:5])
+            archive.add(self.files[3:])
+            # the archive is not added to itself
+            archive.add([output_file])
+
+        with ZipFile(output_file) as archive:
+            self.assertIsNone(archive.testzip())
+            self.assertEqual(archive.namelist(), [f"job/{file.name}" for file in self.files])
+            for file, info in zip(self.files, archive.infolist()):
+                self.assertEqual(archive.read(info), file.read_bytes())
+                # documents are compressed already and stored as they are
+                self.assertEqual(
+                    info.compress_type, ZIP_STORED if file.suffix == ".docx" else ZIP_DEFLATED
+                )
+
+    def test_entries_in_flight_are_limited(self):
+        output_file = self.output_dir / "job.zip"
+        with ArchiveBuilder(Path("job"), output_file, max_workers=2) as archive:
+            archive.add(self.files)
+            # the other files are in the archive already
+            self.assertLessEqual(len(archive.pending), 4)
+            self.assertGreaterEqual(len(archive.checksums), len(self.files) - 4)
+
+        with ZipFile(output_file) as archive:
+            self.assertEqual(archive.namelist(), [f"job/{file.name}" for file in self.files])
+
+    def test_aborted_archive_is_removed(self):
+        output_file = self.output_dir / "job.zip"
+        with self.assertRaises(ValueError):
+            with ArchiveBuilder(Path("job"), output_file) as archive:
+                archive.add(self.files)
+                raise ValueError("the job failed")
+        self.assertFalse(output_file.exists())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,23 @@
+import os
+import unittest
+from pathlib import Path
+
+import numpy as np
+
+from whispaau.audio import load_audio, SAMPLE_RATE
+
+
+class TestAudio(unittest.TestCase):
+    def setUp(self):
+        current_path = Path(os.path.dirname(os.path.realpath(__file__)))
+        self.shorts_input = current_path / ".." / "resources" / "end2end" / "input" / "shorts.m4a"
+
+    def test_load_audio(self):
+        audio = load_audio(self.shorts_input)
+
+        assert audio.sample_rate == SAMPLE_RATE
+        assert audio.samples.dtype == np.float32
+        assert audio.samples.ndim == 1
+        # the decoded length can differ slightly from the duration in the container header
+        assert abs(audio.duration - 4.992) < 0.25
+        assert audio.duration == len(audio.samples) / SAMPLE_RATE
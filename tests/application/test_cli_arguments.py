@@ -40,6 +40,16 @@ class TestCliArguments(unittest.TestCase):
         self.assertIsNone(args["language"])
         self.assertFalse(args["logging"])
         self.assertEqual(args["threads"], 0)
+        self.assertEqual(args["workers"], 1)
+        self.assertEqual(args["batch_size"], 0)
+        self.assertFalse(args["vad"])
+        self.assertFalse(args["no_cache"])
+        self.assertEqual(args["quantize"], "none")
+        self.assertFalse(args["log_stages"])
+        self.assertFalse(args["resume"])
+        self.assertIsNone(args["stream"])
+        self.assertEqual(args["stream_format"], "ffmpeg")
+        self.assertEqual(args["latency"], 10.0)
         self.assertEqual(args["output_format"], "all")
         self.assertEqual(args["prompt"], [])
         self.assertEqual(args["archive_password"], "gg")
@@ -47,6 +57,12 @@ class TestCliArguments(unittest.TestCase):
 
         self.assertNotIn("input_dir", args)
 
+    def test_parse_arguments_stream(self):
+        args = parse_arguments(["--stream", "-", "-m", "parakeet-tdt-0.6b-v3", "--latency", "5"])
+        self.assertEqual(args["stream"], "-")
+        self.assertEqual(args["latency"], 5.0)
+        self.assertEqual(args["input"], set())
+
     def test_parse_arguments_no_input(self):
         with self.assertRaises(SystemExit):
             parse_arguments([])  # Simulate no input arguments, should raise an error
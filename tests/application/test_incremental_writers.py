@@ -0,0 +1,98 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+from whisperx.utils import WriteSRT, WriteTXT, WriteVTT
+
+from whispaau.utils import written_files
+from whispaau.writers import (
+    IncrementalCSV,
+    IncrementalDOTE,
+    IncrementalSRT,
+    IncrementalTXT,
+    IncrementalVTT,
+    WriteCSV,
+    WriteDOTE,
+)
+
+OPTIONS = {"highlight_words": None, "max_line_count": None, "max_line_width": None}
+
+
+def segments():
+    return [
+        {"start": 0.0, "end": 1.5, "text": " Hello there.", "speaker": "SPEAKER_00"},
+        {"start": 1.5, "end": 3.25, "text": " How are you?", "speaker": "SPEAKER_01"},
+        {"start": 3.25, "end": 61.0, "text": " Fine --> thanks.", "speaker": "SPEAKER_00"},
+    ]
+
+
+class TestIncrementalWriters(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.output_dir = Path(self.temp_dir.name)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def assert_same_output(self, incremental_writer, result_writer):
+        # the incremental output is written in two appends
+        writer = incremental_writer(self.output_dir)
+        writer.open("incremental", OPTIONS)
+        writer.append(segments()[:1])
+        writer.append(segments()[1:])
+        writer.finalize()
+
+        result_writer(str(self.output_dir))(
+            {"segments": segments(), "language": "en"}, "complete.wav", OPTIONS
+        )
+
+        extension = incremental_writer.extension
+        incremental = (self.output_dir / f"incremental.{extension}").read_text(encoding="utf-8")
+        complete = (self.output_dir / f"complete.{extension}").read_text(encoding="utf-8")
+        self.assertEqual(incremental, complete)
+
+    def test_txt(self):
+        self.assert_same_output(IncrementalTXT, WriteTXT)
+
+    def test_vtt(self):
+        self.assert_same_output(IncrementalVTT, WriteVTT)
+
+    def test_srt(self):
+        self.assert_same_output(IncrementalSRT, WriteSRT)
+
+    def test_csv(self):
+        self.assert_same_output(IncrementalCSV, WriteCSV)
+
+    def test_dote(self):
+        self.assert_same_output(IncrementalDOTE, WriteDOTE)
+
+    def test_file_is_readable_before_finalize(self):
+        writer = IncrementalTXT(self.output_dir)
+        writer.open("partial", OPTIONS)
+        writer.append(segments()[:1])
+
+        self.assertEqual(
+            (self.output_dir / "partial.txt").read_text(encoding="utf-8"),
+            "[SPEAKER_00]: Hello there.\n",
+        )
+        writer.finalize()
+
+    def test_dotted_stem_gets_the_final_name(self):
+        # the transcription of meeting.2024.m4a, the final writers replace the incremental files
+        output_path = self.output_dir / "meeting.2024_small_da"
+        for incremental_writer, result_writer in (
+            (IncrementalTXT, WriteTXT), (IncrementalSRT, WriteSRT), (IncrementalDOTE, WriteDOTE)
+        ):
+            writer = incremental_writer(self.output_dir)
+            writer.open(output_path, OPTIONS)
+            writer.append(segments())
+            writer.finalize()
+            final_writer = result_writer(str(self.output_dir))
+            final_writer({"segments": segments(), "language": "en"}, str(output_path), OPTIONS)
+
+            assert written_files(final_writer, self.output_dir, output_path) == [writer.path]
+        assert len(list(self.output_dir.iterdir())) == 3
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+""" Test the job state used to resume a job """
+import json
+import os
+import tempfile
+import unittest
+from pathlib import Path
+
+from whispaau.job_state import JobState, DONE, FAILED, PENDING
+
+
+class TestJobState(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.output_dir = Path(self.temp_dir.name)
+        self.inputs = []
+        for name in ("a.m4a", "b.m4a", "c.m4a"):
+            path = self.output_dir / name
+            path.write_bytes(name.encode("utf-8") * 100)
+            self.inputs.append(path)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def outputs(self, file: Path) -> list[Path]:
+        paths = [
+            self.output_dir / f"{file.stem}_small_da.txt",
+            self.output_dir / f"{file.stem}_small_da.srt",
+        ]
+        for path in paths:
+            path.write_text("text", encoding="utf-8")
+        return paths
+
+    def run_job(self, settings_key: str = "settings") -> JobState:
+        state = JobState(self.output_dir, "job", settings_key)
+        state.start(self.inputs)
+        state.done(self.inputs[0], self.outputs(self.inputs[0]))
+        with self.assertRaises(RuntimeError):
+            with state.track(self.inputs[1]):
+                raise RuntimeError("out of memory")
+        # the job was killed while the last file was transcribed
+        return state
+
+    def test_state_file(self):
+        self.run_job()
+        state = json.loads((self.output_dir / "job.state.json").read_text(encoding="utf-8"))
+
+        files = state["files"]
+        self.assertEqual(files[str(self.inputs[0])]["status"], DONE)
+        self.assertEqual(
+            files[str(self.inputs[0])]["outputs"], ["a_small_da.txt", "a_small_da.srt"]
+        )
+        self.assertEqual(files[str(self.inputs[1])]["status"], FAILED)
+        self.assertEqual(files[str(self.inputs[1])]["error"], "RuntimeError: out of memory")
+        self.assertEqual(files[str(self.inputs[2])]["status"], PENDING)
+
+    def test_resume_skips_completed_files(self):
+        self.run_job()
+        state = JobState(self.output_dir, "job", "settings")
+
+        self.assertTrue(state.load())
+        self.assertEqual(
+            state.completed(self.inputs), {self.inputs[0]: self.outputs(self.inputs[0])}
+        )
+
+    def test_changed_files_are_processed_again(self):
+        self.run_job()
+
+        # the same size, but another content and modification time
+        self.inputs[0].write_bytes(b"x" * 500)
+        os.utime(self.inputs[0], ns=(0, 0))
+        state = JobState(self.output_dir, "job", "settings")
+        state.load()
+        self.assertEqual(state.completed(self.inputs), {})
+
+    def test_missing_outputs_are_written_again(self):
+        self.run_job()
+        (self.output_dir / "a_small_da.srt").unlink()
+
+        state = JobState(self.output_dir, "job", "settings")
+        state.load()
+        self.assertEqual(state.completed(self.inputs), {})
+
+    def test_other_settings_are_not_resumed(self):
+        self.run_job()
+        self.assertFalse(JobState(self.output_dir, "job", "other settings").load())
+
+
+if __name__ == "__main__":
+    unittest.main()
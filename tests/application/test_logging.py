@@ -0,0 +1,97 @@
+import json
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from whispaau.logging import Logger
+
+
+class TestStageSpans(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.output_dir = Path(self.temp_dir.name)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_disabled_writes_nothing(self):
+        log = Logger("stages_disabled", self.output_dir)
+        with log.stage("transcription", Path("a.wav"), 10.0):
+            pass
+        log.log_stage_summary()
+        self.assertFalse((self.output_dir / "stages.jsonl").exists())
+
+    def test_spans_are_written_as_json_lines(self):
+        log = Logger("stages_enabled", self.output_dir, log_stages=True)
+        with log.stage("transcription", Path("a.wav"), 10.0):
+            pass
+        with self.assertRaises(RuntimeError):
+            with log.stage("alignment", Path("a.wav")):
+                raise RuntimeError("failed")
+
+        lines = (self.output_dir / "stages.jsonl").read_text(encoding="utf-8").splitlines()
+        spans = [json.loads(line) for line in lines]
+        self.assertEqual([span["stage"] for span in spans], ["transcription", "alignment"])
+        self.assertEqual(spans[0]["file"], "a.wav")
+        self.assertEqual(spans[0]["audio_s"], 10.0)
+        self.assertTrue(spans[0]["ok"])
+        self.assertFalse(spans[1]["ok"])
+        self.assertGreater(spans[0]["max_rss_mb"], 0)
+        self.assertGreaterEqual(spans[0]["process_cpu_s"], spans[0]["thread_cpu_s"])
+
+    def test_rss_is_measured_per_stage(self):
+        log = Logger("stages_rss", self.output_dir, log_stages=True)
+        with log.stage("allocate"):
+            block = bytearray(64 * 1024 * 1024)
+            block[::4096] = b"x" * len(block[::4096])
+        del block
+        with log.stage("idle"):
+            pass
+
+        allocate, idle = [
+            json.loads(line) for line in (self.output_dir / "stages.jsonl").read_text().splitlines()
+        ]
+        if allocate["rss_mb"] is None:
+            self.skipTest("the current resident memory is only measured with /proc")
+        self.assertGreater(allocate["rss_delta_mb"], 50)
+        self.assertLess(idle["rss_delta_mb"], 50)
+        # the high-water mark of the process still holds the allocation
+        self.assertGreater(idle["max_rss_mb"], 64)
+
+    def test_spans_without_the_resource_module(self):
+        # e.g. on Windows
+        log = Logger("stages_no_resource", self.output_dir, log_stages=True)
+        with mock.patch("whispaau.logging.resource", None):
+            with log.stage("write"):
+                pass
+            log.log_stage_summary()
+
+        span = json.loads((self.output_dir / "stages.jsonl").read_text(encoding="utf-8"))
+        self.assertIsNone(span["max_rss_mb"])
+        self.assertTrue(span["ok"])
+
+    def test_summary_only_reads_spans_of_the_run(self):
+        earlier = Logger("stages_run", self.output_dir, log_stages=True)
+        with earlier.stage("write"):
+            pass
+        log = Logger("stages_run", self.output_dir, log_stages=True)
+        worker_log = Logger(
+            "stages_run_worker", self.output_dir, log_stages=True, run_id=log.run_id
+        )
+        with log.stage("archive"):
+            pass
+        with worker_log.stage("transcription", audio_s=5.0):
+            pass
+
+        self.assertEqual(
+            sorted(span["stage"] for span in log.read_stages()), ["archive", "transcription"]
+        )
+        log.log_stage_summary()
+        self.assertIn(
+            "Stage summary", (self.output_dir / "transcribe.log").read_text(encoding="utf-8")
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
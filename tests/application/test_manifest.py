@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+""" Test the manifest of the files written by a job """
+import hashlib
+import json
+import tempfile
+import unittest
+from pathlib import Path
+
+from whispaau.archive import ArchiveBuilder
+from whispaau.manifest import Manifest
+
+
+class TestManifest(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.output_dir = Path(self.temp_dir.name)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def write_job(
+        self, job_name: str, model: str, names: list[str], merge_previous: bool = False
+    ) -> dict:
+        paths = []
+        for name in names:
+            path = self.output_dir / name
+            path.write_text(f"{model} {name}", encoding="utf-8")
+            paths.append(path)
+        manifest = Manifest(self.output_dir, job_name)
+        with ArchiveBuilder(Path(job_name), self.output_dir / f"{job_name}.zip") as archive:
+            manifest.add(paths, "shorts.m4a", model)
+            archive.add(paths)
+            if merge_previous:
+                archive.add(manifest.merge_previous())
+            archive.flush()
+            manifest.write(archive.checksums)
+        return json.loads((self.output_dir / "manifest.json").read_text(encoding="utf-8"))
+
+    def test_sizes_and_checksums(self):
+        manifest = self.write_job("job", "small", ["shorts_small_da.txt", "shorts_small_da.srt"])
+
+        self.assertEqual(manifest["job_name"], "job")
+        self.assertEqual(
+            [entry["name"] for entry in manifest["files"]],
+            ["shorts_small_da.txt", "shorts_small_da.srt"],
+        )
+        for entry in manifest["files"]:
+            data = (self.output_dir / entry["name"]).read_bytes()
+            self.assertEqual(entry["size"], len(data))
+            self.assertEqual(entry["sha256"], hashlib.sha256(data).hexdigest())
+            self.assertEqual(entry["source"], "shorts.m4a")
+            self.assertEqual(entry["model"], "small")
+
+    def test_stale_files_are_not_listed(self):
+        (self.output_dir / "shorts_small_da_old.txt").write_text("stale", encoding="utf-8")
+        manifest = self.write_job("job", "small", ["shorts_small_da.txt"])
+        self.assertEqual([entry["name"] for entry in manifest["files"]], ["shorts_small_da.txt"])
+
+    def test_previous_manifest_is_merged(self):
+        self.write_job("job", "small", ["shorts_small_da.txt", "shorts_small_da.srt"])
+        (self.output_dir / "shorts_small_da.srt").unlink()
+
+        manifest = self.write_job(
+            "job", "tiny", ["shorts_tiny_da.txt", "shorts_small_da.txt"], merge_previous=True
+        )
+
+        # the file written again belongs to the new job and the removed file is left out
+        self.assertEqual(
+            [(entry["name"], entry["model"]) for entry in manifest["files"]],
+            [("shorts_tiny_da.txt", "tiny"), ("shorts_small_da.txt", "tiny")],
+        )
+        manifest = self.write_job("job", "base", ["shorts_base_da.txt"], merge_previous=True)
+        self.assertEqual(
+            [(entry["name"], entry["model"]) for entry in manifest["files"]],
+            [
+                ("shorts_base_da.txt", "base"),
+                ("shorts_tiny_da.txt", "tiny"),
+                ("shorts_small_da.txt", "tiny"),
+            ],
+        )
+
+    def test_files_without_a_manifest_are_found_by_model(self):
+        for name in [
+            "shorts_small_da.txt",
+            "shorts_tiny_da.srt",
+            "job.zip",
+            "job.state.json",
+            "notes.txt",
+        ]:
+            (self.output_dir / name).write_text("earlier run", encoding="utf-8")
+        manifest = Manifest(self.output_dir, "job")
+        manifest.add([self.output_dir / "shorts_tiny_da.srt"], "shorts.m4a", "tiny")
+
+        paths = manifest.merge_previous(["small", "tiny", "base"])
+
+        self.assertEqual(paths, [self.output_dir / "shorts_small_da.txt"])
+        self.assertEqual(
+            manifest.files["shorts_small_da.txt"], {"name": "shorts_small_da.txt", "model": "small"}
+        )
+        self.assertEqual(Manifest(self.output_dir, "job").merge_previous(), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,82 @@
+import threading
+import time
+import unittest
+
+from whispaau.pipeline import run_pipeline
+
+
+class TestPipeline(unittest.TestCase):
+    def test_results_keep_the_order_of_the_items(self):
+        results = run_pipeline(
+            [1, 2, 3, 4],
+            prepare=lambda item: item * 10,
+            process=lambda item, prepared: prepared + 1,
+            finish=lambda item, prepared, processed: (item, processed),
+        )
+
+        assert results == [(1, 11), (2, 21), (3, 31), (4, 41)]
+
+    def test_items_that_fail_to_prepare_are_skipped(self):
+        results = run_pipeline(
+            [1, 2, 3],
+            prepare=lambda item: None if item == 2 else item,
+            process=lambda item, prepared: prepared,
+            finish=lambda item, prepared, processed: processed,
+        )
+
+        assert results == [1, 3]
+
+    def test_stages_run_on_separate_threads(self):
+        threads = {"prepare": set(), "process": set(), "finish": set()}
+
+        def stage(name, value):
+            threads[name].add(threading.current_thread().name)
+            return value
+
+        run_pipeline(
+            [1, 2],
+            prepare=lambda item: stage("prepare", item),
+            process=lambda item, prepared: stage("process", prepared),
+            finish=lambda item, prepared, processed: stage("finish", processed),
+        )
+
+        assert threads["process"] == {threading.current_thread().name}
+        assert threads["prepare"].isdisjoint(threads["process"])
+        assert threads["finish"].isdisjoint(threads["process"])
+
+    def test_errors_are_raised_on_the_calling_thread(self):
+        def fail(*args):
+            raise RuntimeError("stage failed")
+
+        for stages in (
+            {"prepare": fail},
+            {"process": fail},
+            {"finish": fail},
+        ):
+            arguments = {
+                "prepare": lambda item: item,
+                "process": lambda item, prepared: prepared,
+                "finish": lambda item, prepared, processed: processed,
+            }
+            arguments.update(stages)
+            with self.assertRaises(RuntimeError):
+                run_pipeline([1, 2, 3], **arguments)
+
+    def test_processed_items_are_finished_when_a_later_item_fails(self):
+        finished = []
+
+        def process(item, prepared):
+            if item == 3:
+                raise RuntimeError("out of memory")
+            return prepared
+
+        def finish(item, prepared, processed):
+            # still writing the previous file when the next file fails
+            time.sleep(0.2)
+            finished.append(item)
+
+        with self.assertRaises(RuntimeError):
+            run_pipeline([1, 2, 3, 4], prepare=lambda item: item, process=process, finish=finish)
+
+        # finish has returned for every processed item when the error is raised
+        assert finished == [1, 2]
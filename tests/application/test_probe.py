@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+""" Test the cached probing of media files """
+import os
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import numpy as np
+import soundfile
+
+from whispaau import probe
+from whispaau.probe import MediaInfo, probe_files
+
+FFPROBE_M4A = {
+    "format": {"duration": "4.992000"},
+    "streams": [
+        {"codec_type": "video", "codec_name": "mjpeg"},
+        {"codec_type": "audio", "codec_name": "aac", "channels": 1, "sample_rate": "44100"},
+    ],
+}
+
+
+class TestProbe(unittest.TestCase):
+    def setUp(self):
+        probe.clear_cache()
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.directory = Path(self.temp_dir.name)
+        self.wav = self.directory / "speech.wav"
+        soundfile.write(self.wav, np.zeros((24000, 2), dtype=np.float32), 16000, subtype="PCM_16")
+        self.m4a = self.directory / "speech.m4a"
+        self.m4a.write_bytes(b"not parsed")
+
+    def tearDown(self):
+        probe.clear_cache()
+        self.temp_dir.cleanup()
+
+    def test_header_is_read_in_process(self):
+        with mock.patch.object(probe.ffmpeg, "probe") as ffprobe:
+            info = probe.probe(self.wav)
+        ffprobe.assert_not_called()
+        assert info == MediaInfo(1.5, "pcm_16", 2, 16000)
+
+    def test_container_formats_use_ffprobe(self):
+        with mock.patch.object(probe.ffmpeg, "probe", return_value=FFPROBE_M4A) as ffprobe:
+            info = probe.probe(self.m4a)
+        ffprobe.assert_called_once()
+        assert info == MediaInfo(4.992, "aac", 1, 44100)
+
+    def test_unreadable_header_falls_back_to_ffprobe(self):
+        broken = self.directory / "broken.wav"
+        broken.write_bytes(b"RIFF")
+        with mock.patch.object(probe.ffmpeg, "probe", return_value=FFPROBE_M4A) as ffprobe:
+            assert probe.probe(broken).duration == 4.992
+        ffprobe.assert_called_once()
+
+    def test_cached_until_modified(self):
+        with mock.patch.object(probe.ffmpeg, "probe", return_value=FFPROBE_M4A) as ffprobe:
+            probe.probe(self.m4a)
+            probe.probe(self.m4a)
+            assert ffprobe.call_count == 1
+            stat = self.m4a.stat()
+            os.utime(self.m4a, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+            probe.probe(self.m4a)
+            assert ffprobe.call_count == 2
+
+    def test_probe_files(self):
+        missing = self.directory / "missing.m4a"
+        files = [self.m4a, self.wav, missing]
+        with mock.patch.object(probe.ffmpeg, "probe", return_value=FFPROBE_M4A):
+            infos = probe_files(files)
+        assert list(infos) == files
+        assert infos[self.m4a].duration == 4.992
+        assert infos[self.wav].duration == 1.5
+        assert infos[missing] is None
+        assert probe_files([]) == {}
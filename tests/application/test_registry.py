@@ -0,0 +1,45 @@
+import unittest
+
+from whispaau.registry import ModelRegistry
+
+
+class DummyModel:
+    def __init__(self, name):
+        self.name = name
+
+
+class TestModelRegistry(unittest.TestCase):
+    def test_model_is_loaded_once_per_key(self):
+        registry = ModelRegistry(max_entries=2)
+        loads = []
+
+        def loader():
+            loads.append("en")
+            return DummyModel("en")
+
+        first = registry.get(("en", "cpu"), loader)
+        second = registry.get(("en", "cpu"), loader)
+
+        assert first is second
+        assert loads == ["en"]
+
+    def test_least_recently_used_model_is_evicted(self):
+        registry = ModelRegistry(max_entries=2)
+        registry.get(("en", "cpu"), lambda: DummyModel("en"))
+        registry.get(("da", "cpu"), lambda: DummyModel("da"))
+        # touch "en" so "da" becomes the least recently used entry
+        registry.get(("en", "cpu"), lambda: DummyModel("en"))
+        registry.get(("sv", "cpu"), lambda: DummyModel("sv"))
+
+        assert len(registry) == 2
+        assert ("en", "cpu") in registry
+        assert ("sv", "cpu") in registry
+        assert ("da", "cpu") not in registry
+
+    def test_most_recent_model_is_kept_when_over_budget(self):
+        registry = ModelRegistry(max_bytes=1)
+        registry._entries[("en", "cpu")] = (DummyModel("en"), 10)
+        registry.get(("da", "cpu"), lambda: DummyModel("da"))
+
+        assert ("en", "cpu") not in registry
+        assert ("da", "cpu") in registry
@@ -0,0 +1,78 @@
+import os
+import tempfile
+import time
+import unittest
+from pathlib import Path
+
+from whispaau.result_cache import ResultCache, hash_file, make_key
+
+
+class TestResultCache(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.directory = Path(self.temp_dir.name)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_put_and_get(self):
+        cache = ResultCache(self.directory)
+        result = {"segments": [{"start": 0.0, "end": 1.0, "text": "hello"}], "language": "en"}
+
+        assert cache.get("transcription", "key") is None
+        cache.put("transcription", "key", result)
+
+        assert cache.contains("transcription", "key")
+        assert cache.get("transcription", "key") == result
+        assert cache.get("alignment", "key") is None
+
+    def test_least_recently_used_entries_are_evicted(self):
+        cache = ResultCache(self.directory, max_bytes=10 ** 9)
+        for key in ("a", "b", "c"):
+            cache.put("transcription", key, "x" * 1000)
+        # make "a" the oldest entry and then read it, so "b" becomes the least recently used
+        for key, age in (("a", 30), ("b", 20), ("c", 10)):
+            past = time.time() - age
+            os.utime(self.directory / f"{key}.transcription.pkl", (past, past))
+        cache.get("transcription", "a")
+
+        cache.max_bytes = 2500
+        cache.put("transcription", "d", "x" * 10)
+
+        assert cache.contains("transcription", "a")
+        assert not cache.contains("transcription", "b")
+        assert cache.contains("transcription", "d")
+
+    def test_keys(self):
+        file_path = self.directory / "audio.bin"
+        file_path.write_bytes(b"audio")
+        content_hash = hash_file(file_path)
+
+        assert make_key(content_hash, "small", {"language": "da"}) == make_key(
+            content_hash, "small", {"language": "da"}
+        )
+        assert make_key(content_hash, "small", {"language": "da"}) != make_key(
+            content_hash, "small", {"language": "en"}
+        )
+        assert make_key(content_hash, "small") != make_key(content_hash, "parakeet")
+
+    @unittest.skipIf(not hasattr(os, "getuid"), "POSIX owners only")
+    def test_directory_writable_by_others_is_not_used(self):
+        cache = ResultCache(self.directory)
+        cache.put("transcription", "key", "result")
+        # another user could plant a pickle in the directory
+        os.chmod(self.directory, 0o777)
+
+        assert not cache.contains("transcription", "key")
+        assert cache.get("transcription", "key") is None
+        cache.put("transcription", "other", "result")
+        assert not (self.directory / "other.transcription.pkl").exists()
+
+    def test_new_directory_is_private(self):
+        cache = ResultCache(self.directory / "cache")
+        cache.put("transcription", "key", "result")
+
+        assert cache.get("transcription", "key") == "result"
+        if hasattr(os, "getuid"):
+            assert (self.directory / "cache").stat().st_mode & 0o777 == 0o700
+
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+""" Test the order of the files of a job and the predicted completion time """
+import threading
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from whispaau import scheduler
+from whispaau.probe import MediaInfo
+from whispaau.scheduler import Schedule, estimate_rtf, makespan, probe_durations
+
+
+class TestMakespan(unittest.TestCase):
+    def test_one_slot_is_the_sum(self):
+        assert makespan([3.0, 1.0, 2.0], 1) == 6.0
+
+    def test_longest_first_packing(self):
+        # 8 | 5 2 | 4 3 2 -> the slots finish at 8, 7 and 9
+        assert makespan([2.0, 8.0, 3.0, 5.0, 2.0, 4.0], 3) == 9.0
+
+    def test_more_slots_than_costs(self):
+        assert makespan([4.0, 1.0], 4) == 4.0
+        assert makespan([], 2) == 0.0
+
+
+class TestEstimateRtf(unittest.TestCase):
+    def test_models(self):
+        assert estimate_rtf("large-v3", "cpu") == scheduler.CPU_MODEL_RTF["large"]
+        assert estimate_rtf("parakeet-tdt-0.6b-v2", "cpu") == scheduler.CPU_MODEL_RTF["parakeet"]
+        assert estimate_rtf("small", "cpu") > estimate_rtf("faster-small", "cpu")
+        assert estimate_rtf("small", "cuda") < estimate_rtf("small", "cpu")
+
+    def test_unknown_model_counts_as_large(self):
+        assert estimate_rtf("unknown", "cpu") == scheduler.CPU_MODEL_RTF["large"]
+
+
+class TestSchedule(unittest.TestCase):
+    def setUp(self):
+        self.durations = {
+            Path("a.mp3"): 60.0,
+            Path("b.mp3"): 600.0,
+            Path("c.mp3"): None,
+            Path("d.mp3"): 60.0,
+        }
+
+    def test_longest_first(self):
+        schedule = Schedule(self.durations, slots=2, rtf=0.5)
+        # c.mp3 could not be probed and counts as an average file of 240
+        # seconds, a.mp3 comes before d.mp3
+        assert schedule.order == [Path("b.mp3"), Path("c.mp3"), Path("a.mp3"), Path("d.mp3")]
+        assert schedule.total_audio == 960.0
+
+    def test_prediction(self):
+        schedule = Schedule(self.durations, slots=2, rtf=0.5)
+        assert schedule.predicted_seconds() == 300.0
+        assert Schedule(self.durations, slots=1, rtf=0.5).predicted_seconds() == 480.0
+
+    def test_slots_are_limited_by_the_files(self):
+        assert Schedule({Path("a.mp3"): 10.0}, slots=4, rtf=1.0).slots == 1
+
+    def test_finished_refines_the_rtf(self):
+        with mock.patch.object(scheduler, "monotonic", return_value=0.0):
+            schedule = Schedule(self.durations, slots=1, rtf=0.5)
+        with mock.patch.object(scheduler, "monotonic", return_value=60.0):
+            # 600 seconds of audio were processed in 60 seconds
+            predicted = schedule.finished(Path("b.mp3"))
+        assert schedule.rtf == 0.1
+        assert schedule.remaining == {Path("a.mp3"), Path("c.mp3"), Path("d.mp3")}
+        assert predicted == 36.0
+        # a file that is finished twice is only counted once
+        with mock.patch.object(scheduler, "monotonic", return_value=60.0):
+            schedule.finished(Path("b.mp3"))
+        assert schedule.finished_audio == 600.0
+
+    def test_finished_from_several_threads(self):
+        files = {Path(f"{index}.mp3"): float(index + 1) for index in range(2000)}
+        schedule = Schedule(files, slots=4, rtf=0.5)
+        errors = []
+
+        def finish(part: list[Path]) -> None:
+            try:
+                for file in part:
+                    schedule.finished(file)
+            except RuntimeError as error:
+                errors.append(error)
+
+        threads = [
+            threading.Thread(target=finish, args=(list(files)[index::2],)) for index in range(2)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert errors == []
+        assert schedule.remaining == set()
+        assert schedule.finished_audio == sum(files.values())
+
+
+class TestProbeDurations(unittest.TestCase):
+    def test_failures_are_none(self):
+        def probe(file: Path) -> MediaInfo:
+            if file.name == "broken.mp3":
+                raise RuntimeError("ffprobe error")
+            return MediaInfo(12.5)
+
+        files = [Path("a.mp3"), Path("broken.mp3")]
+        with mock.patch("whispaau.probe.probe", side_effect=probe):
+            assert probe_durations(files) == {Path("a.mp3"): 12.5, Path("broken.mp3"): None}
+        assert probe_durations([]) == {}
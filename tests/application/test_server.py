@@ -0,0 +1,73 @@
+import os
+import tempfile
+import threading
+import time
+import unittest
+from pathlib import Path
+
+from whispaau.server import TranscriptionServer, submit_job, job_status, DONE, FAILED
+
+
+class TestServer(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.output_root = Path(self.temp_dir.name)
+        self.input_file = (
+            Path(os.path.dirname(os.path.realpath(__file__)))
+            / ".."
+            / "resources"
+            / "end2end"
+            / "input"
+            / "shorts.m4a"
+        )
+        self.received = []
+
+        def runner(args):
+            if args["model"] == "broken":
+                raise RuntimeError("model failed")
+            self.received.append(args)
+            args["output_dir"].mkdir()
+            (args["output_dir"] / "shorts_tiny_da.txt").write_text("hej")
+
+        self.server = TranscriptionServer(("127.0.0.1", 0), runner, self.output_root)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.temp_dir.cleanup()
+
+    def wait_for(self, job_id):
+        for _ in range(100):
+            job = job_status(self.server.url, job_id)
+            if job["status"] in (DONE, FAILED):
+                return job
+            time.sleep(0.05)
+        self.fail("the job did not finish")
+
+    def test_jobs_run_in_their_own_output_directory(self):
+        first = submit_job(self.server.url, ["-i", str(self.input_file), "-m", "tiny"])
+        second = submit_job(self.server.url, ["-i", str(self.input_file), "-m", "tiny"])
+
+        first = self.wait_for(first["id"])
+        second = self.wait_for(second["id"])
+
+        assert first["status"] == DONE
+        assert first["files"] == ["shorts_tiny_da.txt"]
+        assert first["output_dir"] != second["output_dir"]
+        assert [args["output_dir"] for args in self.received] == [
+            self.output_root / first["id"], self.output_root / second["id"]
+        ]
+
+    def test_failed_job(self):
+        job = self.wait_for(
+            submit_job(self.server.url, ["-i", str(self.input_file), "-m", "broken"])["id"]
+        )
+
+        assert job["status"] == FAILED
+        assert job["error"] == "model failed"
+
+    def test_invalid_arguments_are_rejected(self):
+        with self.assertRaises(Exception):
+            submit_job(self.server.url, ["--no-input"])
@@ -1,5 +1,6 @@
 import json
 import os
+from concurrent.futures import ThreadPoolExecutor
 from whispaau.writers import merge_speakers
 from pathlib import Path
 import unittest
@@ -18,3 +19,38 @@ class TestSpeakerGrouping(unittest.TestCase):
             expected_data = json.load(json_file)
 
         assert merge_speakers(data) == expected_data
+
+    def test_merging_keeps_no_state_between_calls(self):
+        first = {
+            "language": "da",
+            "segments": [{"start": 0.0, "end": 1.0, "text": " hej", "speaker": "SPEAKER_00"}],
+        }
+        second = {"language": "en", "segments": [
+            {"start": 0.0, "end": 1.0, "text": " hello ", "speaker": "SPEAKER_01"},
+            {"start": 1.0, "end": 2.0, "text": " there", "speaker": "SPEAKER_01"},
+        ]}
+
+        assert merge_speakers(first)["segments"][0]["text"] == " hej"
+        assert merge_speakers(second) == {"language": "en", "segments": [
+            {"speaker": "SPEAKER_01", "text": "hello there", "start": 0.0, "end": 2.0},
+        ]}
+
+    def test_concurrent_merging(self):
+        def transcript(speaker):
+            return {
+                "language": "da",
+                "segments": [
+                    {
+                        "start": float(i),
+                        "end": i + 1.0,
+                        "text": f" {speaker} {i}",
+                        "speaker": speaker if i % 10 else "X",
+                    }
+                    for i in range(1000)
+                ],
+            }
+
+        transcripts = [transcript(f"SPEAKER_{n:02d}") for n in range(8)]
+        expected = [merge_speakers(data) for data in transcripts]
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            assert list(executor.map(merge_speakers, transcripts * 4)) == expected * 4
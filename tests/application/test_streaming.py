@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+""" Test the transcription of a live audio stream """
+import io
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+
+import numpy as np
+import soundfile
+
+from whispaau.audio import SAMPLE_RATE as STREAM_SAMPLE_RATE
+from whispaau.streaming import StreamTranscriber, decoded_blocks, pcm_blocks
+from whispaau.writers import IncrementalSRT, IncrementalTXT
+
+SAMPLE_RATE = 100
+
+
+def fake_transcribe_chunks(chunks):
+    """
+    One segment per second of each chunk, the text is the value of the
+    samples at the start of the second.
+    """
+    results = []
+    for chunk in chunks:
+        segments = []
+        for second in range(len(chunk) // SAMPLE_RATE):
+            segments.append({
+                "start": float(second),
+                "end": second + 1.0,
+                "text": f" {int(chunk[second * SAMPLE_RATE])}",
+            })
+        results.append(segments)
+    return results
+
+
+class TestStreamTranscriber(unittest.TestCase):
+    def test_segments_are_emitted_once_in_order(self):
+        emitted = []
+        transcriber = StreamTranscriber(
+            fake_transcribe_chunks,
+            lambda segments, language: emitted.append(list(segments)),
+            latency_s=3,
+            overlap_s=1,
+            sample_rate=SAMPLE_RATE,
+        )
+        # twelve seconds of audio, the value of every sample is its second on the stream
+        audio = np.repeat(np.arange(12, dtype=np.float32), SAMPLE_RATE)
+        for block in np.array_split(audio, 7):
+            transcriber.feed(block)
+        self.assertTrue(emitted, "segments should be emitted before the stream ends")
+        segments = transcriber.close()
+
+        self.assertEqual([segment for batch in emitted for segment in batch], segments)
+        # every second is transcribed once although the chunks overlap, segments
+        # across a chunk boundary are joined
+        words = " ".join(segment["text"] for segment in segments).split()
+        self.assertEqual(words, [str(second) for second in range(12)])
+        self.assertEqual(segments[0]["start"], 0.0)
+        self.assertEqual(segments[-1]["end"], 12.0)
+        self.assertEqual(sorted(segments, key=lambda segment: segment["start"]), segments)
+
+    def test_short_stream_is_transcribed_on_close(self):
+        emitted = []
+        audio = np.full(SAMPLE_RATE * 2, 7, dtype=np.float32)
+        transcriber = StreamTranscriber(
+            fake_transcribe_chunks, lambda segments, language: emitted.extend(segments),
+            latency_s=10, sample_rate=SAMPLE_RATE,
+        )
+        transcriber.feed(audio)
+        self.assertEqual(emitted, [])
+        segments = transcriber.close()
+        self.assertEqual([segment["text"] for segment in segments], ["7", "7"])
+        self.assertEqual(emitted, segments)
+
+    def test_invalid_latency(self):
+        with self.assertRaises(ValueError):
+            StreamTranscriber(fake_transcribe_chunks, lambda segments, language: None, latency_s=0)
+
+
+class TestPcmBlocks(unittest.TestCase):
+    def test_blocks_are_converted_to_float(self):
+        samples = np.array([0, 16384, -32768, 32767, 1], dtype="<i2")
+        blocks = list(pcm_blocks(io.BytesIO(samples.tobytes()), 2))
+        self.assertEqual([len(block) for block in blocks], [2, 2, 1])
+        np.testing.assert_allclose(np.concatenate(blocks), samples / 32768.0)
+
+    def test_reads_ending_in_the_middle_of_a_sample(self):
+        samples = np.arange(-50, 50, dtype="<i2")
+        data = samples.tobytes()
+
+        class OddReads(io.RawIOBase):
+            """Returns at most three bytes per read, like a pipe that delivers partial samples."""
+            def __init__(self):
+                self.position = 0
+
+            def read(self, size=-1):
+                chunk = data[self.position:self.position + 3]
+                self.position += len(chunk)
+                return chunk
+
+        blocks = list(pcm_blocks(OddReads(), 4))
+        np.testing.assert_allclose(np.concatenate(blocks), samples / 32768.0)
+
+
+@unittest.skipIf(shutil.which("ffmpeg") is None, "ffmpeg is not installed")
+class TestDecodedStream(unittest.TestCase):
+    """
+    A WAV recording decoded by ffmpeg from a named pipe, transcribed and written
+    like app.transcribe_live_stream.
+    """
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.directory = Path(self.temp_dir.name)
+        # eight seconds of 44.1kHz stereo, the amplitude of every second is
+        # its second on the stream / 20
+        audio = np.repeat(np.arange(8, dtype=np.float32) / 20, 44100)
+        self.wav = self.directory / "recording.wav"
+        soundfile.write(self.wav, np.stack([audio, audio], axis=1), 44100, subtype="PCM_16")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    @staticmethod
+    def transcribe_chunks(chunks):
+        """
+        One segment per second, the text is the amplitude in the middle of the second times 20.
+        """
+        middle = STREAM_SAMPLE_RATE // 2
+        return [
+            [
+                {
+                    "start": float(second),
+                    "end": second + 1.0,
+                    "text": f" {round(chunk[second * STREAM_SAMPLE_RATE + middle] * 20)}",
+                }
+                for second in range(len(chunk) // STREAM_SAMPLE_RATE)
+            ]
+            for chunk in chunks
+        ]
+
+    def transcribe(self, source: str) -> list[Path]:
+        writers = [IncrementalTXT(self.directory), IncrementalSRT(self.directory)]
+        for writer in writers:
+            writer.open(self.directory / "stream_parakeet", {})
+
+        def on_segments(segments, language):
+            for writer in writers:
+                writer.append(segments)
+
+        transcriber = StreamTranscriber(
+            self.transcribe_chunks, on_segments, latency_s=3, overlap_s=1
+        )
+        for block in decoded_blocks(source, STREAM_SAMPLE_RATE // 2):
+            transcriber.feed(block)
+        transcriber.close()
+        for writer in writers:
+            writer.finalize()
+        return [writer.path for writer in writers]
+
+    def test_wav_file(self):
+        txt, srt = self.transcribe(str(self.wav))
+        self.assertEqual(
+            txt.read_text(encoding="utf-8").split(), [str(second) for second in range(8)]
+        )
+        self.assertIn("00:00:07,000 --> 00:00:08,000", srt.read_text(encoding="utf-8"))
+
+    @unittest.skipIf(not hasattr(os, "mkfifo"), "named pipes are not supported")
+    def test_named_pipe(self):
+        pipe = self.directory / "recording.pipe"
+        os.mkfifo(pipe)
+
+        def record():
+            # the recorder writes the stream in small pieces while it is read
+            with open(pipe, "wb") as stream:
+                data = self.wav.read_bytes()
+                for start in range(0, len(data), 8192):
+                    stream.write(data[start:start + 8192])
+
+        recorder = threading.Thread(target=record)
+        recorder.start()
+        txt, _ = self.transcribe(str(pipe))
+        recorder.join()
+        self.assertEqual(
+            txt.read_text(encoding="utf-8").split(), [str(second) for second in range(8)]
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,6 +1,23 @@
+import logging
 import unittest
+from pathlib import Path
+from types import SimpleNamespace
+from unittest import mock
 
-from whispaau.transcription import prepare_segments
+import numpy as np
+
+from whispaau import transcription
+from whispaau.transcription import (
+    FasterWhisperTranscription,
+    get_transcriber,
+    prepare_segments,
+    ParakeetTranscription,
+    default_batch_size,
+    chunk_audio,
+    merge_chunk_segments,
+    faster_whisper_compute_type,
+    faster_whisper_output,
+)
 
 
 class HypothesisWithTimestamps:
@@ -36,3 +53,267 @@ class TestTranscription(unittest.TestCase):
         assert segments[0]["text"] == "missing timestamp field"
         assert segments[0]["start"] == 0.0
         assert segments[0]["end"] == 0.0
+
+    def test_prepare_segments_splits_at_pauses(self):
+        hypotheses = [
+            HypothesisWithTimestamps("one two three four five six", [0, 2, 4, 30, 32, 34, 60, 61])
+        ]
+
+        segments, full_text = prepare_segments(hypotheses)
+
+        assert full_text == "one two three four five six"
+        assert segments == [
+            {"text": "one two three", "start": 0.0, "end": 0.32},
+            {"text": "four five", "start": 2.56, "end": 2.72},
+            {"text": "six", "start": 4.8, "end": 4.8},
+        ]
+
+    def test_prepare_segments_skips_invalid_timestamps(self):
+        hypotheses = [
+            HypothesisWithTimestamps(
+                "one two three four five six", [None, "x", 0, 2, 4, 30, 32, 34, 60, 61]
+            )
+        ]
+
+        segments, _ = prepare_segments(hypotheses)
+
+        assert [segment["text"] for segment in segments] == ["one two three", "four five", "six"]
+
+    def test_prepare_segments_uses_word_timestamps(self):
+        words = [
+            {"word": "hello", "start": 0.16, "end": 0.48},
+            {"word": "world.", "start": 0.56, "end": 0.96},
+            {"word": "After", "start": 2.4, "end": 2.64},
+            {"word": "pause", "start": 2.72, "end": 3.12},
+        ]
+        hypotheses = [
+            HypothesisWithTimestamps("hello world. After pause", {"word": words, "segment": []})
+        ]
+
+        segments, full_text = prepare_segments(hypotheses)
+
+        assert full_text == "hello world. After pause"
+        assert segments == [
+            {"text": "hello world.", "start": 0.16, "end": 0.96, "words": words[:2]},
+            {"text": "After pause", "start": 2.4, "end": 3.12, "words": words[2:]},
+        ]
+
+    def test_prepare_segments_uses_word_offsets(self):
+        words = [
+            {"word": "hello", "start_offset": 2, "end_offset": 6},
+            {"word": "again", "start_offset": 30, "end_offset": 35},
+        ]
+        hypotheses = [HypothesisWithTimestamps("hello again", {"word": words})]
+
+        segments, _ = prepare_segments(hypotheses)
+
+        assert segments == [
+            {
+                "text": "hello",
+                "start": 0.16,
+                "end": 0.48,
+                "words": [{"word": "hello", "start": 0.16, "end": 0.48}],
+            },
+            {
+                "text": "again",
+                "start": 2.4,
+                "end": 2.8,
+                "words": [{"word": "again", "start": 2.4, "end": 2.8}],
+            },
+        ]
+
+
+class FakeParakeetModel:
+    """Returns one hypothesis per chunk and records the size of every batch."""
+    def __init__(self):
+        self.batches = []
+
+    def transcribe(self, audio, batch_size, return_hypotheses, timestamps=None):
+        self.batches.append(len(audio))
+        return [HypothesisWithTimestamps("hello world", [0, 5]) for _ in audio]
+
+
+class TestParakeetBuffered(unittest.TestCase):
+    def setUp(self):
+        self.transcriber = ParakeetTranscription.__new__(ParakeetTranscription)
+        self.transcriber.log = logging.getLogger(__name__)
+        self.transcriber.log.get_logger = lambda: self.transcriber.log
+        self.transcriber.model = FakeParakeetModel()
+        self.transcriber.device = "cpu"
+        self.transcriber.sample_rate = 16000
+        self.transcriber.chunk_length_s = 30
+        self.transcriber.chunk_overlap_s = 0
+
+    def test_chunks_are_transcribed_in_batches(self):
+        # 100 seconds of audio gives four chunks
+        audio = np.zeros(100 * 16000, dtype=np.float32)
+
+        result = self.transcriber.transcribe_buffered(audio, batch_size=3)
+
+        assert self.transcriber.model.batches == [3, 1]
+        assert [segment["start"] for segment in result["segments"]] == [0.0, 30.0, 60.0, 90.0]
+        assert [segment["end"] for segment in result["segments"]] == [0.4, 30.4, 60.4, 90.4]
+        assert [segment["id"] for segment in result["segments"]] == [1, 2, 3, 4]
+
+    def test_final_segments_are_passed_on_while_transcribing(self):
+        audio = np.zeros(100 * 16000, dtype=np.float32)
+        emitted = []
+
+        result = self.transcriber.transcribe_buffered(
+            audio, batch_size=1, on_segments=lambda segments, language: emitted.append(segments)
+        )
+
+        # every chunk except the last two is final once the next chunk is transcribed
+        assert [len(segments) for segments in emitted] == [1, 1, 2]
+        flat = [segment for segments in emitted for segment in segments]
+        assert [(s["start"], s["end"], s["text"]) for s in flat] == [
+            (s["start"], s["end"], s["text"]) for s in result["segments"]
+        ]
+
+    def test_default_batch_size(self):
+        batch_size = default_batch_size("cpu", 30)
+
+        assert 1 <= batch_size <= 8
+
+
+class TestChunking(unittest.TestCase):
+    def test_chunks_are_overlapping_views(self):
+        audio = np.arange(100 * 16000, dtype=np.float32)
+
+        chunks = chunk_audio(audio, 16000, 30, 2)
+
+        assert [chunk["start_time"] for chunk in chunks] == [0.0, 28.0, 56.0, 84.0]
+        assert [chunk["duration"] for chunk in chunks] == [30.0, 30.0, 30.0, 16.0]
+        assert all(np.shares_memory(chunk["audio"], audio) for chunk in chunks)
+
+    def test_chunk_overlap_must_be_shorter_than_chunk(self):
+        with self.assertRaises(ValueError):
+            chunk_audio(np.zeros(16000, dtype=np.float32), 16000, 30, 30)
+
+    def test_words_in_the_overlap_are_kept_once(self):
+        chunk_results = [
+            (0.0, 30.0, [{"text": "one two three four", "start": 26.0, "end": 29.6}]),
+            (28.0, 58.0, [{"text": "three four five six", "start": 28.0, "end": 33.0}]),
+        ]
+
+        segments = merge_chunk_segments(chunk_results)
+
+        assert [segment["text"] for segment in segments] == ["one two three four five six"]
+        assert segments[0]["start"] == 26.0
+        assert segments[0]["end"] == 33.0
+
+    def test_overlap_uses_the_word_times(self):
+        # most of the words of the first segment are spoken at its end, in
+        # the overlap with the next chunk
+        def segment(words):
+            return {
+                "text": " ".join(word for word, _, _ in words),
+                "start": words[0][1],
+                "end": words[-1][2],
+                "words": [{"word": word, "start": start, "end": end} for word, start, end in words],
+            }
+
+        chunk_results = [
+            (
+                0.0,
+                30.0,
+                [
+                    segment(
+                        [
+                            ("alpha", 20.0, 20.4),
+                            ("beta", 28.2, 28.6),
+                            ("gamma", 28.8, 29.2),
+                            ("delta", 29.4, 29.8),
+                        ]
+                    )
+                ],
+            ),
+            (
+                28.0,
+                58.0,
+                [
+                    segment(
+                        [
+                            ("beta", 28.2, 28.6),
+                            ("gamma", 28.8, 29.2),
+                            ("delta", 29.4, 29.8),
+                            ("epsilon", 31.0, 32.0),
+                        ]
+                    )
+                ],
+            ),
+        ]
+
+        segments = merge_chunk_segments(chunk_results)
+
+        assert [segment["text"] for segment in segments] == ["alpha beta gamma delta epsilon"]
+        assert segments[0]["start"] == 20.0
+        assert segments[0]["end"] == 32.0
+
+    def test_overlap_without_common_words_is_cut_in_the_middle(self):
+        chunk_results = [
+            (0.0, 30.0, [{"text": "alpha beta", "start": 28.0, "end": 30.0}]),
+            (28.0, 58.0, [{"text": "gamma delta", "start": 28.0, "end": 30.0}]),
+        ]
+
+        segments = merge_chunk_segments(chunk_results)
+
+        assert [segment["text"] for segment in segments] == ["alpha delta"]
+
+    def test_segments_separated_by_a_pause_are_not_joined(self):
+        chunk_results = [
+            (0.0, 30.0, [{"text": "first segment", "start": 1.0, "end": 5.0}]),
+            (30.0, 60.0, [{"text": "second segment", "start": 40.0, "end": 45.0}]),
+        ]
+
+        segments = merge_chunk_segments(chunk_results)
+
+        assert [segment["text"] for segment in segments] == ["first segment", "second segment"]
+
+
+class TestFasterWhisper(unittest.TestCase):
+    def test_compute_type(self):
+        assert faster_whisper_compute_type("cpu") == "int8_float32"
+        assert faster_whisper_compute_type("cuda") == "int8_float16"
+
+    def test_output_matches_whisper_result(self):
+        def segment(start, end, text):
+            return SimpleNamespace(
+                seek=0, start=start, end=end, text=text, tokens=(1, 2), temperature=None,
+                avg_logprob=-0.2, compression_ratio=1.1, no_speech_prob=0.01,
+            )
+        # faster-whisper yields the segments lazily
+        segments = (s for s in [segment(0.0, 1.5, " Hello"), segment(1.5, 3.0, " world.")])
+
+        result = faster_whisper_output(segments, "en")
+
+        assert result["text"] == " Hello world."
+        assert result["language"] == "en"
+        assert [s["id"] for s in result["segments"]] == [1, 2]
+        assert result["segments"][1]["start"] == 1.5
+        assert result["segments"][0]["tokens"] == [1, 2]
+        assert result["segments"][0]["temperature"] == 0.0
+
+    def test_prompt_words_are_joined(self):
+        transcriber = FasterWhisperTranscription.__new__(FasterWhisperTranscription)
+        transcriber.device = "cpu"
+        transcriber.model = mock.Mock()
+        transcriber.model.transcribe.return_value = (iter([]), SimpleNamespace(language="da"))
+
+        transcriber.transcribe(
+            Path("a.m4a"), {"language": "da", "prompt": ["Aalborg", "Universitet"]}, np.zeros(16)
+        )
+        assert (
+            transcriber.model.transcribe.call_args.kwargs["initial_prompt"] == "Aalborg Universitet"
+        )
+
+        transcriber.transcribe(Path("a.m4a"), {"language": "da"}, np.zeros(16))
+        assert transcriber.model.transcribe.call_args.kwargs["initial_prompt"] is None
+
+    def test_quantize_is_ignored_with_a_warning(self):
+        log = mock.Mock()
+        with mock.patch.object(transcription, "FasterWhisperTranscription") as faster_whisper, \
+                mock.patch.dict(transcription._model_cache, clear=True):
+            get_transcriber("faster-small", "cpu", log, "int8")
+        faster_whisper.assert_called_once_with("faster-small", "cpu", log)
+        assert "--quantize int8 is ignored" in log.get_logger().warning.call_args.args[0]
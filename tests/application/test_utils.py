@@ -1,6 +1,14 @@
+import copy
+import json
+import os
+import tempfile
 import unittest
+from pathlib import Path
 
-from whispaau.utils import is_speaker_diarization_supported
+from whisperx import utils
+
+from whispaau import writers
+from whispaau.utils import is_speaker_diarization_supported, get_writer, WRITERS
 
 class TestUtils(unittest.TestCase):
 
@@ -17,3 +25,54 @@ class TestUtils(unittest.TestCase):
         assert is_speaker_diarization_supported("id") == True # Indonesian alignment model added in whisperx-3.8.6
 
         assert is_speaker_diarization_supported("haw") == False # No alignment model
+
+    def test_write_all_does_not_change_the_result(self):
+        resources = Path(os.path.dirname(os.path.realpath(__file__))) / "resources"
+        with open(resources / "transcription_with_bad_attribute.json") as json_file:
+            data = json.load(json_file)
+        original = copy.deepcopy(data)
+        options = {"highlight_words": False, "max_line_count": None, "max_line_width": None,
+                   "filename": Path("audio.m4a"), "jobname": "job"}
+
+        with tempfile.TemporaryDirectory() as all_dir, tempfile.TemporaryDirectory() as single_dir:
+            written = get_writer("all", all_dir, WRITERS)(data, "audio", options)
+            assert data == original
+            assert sorted(path.name for path in written) == sorted(os.listdir(all_dir))
+
+            # every format is the same as when it is written on its own
+            for output_format in WRITERS:
+                get_writer(output_format, single_dir, WRITERS)(
+                    copy.deepcopy(original), "audio", options
+                )
+            for name in os.listdir(single_dir):
+                if name.endswith(".docx"):
+                    continue
+                assert (Path(all_dir) / name).read_bytes() == (
+                    Path(single_dir) / name
+                ).read_bytes(), name
+            assert sorted(os.listdir(all_dir)) == sorted(os.listdir(single_dir))
+
+    def test_segment_writers_match_whisperx(self):
+        resources = Path(os.path.dirname(os.path.realpath(__file__))) / "resources"
+        with open(resources / "transcription_with_bad_attribute.json") as json_file:
+            data = json.load(json_file)
+        # a segment without a speaker and a text with a tab
+        data["segments"].append({"start": 61.25, "end": 62.5, "text": " Tak\tskal du have. "})
+        options = {"highlight_words": False, "max_line_count": None, "max_line_width": None}
+
+        for segment_writer, whisperx_writer in (
+            (writers.SegmentTXT, utils.WriteTXT),
+            (writers.SegmentTSV, utils.WriteTSV),
+            (writers.SegmentAudacity, utils.WriteAudacity),
+        ):
+            with (
+                tempfile.TemporaryDirectory() as view_dir,
+                tempfile.TemporaryDirectory() as whisperx_dir,
+            ):
+                view_options = {**options, writers.SEGMENT_VIEW_OPTION: writers.result_view(data)}
+                segment_writer(view_dir)(data, "audio", view_options)
+                whisperx_writer(whisperx_dir)(data, "audio", options)
+                name = f"audio.{whisperx_writer.extension}"
+                assert (Path(view_dir) / name).read_text() == (
+                    Path(whisperx_dir) / name
+                ).read_text(), name
@@ -0,0 +1,62 @@
+import unittest
+
+import numpy as np
+
+from whispaau.vad import detect_speech, SpeechRegions
+
+SAMPLE_RATE = 16000
+
+
+def tone(seconds: float) -> np.ndarray:
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    return (0.3 * np.sin(2 * np.pi * 220 * t)).astype(np.float32)
+
+
+def silence(seconds: float) -> np.ndarray:
+    rng = np.random.default_rng(0)
+    return (0.0005 * rng.standard_normal(int(seconds * SAMPLE_RATE))).astype(np.float32)
+
+
+class TestVad(unittest.TestCase):
+    def test_long_silence_is_skipped(self):
+        audio = np.concatenate([silence(3), tone(2), silence(10), tone(2), silence(3)])
+
+        speech = detect_speech(audio, SAMPLE_RATE, padding_s=0.25)
+
+        assert len(speech) == 2
+        assert abs(speech.regions[0][0] / SAMPLE_RATE - 2.75) < 0.05
+        assert abs(speech.regions[1][1] / SAMPLE_RATE - 17.25) < 0.05
+        assert abs(speech.speech_duration - 5.0) < 0.1
+        assert len(speech.compact(audio)) == sum(end - start for start, end in speech.regions)
+
+    def test_short_pauses_are_kept(self):
+        audio = np.concatenate([tone(2), silence(1), tone(2)])
+
+        speech = detect_speech(audio, SAMPLE_RATE)
+
+        assert len(speech) == 1
+
+    def test_silent_audio_has_no_speech(self):
+        speech = detect_speech(np.zeros(5 * SAMPLE_RATE, dtype=np.float32), SAMPLE_RATE)
+
+        assert len(speech) == 0
+
+    def test_times_are_mapped_to_the_original_audio(self):
+        # speech from 10 to 12 seconds and from 20 to 25 seconds
+        speech = SpeechRegions(
+            [(10 * SAMPLE_RATE, 12 * SAMPLE_RATE), (20 * SAMPLE_RATE, 25 * SAMPLE_RATE)],
+            SAMPLE_RATE,
+        )
+
+        assert list(speech.to_original([0.0, 1.0, 2.0, 3.0])) == [10.0, 11.0, 20.0, 21.0]
+        assert float(speech.to_original(2.0, is_end=True)) == 12.0
+
+        segments = speech.remap_segments([
+            {"start": 0.5, "end": 2.0, "words": [{"word": "hi", "start": 0.5, "end": 1.0}]},
+            {"start": 2.0, "end": 4.5},
+        ])
+        assert segments[0]["start"] == 10.5
+        assert segments[0]["end"] == 12.0
+        assert segments[0]["words"][0]["end"] == 11.0
+        assert segments[1]["start"] == 20.0
+        assert segments[1]["end"] == 22.5
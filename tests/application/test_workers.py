@@ -0,0 +1,130 @@
+import tempfile
+import time
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from pyzipper import AESZipFile
+
+from whispaau.archive import ArchiveBuilder
+from whispaau.job_state import JobState, DONE, FAILED, PENDING
+from whispaau.logging import Logger
+from whispaau.manifest import Manifest
+from whispaau.workers import run_pool, split_threads
+
+
+def _init_test_worker(*args) -> None:
+    # the workers of the tests do not need torch
+    pass
+
+
+def _sleep_or_fail(file: Path) -> str:
+    if file.name == "broken.m4a":
+        raise ValueError(f"can not decode {file.name}")
+    time.sleep(0.5)
+    return file.name
+
+
+def _write_slow_first(file: Path) -> list[Path]:
+    # the first file finishes last
+    time.sleep(1.0 if file.stem == "a" else 0.1)
+    output = file.with_suffix(".txt")
+    output.write_text(file.name, encoding="utf-8")
+    return [output]
+
+
+class TestWorkers(unittest.TestCase):
+    def test_split_threads(self):
+        assert split_threads(64, 4) == 16
+        assert split_threads(10, 4) == 2
+        # every worker gets at least one thread
+        assert split_threads(2, 4) == 1
+
+    def test_split_threads_uses_all_cores_by_default(self):
+        with mock.patch("os.cpu_count", return_value=8):
+            assert split_threads(0, 2) == 4
+
+
+class TestRunPool(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.log = Logger("run_pool", Path(self.temp_dir.name))
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def run_pool(self, files: list[Path], task=_sleep_or_fail, workers: int = 1, **hooks) -> list:
+        with mock.patch("whispaau.workers._init_worker", _init_test_worker):
+            return run_pool(task, files, workers, 1, self.log, **hooks)
+
+    def test_results_in_the_order_of_files(self):
+        files = [Path("a.m4a"), Path("b.m4a")]
+        finished = []
+        assert self.run_pool(files, on_result=lambda file, result: finished.append(result)) == [
+            "a.m4a",
+            "b.m4a",
+        ]
+        assert sorted(finished) == ["a.m4a", "b.m4a"]
+
+    def test_archive_in_the_order_of_files(self):
+        output_dir = Path(self.temp_dir.name)
+        files = [output_dir / f"{name}.m4a" for name in "abc"]
+        finished = []
+        manifest = Manifest(output_dir, "job")
+        with ArchiveBuilder(Path("job"), output_dir / "job.zip") as archive:
+            def archive_outputs(file: Path, paths: list[Path]) -> None:
+                manifest.add(paths, file.name, "tiny")
+                archive.add(paths)
+
+            self.run_pool(
+                files,
+                task=_write_slow_first,
+                workers=3,
+                on_result=lambda file, paths: finished.append(file.stem),
+                on_ordered=archive_outputs,
+            )
+
+        assert finished[-1] == "a"
+        assert list(manifest.files) == ["a.txt", "b.txt", "c.txt"]
+        with AESZipFile(output_dir / "job.zip") as zip_file:
+            assert zip_file.namelist() == ["job/a.txt", "job/b.txt", "job/c.txt"]
+
+    def test_failure_cancels_the_queued_files(self):
+        files = [Path("broken.m4a")] + [Path(f"{index}.m4a") for index in range(8)]
+        finished = []
+        errors = []
+        start = time.monotonic()
+        with self.assertRaises(ValueError):
+            self.run_pool(
+                files,
+                on_result=lambda file, result: finished.append(file),
+                on_error=lambda file, error: errors.append((file, str(error))),
+            )
+        assert errors == [(Path("broken.m4a"), "can not decode broken.m4a")]
+        # only the files that were handed to the worker already are
+        # transcribed, the others are cancelled
+        assert len(finished) < 4
+        assert time.monotonic() - start < 8 * 0.5
+
+    def test_failed_file_is_recorded_in_the_job_state(self):
+        # the hooks of the worker path of app.cli
+        output_dir = Path(self.temp_dir.name)
+        files = []
+        for name in ["broken.m4a"] + [f"{index}.m4a" for index in range(4)]:
+            files.append(output_dir / name)
+            files[-1].write_bytes(name.encode("utf-8"))
+        state = JobState(output_dir, "job", "settings")
+        state.start(files)
+        with self.assertRaises(ValueError):
+            self.run_pool(
+                files, on_result=lambda file, result: state.done(file, []), on_error=state.error
+            )
+
+        statuses = {Path(file).name: entry for file, entry in state.files.items()}
+        assert statuses["broken.m4a"]["status"] == FAILED
+        assert statuses["broken.m4a"]["error"] == "ValueError: can not decode broken.m4a"
+        # the files that ran are done, the cancelled files stay pending
+        # and are processed by --resume
+        others = [statuses[file.name]["status"] for file in files[1:]]
+        assert set(others) <= {DONE, PENDING}
+        assert PENDING in others
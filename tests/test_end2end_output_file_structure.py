@@ -24,6 +24,7 @@ class TestDirectoryStructure(unittest.TestCase):
             "DIALOGUE_small_en.tsv",
             "DIALOGUE_small_en.txt",
             "DIALOGUE_small_en.vtt",
+            "e2etest.state.json",
             "e2etest.zip",
             "shorts_small_da.aud",
             "shorts_small_da.csv",
@@ -53,6 +54,7 @@ class TestDirectoryStructure(unittest.TestCase):
             "DIALOGUE_parakeet.tsv",
             "DIALOGUE_parakeet.txt",
             "DIALOGUE_parakeet.vtt",
+            "e2etest2.state.json",
             "e2etest2.zip",
             "shorts_parakeet.aud",
             "shorts_parakeet.csv",
@@ -68,6 +70,7 @@ class TestDirectoryStructure(unittest.TestCase):
             "shorts_parakeet.tsv",
             "shorts_parakeet.txt",
             "shorts_parakeet.vtt",
+            "manifest.json",
             "transcribe.log"
         ]
 